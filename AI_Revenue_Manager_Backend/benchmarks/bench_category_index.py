@@ -0,0 +1,106 @@
+##############################################################################################################
+# Benchmark: inverted category index vs. per-campaign client scans
+#=============================================================================================================
+# Compares the old audience matching (iterrows() + re-splitting every 'Client Category' for every campaign)
+# with build_category_index() + dictionary lookups, on synthetic data (default 100k clients x 500 campaigns).
+# The legacy scan is timed on a sample of campaigns and extrapolated — running it for all 500 takes hours.
+#
+# Usage:
+#   python benchmarks/bench_category_index.py [--clients 100000] [--campaigns 500] [--legacy-sample 3]
+##############################################################################################################
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from main import build_category_index, count_matching_clients, find_matching_clients  # noqa: E402
+
+CATEGORIES = [
+    "Leisure", "Family", "Spa", "Business", "Luxury", "Adventure", "Honeymoon", "Dining",
+    "Wellness", "Budget", "Golf", "Beach", "Culture", "Nightlife", "Pet Friendly", "Long Stay",
+]
+
+
+def make_clients(n, seed=42):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Client ID": [f"C{i:06d}" for i in range(n)],
+        "Client Name": [f"Guest {i}" for i in range(n)],
+        "Client Phone": [f"+1555{i:07d}" for i in range(n)],
+        "Client Category": [", ".join(rng.sample(CATEGORIES, rng.randint(0, 3))) for _ in range(n)],
+    })
+
+
+def make_targets(n, seed=7):
+    rng = random.Random(seed)
+    return [rng.choice(CATEGORIES) for _ in range(n)]
+
+
+def legacy_find_matching_clients(df_clients, target_category):
+    """The pre-index implementation (iterrows + split per row), kept here for comparison."""
+    campaign_category = target_category.strip().lower()
+    matched_rows = []
+    for _, row in df_clients.iterrows():
+        raw_client_cat = str(row.get("Client Category", "")).strip().lower()
+        if not raw_client_cat:
+            continue
+        client_tokens = [t.strip() for t in raw_client_cat.split(",") if t.strip()]
+        if campaign_category in client_tokens:
+            matched_rows.append(row)
+    return pd.DataFrame(matched_rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inverted category index benchmark")
+    ap.add_argument("--clients", type=int, default=100_000)
+    ap.add_argument("--campaigns", type=int, default=500)
+    ap.add_argument("--legacy-sample", type=int, default=3,
+                    help="campaigns to time with the legacy scan (0 to skip)")
+    args = ap.parse_args()
+
+    df_clients = make_clients(args.clients)
+    targets = make_targets(args.campaigns)
+    print(f"🧪 {args.clients} clients x {args.campaigns} campaigns")
+
+    # --- Indexed: build once, then one lookup per campaign ---
+    t0 = time.perf_counter()
+    index = build_category_index(df_clients)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    counts = [count_matching_clients(index, target) for target in targets]
+    t_counts = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for target in targets:
+        find_matching_clients(df_clients, target, index)
+    t_frames = time.perf_counter() - t0
+
+    print(f"⚡ build_category_index:            {t_build * 1000:9.1f} ms ({len(index)} tokens)")
+    print(f"⚡ audience counts (all campaigns):  {t_counts * 1000:9.1f} ms")
+    print(f"⚡ matched rows (all campaigns):     {t_frames * 1000:9.1f} ms")
+    indexed_total = t_build + t_frames
+    print(f"⚡ indexed total:                    {indexed_total:9.3f} s")
+
+    # --- Legacy: full scan per campaign (sampled + extrapolated) ---
+    if args.legacy_sample > 0:
+        sample = targets[:args.legacy_sample]
+        t0 = time.perf_counter()
+        for target, expected in zip(sample, counts):
+            matched = legacy_find_matching_clients(df_clients, target)
+            assert len(matched) == expected, f"count mismatch for '{target}'"
+        per_campaign = (time.perf_counter() - t0) / len(sample)
+        legacy_total = per_campaign * len(targets)
+        print(f"🐢 legacy scan:                     {per_campaign:9.3f} s/campaign "
+              f"-> ~{legacy_total:,.0f} s for {len(targets)} campaigns (extrapolated)")
+        print(f"🚀 speed-up:                        ~{legacy_total / indexed_total:,.0f}x "
+              f"(counts identical on the {len(sample)} sampled campaigns)")
+
+
+if __name__ == "__main__":
+    main()
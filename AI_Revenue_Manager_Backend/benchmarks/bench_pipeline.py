@@ -0,0 +1,359 @@
+##############################################################################################################
+# Benchmark: the whole batch job, stage by stage, on synthetic sheets
+#=============================================================================================================
+# Runs process_clients_and_campaigns() end to end against the in-process Sheets emulator and a stubbed
+# Gemini model (both with configurable per-call latency) on generated Clients/Campaigns tabs, and reports
+# per-stage wall time, peak traced memory and call counts plus Sheets/Gemini API-call totals as JSON.
+# The JSON carries the git commit, so results from different commits can be diffed directly.
+#
+# Stages are timed by wrapping main.py functions; nested stages are inclusive (update_sheet is also
+# called from the enrichment checkpoints). Functions that do not exist in the checked-out commit are
+# simply absent from the report.
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py [--scenario 1000x10 --scenario 10000x100 --scenario 100000x1000]
+#                                       [--enrich-fraction 0.02] [--gemini-latency 0.02] [--sheets-latency 0.05]
+#                                       [--no-memory] [--no-compact] [--read-window 5000] [--verbose]
+#                                       [--output results.json]
+##############################################################################################################
+import argparse
+import contextlib
+import inspect
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SPREADSHEET_ID", "benchmark")
+
+import main  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from sheets_emulator import SheetsEmulator  # noqa: E402
+
+DEFAULT_SCENARIOS = ["1000x10", "10000x100", "100000x1000"]
+
+# main.py functions timed as stages (module attribute -> report name)
+STAGES = [
+    ("read_sheets", "read_sheets"),
+    ("iter_sheet_chunks", "read_client_chunks"),
+    ("enrich_clients", "enrichment"),
+    ("build_category_index", "build_category_index"),
+    ("find_matching_clients", "find_matching_clients"),
+    ("refresh_campaigns", "campaign_status_pass"),
+    ("update_sheet", "update_sheet"),
+    ("send_sheet_update", "sheets_write"),
+    ("invoke_message_service", "invoke_message_service"),
+]
+
+CATEGORIES = [
+    "Leisure", "Family", "Spa", "Business", "Luxury", "Adventure", "Honeymoon", "Dining",
+    "Wellness", "Budget", "Golf", "Beach", "Culture", "Nightlife", "Pet Friendly", "Long Stay",
+]
+CLIENT_HEADER = ["Client ID", "Client Name", "Client Email", "Client Phone", "Chat Text",
+                 "Client Type", "Client Interests", "Client Traits", "Client Category"]
+CAMPAIGN_HEADER = ["Campaign ID", "Campaign Text", "Target Client Category", "Start Date-Time",
+                   "End Date-Time", "Campaign Status", "Target Customers Count"]
+
+
+# ---------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------
+def make_tables(n_clients, n_campaigns, enrich_fraction, seed=42):
+    """Clients (a fraction still needing enrichment) and Campaigns with past/current/future windows.
+    Half of the date cells are typed serial numbers, half ISO text — like a real, hand-edited sheet.
+    """
+    rng = random.Random(seed)
+    clients = [CLIENT_HEADER]
+    for i in range(n_clients):
+        chat = f"Guest {i}: looking for {rng.choice(CATEGORIES).lower()} options, arriving in {rng.randint(1, 90)} days."
+        row = [f"C{i:06d}", f"Guest {i}", f"guest{i}@example.com", f"+1555{i:07d}", chat]
+        if rng.random() >= enrich_fraction:
+            cats = rng.sample(CATEGORIES, rng.randint(1, 3))
+            row += [cats[0], ", ".join(cats), "Friendly", ", ".join(cats)]
+        clients.append(row)
+
+    now = datetime.now()
+    campaigns = [CAMPAIGN_HEADER]
+    for j in range(n_campaigns):
+        start = now + timedelta(days=rng.randint(-60, 60))
+        end = start + timedelta(days=rng.randint(1, 30))
+        if j % 2:
+            start_cell, end_cell = start.strftime("%Y-%m-%d %H:%M"), end.strftime("%Y-%m-%d %H:%M")
+        else:
+            start_cell = (start - main.SHEETS_EPOCH).total_seconds() / 86400
+            end_cell = (end - main.SHEETS_EPOCH).total_seconds() / 86400
+        campaign_id = f"CMP-{j + 1:04d}" if j % 3 else ""
+        campaigns.append([campaign_id, f"Offer {j}", rng.choice(CATEGORIES), start_cell, end_cell, "", ""])
+    return {main.CLIENTS_SHEET: clients, main.CAMPAIGNS_SHEET: campaigns}
+
+
+# ---------------------------------------------------------
+# Gemini stub
+# ---------------------------------------------------------
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Answers every prompt shape main.py sends, after a fixed latency."""
+
+    model_name = "models/benchmark-stub"
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        profile = {"client_type": "Leisure", "client_interests": ["Spa", "Dining"], "client_traits": ["Relaxed"]}
+        with_category = "client_category" in prompt
+        if with_category:
+            profile["client_category"] = "Leisure, Spa"
+        client_ids = re.findall(r"### Client ID: (\S+)", prompt)
+        if client_ids:
+            return StubResponse(json.dumps([dict(profile, client_id=cid) for cid in client_ids]))
+        if "Client Type:" in prompt:
+            return StubResponse("Leisure, Spa")
+        return StubResponse(json.dumps(profile))
+
+
+# ---------------------------------------------------------
+# Stage instrumentation
+# ---------------------------------------------------------
+class StageRecorder:
+    """Wraps functions to accumulate wall time, call count and peak traced memory per stage."""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.stats = {}
+        self.open_peaks = []   # running peak of every stage currently on the stack
+        self.lock = threading.Lock()
+
+    def wrap(self, name, fn):
+        def wrapper(*args, **kwargs):
+            # Worker threads (if any) only get timing — memory peaks are tracked on the main thread
+            track = self.trace_memory and threading.current_thread() is threading.main_thread()
+            if track:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.open_peaks = [max(p, peak) for p in self.open_peaks]
+                tracemalloc.reset_peak()
+                self.open_peaks.append(0)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                if inspect.isgenerator(result):
+                    # Paged readers: time every page as it is pulled (the consumer's work is excluded)
+                    return self.timed_pages(name, result)
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    entry = self.stats.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_mb": 0.0})
+                    entry["calls"] += 1
+                    entry["seconds"] += elapsed
+                if track:
+                    mine = max(self.open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                    self.open_peaks = [max(p, mine) for p in self.open_peaks]
+                    entry["peak_mb"] = max(entry["peak_mb"], mine / 2**20)
+        return wrapper
+
+    def timed_pages(self, name, pages):
+        while True:
+            started = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            finally:
+                with self.lock:
+                    self.stats[name]["seconds"] += time.perf_counter() - started
+            yield page
+
+    def report(self):
+        return {
+            name: {"calls": s["calls"], "seconds": round(s["seconds"], 4), "peak_mb": round(s["peak_mb"], 2)}
+            for name, s in self.stats.items()
+        }
+
+
+# ---------------------------------------------------------
+# Run one scenario
+# ---------------------------------------------------------
+def proc_status_mb(field):
+    """VmRSS / VmHWM of this process in MB (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Restart the VmHWM high-water mark at the current RSS; returns that RSS in MB (None if unsupported)."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return None
+    return proc_status_mb("VmRSS")
+
+
+def run_scenario(n_clients, n_campaigns, args, workdir):
+    tables = make_tables(n_clients, n_campaigns, args.enrich_fraction)
+    sheets = SheetsEmulator(tables, latency=args.sheets_latency)
+    gemini = StubGemini(args.gemini_latency)
+    recorder = StageRecorder(trace_memory=not args.no_memory)
+
+    originals = {}
+    patches = {
+        "init_google_sheets": lambda: sheets,
+        "init_gemini": lambda: gemini,
+        # No real quota to respect — keep only the in-flight cap so stub latency drives throughput
+        "gemini_limiter": RateLimiter(10**9, main.GEMINI_MAX_IN_FLIGHT),
+        "llm_cache": LLMCache(os.path.join(workdir, "llm_cache.sqlite3"), enabled=args.cache),
+        "RUN_STATE_FILE": os.path.join(workdir, "run_state.json"),
+        "JOURNAL_FILE": os.path.join(workdir, "enrichment_journal.jsonl"),
+        "COMPACT_FRAMES": not args.no_compact,
+        "CLIENTS_READ_WINDOW": args.read_window,
+        "PIPELINED_RUN": not args.serial,
+    }
+    for attr, report_name in STAGES:
+        if hasattr(main, attr):
+            patches[attr] = recorder.wrap(report_name, getattr(main, attr))
+    for attr, value in patches.items():
+        if hasattr(main, attr):
+            originals[attr] = getattr(main, attr)
+            setattr(main, attr, value)
+    main.sheets_write_stats.update(api_calls=0, bytes_sent=0)
+
+    if not args.no_memory:
+        tracemalloc.start()
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+    # RSS the run itself adds at its peak (generated tables and emulator already resident)
+    baseline_rss = reset_peak_rss()
+    started = time.perf_counter()
+    try:
+        with sink:
+            main.process_clients_and_campaigns(full=True)
+    finally:
+        total = time.perf_counter() - started
+        run_peak_rss = proc_status_mb("VmHWM") if baseline_rss is not None else None
+        peak = tracemalloc.get_traced_memory()[1] if not args.no_memory else 0
+        if not args.no_memory:
+            tracemalloc.stop()
+        devnull.close()
+        for attr, value in originals.items():
+            setattr(main, attr, value)
+
+    return {
+        "clients": n_clients,
+        "campaigns": n_campaigns,
+        "total_seconds": round(total, 4),
+        "peak_mb": round(peak / 2**20, 2),
+        # Process-wide high-water mark: run one scenario per process to compare RSS across settings
+        "peak_rss_mb": round(main.peak_rss_mb(), 1) if hasattr(main, "peak_rss_mb") else None,
+        # Peak RSS growth during the job alone: compare this across --no-compact / with and without pyarrow
+        "run_peak_rss_mb": round(run_peak_rss - baseline_rss, 1) if run_peak_rss is not None else None,
+        "stages": recorder.report(),
+        "api_calls": {
+            "gemini": gemini.calls,
+            "sheets": dict(sorted(sheets.stats.items())),
+            "sheets_write_kb": round(main.sheets_write_stats["bytes_sent"] / 1024, 1),
+        },
+    }
+
+
+def git_commit():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Batch pipeline benchmark (stubbed Gemini + Sheets emulator)")
+    ap.add_argument("--scenario", action="append",
+                    help="CLIENTSxCAMPAIGNS, repeatable (default: 1000x10, 10000x100, 100000x1000)")
+    ap.add_argument("--enrich-fraction", type=float, default=0.02,
+                    help="fraction of clients that still need enrichment (default 0.02)")
+    ap.add_argument("--gemini-latency", type=float, default=0.02, help="seconds per stubbed Gemini call")
+    ap.add_argument("--sheets-latency", type=float, default=0.05, help="seconds per emulated Sheets call")
+    ap.add_argument("--cache", action="store_true", help="enable the enrichment cache (off by default)")
+    ap.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peak_mb)")
+    ap.add_argument("--no-compact", action="store_true", help="load plain object frames (COMPACT_FRAMES off)")
+    ap.add_argument("--read-window", type=int, default=getattr(main, "CLIENTS_READ_WINDOW", 0),
+                    help="Clients rows per page (0 = one read of the whole tab)")
+    ap.add_argument("--serial", action="store_true",
+                    help="read, enrich and write one after another (PIPELINED_RUN off)")
+    ap.add_argument("--verbose", action="store_true", help="show the job's own output")
+    ap.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = ap.parse_args()
+
+    commit, dirty = git_commit()
+    report = {
+        "benchmark": "bench_pipeline",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "enrich_fraction": args.enrich_fraction,
+            "gemini_latency": args.gemini_latency,
+            "sheets_latency": args.sheets_latency,
+            "cache": args.cache,
+            "trace_memory": not args.no_memory,
+            "compact_frames": not args.no_compact,
+            "text_dtype": getattr(main, "TEXT_DTYPE", None),
+            "read_window": args.read_window,
+            "pipelined": not args.serial,
+            "GEMINI_MAX_IN_FLIGHT": main.GEMINI_MAX_IN_FLIGHT,
+            "BATCH_SIZE": main.BATCH_SIZE,
+            "COMBINED_ENRICHMENT": getattr(main, "COMBINED_ENRICHMENT", None),
+            "PROFILE_BATCH_SIZE": getattr(main, "PROFILE_BATCH_SIZE", None),
+        },
+        "scenarios": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for scenario in args.scenario or DEFAULT_SCENARIOS:
+            n_clients, n_campaigns = (int(x) for x in scenario.lower().split("x"))
+            print(f"🧪 {n_clients} clients x {n_campaigns} campaigns ...", file=sys.stderr)
+            result = run_scenario(n_clients, n_campaigns, args, workdir)
+            print(f"⚡ done in {result['total_seconds']:.2f}s", file=sys.stderr)
+            report["scenarios"].append(result)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"💾 Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
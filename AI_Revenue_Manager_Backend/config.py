@@ -20,9 +20,72 @@ load_dotenv()
 
 # --- Batching & Rate Limiting ---
 BATCH_SIZE = 5
-REQUEST_DELAY = 2        # seconds between calls
 MAX_RETRIES = 3
 RETRY_DELAY = 5          # seconds before retry
+RETRY_MAX_DELAY = 60     # cap for the exponential backoff (seconds)
+BREAKER_THRESHOLD = 3    # throttled (429) replies in a row that pause every Gemini worker
+BREAKER_COOLDOWN = 30    # seconds the workers stay paused (doubles if throttled again on resume)
+GEMINI_REQUESTS_PER_MINUTE = 30   # shared token bucket for all enrichment workers
+GEMINI_MAX_IN_FLIGHT = 4          # worker pool size / max concurrent Gemini calls
+
+# --- Client Enrichment ---
+# One structured (JSON schema) Gemini call returns type, interests, traits AND category.
+# Rows whose reply fails validation fall back to the two-step profile -> category path.
+COMBINED_ENRICHMENT = False
+# Pack several transcripts (keyed by Client ID) into one profile prompt; 1 disables batching.
+PROFILE_BATCH_SIZE = 15
+PROFILE_BATCH_TOKEN_BUDGET = 12000   # approx. input tokens per batched prompt (~4 chars/token)
+
+# --- State Kept Between Runs ---
+# Directory of the files a run leaves for the next one (enrichment cache, run state, journal).
+# A Cloud Run job's own disk is in-memory and discarded when the execution ends, so deployments must
+# point STATE_DIR at a mounted NFS (Filestore) volume; a Cloud Storage (gcsfuse) mount lacks the file
+# locking SQLite needs. Empty = the working directory, which is fine for local runs.
+STATE_DIR = os.getenv("STATE_DIR", "")
+
+# --- Enrichment Result Cache (local SQLite file) ---
+LLM_CACHE_ENABLED = True
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(STATE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = 50000
+LLM_CACHE_TTL_DAYS = 30
+
+# --- Incremental Runs ---
+# Only rows that are new/changed since the last successful run (plus campaigns whose
+# Start/End boundary has passed) are processed. `python main.py --full` ignores the watermark.
+# The watermark lives under STATE_DIR; without it every Cloud Run execution is a full run.
+INCREMENTAL_MODE = True
+RUN_STATE_FILE = os.getenv("RUN_STATE_FILE", os.path.join(STATE_DIR, "run_state.json"))
+
+# --- In-memory Data Model ---
+# Typed frames: Client Type / Client Category / Campaign Status as categoricals, free text as
+# Arrow strings (if pyarrow is installed), counts and Start/End date-times parsed once at load.
+# Off by default until benchmarks/bench_pipeline.py has been run against a production-sized sheet;
+# it only pays off for large tabs (compare its peak RSS with and without --no-compact).
+COMPACT_FRAMES = False
+# Clients tab is paged in windows of this many rows; each window is enriched, written back and its
+# Chat Text released before the next one is read (memory bounded by the window). 0 = one read.
+# Paging costs one extra read per window, so it is off by default; set it (e.g. 5000) only for a
+# Clients tab too large to hold in the job's memory.
+CLIENTS_READ_WINDOW = 0
+
+# --- Pipelined Runs ---
+# Reading the next Clients window, enriching the current one and writing checkpoints to Sheets
+# run concurrently (reader thread -> enrichment workers -> background writer). Off by default: the
+# overlap only pays off with CLIENTS_READ_WINDOW paging on a large tab, and serial runs are easier
+# to follow in the job logs.
+PIPELINED_RUN = False
+PREFETCH_WINDOWS = 1     # Clients windows read ahead while the current one is being enriched
+WRITE_QUEUE_SIZE = 8     # checkpoint writes queued before enrichment waits for the writer
+# Finished enrichments are fsync'ed to this JSONL journal before they are written to Sheets, so a
+# crashed run resumes from it without calling Gemini again. Deleted after a successful run. Kept
+# under STATE_DIR, since the execution that has to resume from it is the next one.
+JOURNAL_ENABLED = True
+JOURNAL_FILE = os.getenv("JOURNAL_FILE", os.path.join(STATE_DIR, "enrichment_journal.jsonl"))
+
+# --- Run Report ---
+# Per-stage durations, call counts, retries and payload sizes, written as JSON when the job exits.
+RUN_REPORT_FILE = os.getenv("RUN_REPORT_FILE", "run_report.json")
+PROFILE_DIR = "profiles"     # default output directory of `python main.py --profile`
 
 # --- Credentials ---
 # SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
@@ -0,0 +1,96 @@
+##############################################################################################################
+# Crash-safe journal of completed client enrichments
+#=============================================================================================================
+# Every finished enrichment (the {column: value} updates for one client) is appended to a local JSONL file
+# and fsync'ed BEFORE it is applied to the DataFrame or queued for Sheets. If the job dies (Cloud Run
+# timeout, Gemini outage, crash), the next run replays the journal instead of paying Gemini again.
+# Entries are keyed by Client ID + a hash of the chat, so an edited transcript is enriched afresh.
+# The journal is cleared once a run has written everything to Sheets and saved its watermark.
+##############################################################################################################
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def journal_key(client_id, chat_text):
+    digest = hashlib.blake2b(str(chat_text).encode("utf-8"), digest_size=12).hexdigest()
+    return f"{str(client_id).strip()}|{digest}"
+
+
+class EnrichmentJournal:
+    """Append-only JSONL journal {key -> updates}; the latest entry for a key wins."""
+
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.file = None
+        self.appended = 0
+        self.replayed = 0
+        if enabled:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        skipped = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry["updates"]
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1      # e.g. a line torn by a crash mid-write
+        print(f"📓 Journal '{self.path}': {len(self.entries)} enrichment(s) from an unfinished run"
+              + (f" ({skipped} unreadable line(s) skipped)" if skipped else "") + ".")
+
+    def get(self, key):
+        """Journaled updates for this client/chat, or None."""
+        if not self.enabled:
+            return None
+        updates = self.entries.get(key)
+        if updates is not None:
+            with self.lock:
+                self.replayed += 1
+        return updates
+
+    def append(self, items):
+        """Durably record [(key, updates), ...] (one write + fsync for the whole group)."""
+        items = [(key, updates) for key, updates in items if updates]
+        if not self.enabled or not items:
+            return
+        lines = "".join(
+            json.dumps({"key": key, "updates": updates, "ts": time.time()}, ensure_ascii=False, default=str) + "\n"
+            for key, updates in items
+        )
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(lines)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            for key, updates in items:
+                self.entries[key] = updates
+            self.appended += len(items)
+
+    def clear(self):
+        """Forget everything — call only after the run's results are safely in Sheets."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.entries = {}
+            if self.enabled and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,129 @@
+##############################################################################################################
+# Persistent, content-addressed cache for Gemini enrichment results
+#=============================================================================================================
+# Results are stored in a local SQLite file keyed by sha256(prompt kind, model name, normalized input),
+# so re-imported or wiped Clients rows with byte-identical chats (or repeated type/interests/traits
+# tuples) never pay for a second LLM call.
+# Entries expire after ttl_days and the file is trimmed to max_entries (least recently used first).
+##############################################################################################################
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def normalize_input(text):
+    """Normalize text so cosmetic differences (CRLF, repeated spaces) hit the same entry."""
+    text = unicodedata.normalize("NFC", str(text)).replace("\r\n", "\n")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class LLMCache:
+    """Thread-safe SQLite cache of JSON-serializable LLM results with hit/miss counters."""
+
+    def __init__(self, path, max_entries=50000, ttl_days=30, enabled=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.conn = None
+        self.hits = {}
+        self.misses = {}
+
+    # ---------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------
+    def _connect(self):
+        if self.conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                       key TEXT PRIMARY KEY,
+                       kind TEXT NOT NULL,
+                       value TEXT NOT NULL,
+                       created REAL NOT NULL,
+                       last_used REAL NOT NULL
+                   )"""
+            )
+            self._evict()
+        return self.conn
+
+    def _evict(self):
+        if self.ttl_seconds:
+            self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.ttl_seconds,))
+        if self.max_entries:
+            self.conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(kind, model_name, payload):
+        raw = json.dumps([kind, model_name or "", normalize_input(payload)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def get(self, kind, model_name, payload):
+        """Return the cached value, or None on a miss (expired entries count as misses)."""
+        if not self.enabled:
+            return None
+        key = self.make_key(kind, model_name, payload)
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and (not self.ttl_seconds or row[1] >= time.time() - self.ttl_seconds):
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+                return json.loads(row[0])
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+            return None
+
+    def put(self, kind, model_name, payload, value):
+        """Store a (non-empty) result."""
+        if not self.enabled or value in (None, "", {}, []):
+            return
+        key = self.make_key(kind, model_name, payload)
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            conn.commit()
+
+    def report(self):
+        """Print hit/miss counters per prompt kind."""
+        if not self.enabled:
+            return
+        kinds = sorted(set(self.hits) | set(self.misses))
+        if not kinds:
+            print("🗄️ LLM cache: no lookups this run.")
+            return
+        for kind in kinds:
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            rate = 100.0 * hits / (hits + misses)
+            print(f"🗄️ LLM cache [{kind}]: {hits} hit(s), {misses} miss(es) ({rate:.1f}% hit rate)")
+
+    def close(self):
+        """Apply size/TTL eviction and close the file."""
+        with self.lock:
+            if self.conn is not None:
+                self._evict()
+                self.conn.close()
+                self.conn = None
@@ -1,17 +1,31 @@
 # Standard Library (no install needed)
 import os
 import re
+import resource
+import argparse
 import time
 import json
-from datetime import datetime
+import hashlib
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # External packages required
+import numpy as np
 import pandas as pd
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 import google.generativeai as genai
 from dateutil import parser
 
+# Optional: Arrow-backed strings for free-text columns (falls back to plain Python strings)
+try:
+    import pyarrow
+    # Arrow buffers come from the system allocator, so they reuse the memory freed by the
+    # object columns they replace (Arrow's bundled allocator would grow the process instead)
+    pyarrow.set_memory_pool(pyarrow.system_memory_pool())
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = None
 
 from config import (
     # SPREADSHEET_ID,
@@ -20,13 +34,43 @@ from config import (
     # GEMINI_API_KEY,
     # GEMINI_MODEL,
     BATCH_SIZE,
-    REQUEST_DELAY,
-    # MAX_RETRIES,
-    # RETRY_DELAY,
+    MAX_RETRIES,
+    RETRY_DELAY,
+    RETRY_MAX_DELAY,
+    BREAKER_THRESHOLD,
+    BREAKER_COOLDOWN,
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_MAX_IN_FLIGHT,
+    COMBINED_ENRICHMENT,
+    PROFILE_BATCH_SIZE,
+    PROFILE_BATCH_TOKEN_BUDGET,
+    STATE_DIR,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_FILE,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_DAYS,
+    INCREMENTAL_MODE,
+    RUN_STATE_FILE,
+    COMPACT_FRAMES,
+    CLIENTS_READ_WINDOW,
+    PIPELINED_RUN,
+    PREFETCH_WINDOWS,
+    WRITE_QUEUE_SIZE,
+    JOURNAL_ENABLED,
+    JOURNAL_FILE,
+    RUN_REPORT_FILE,
+    PROFILE_DIR,
     # SERVICE_ACCOUNT_FILE,
     MSG_SERVICE_PYTHON,
     FRONTEND_TEMPLATE_COLUMNS,
 )
+from rate_limiter import RateLimiter
+from retry_policy import RetryPolicy, CircuitBreaker, EmptyResponse
+from llm_cache import LLMCache
+from run_state import empty_run_state, load_run_state, save_run_state, row_keys, parse_boundary
+from enrichment_journal import EnrichmentJournal, journal_key
+from pipeline import prefetch, BackgroundWriter
+from run_report import RunReport
 if(MSG_SERVICE_PYTHON):
     from config import (
         TWILIO_ACCOUNT_SID,
@@ -51,10 +95,29 @@ CAMPAIGNS_SHEET = "Campaigns"
 # APPS_SCRIPT_URL = os.environ.get("APPS_SCRIPT_URL")
 # SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
 
+# Shared by every Gemini call in the job (all enrichment workers)
+gemini_limiter = RateLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_MAX_IN_FLIGHT)
+# Retries with jittered backoff; the breaker pauses all workers together when Gemini keeps throttling
+gemini_retry = RetryPolicy(
+    MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY,
+    breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN, max_in_flight=GEMINI_MAX_IN_FLIGHT),
+)
+# Paged Sheets reads (many calls per run) retry throttles/transient errors the same way
+sheets_retry = RetryPolicy(MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY, name="Sheets")
+# On-disk cache of enrichment results (profile / category / combined)
+llm_cache = LLMCache(LLM_CACHE_FILE, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_DAYS, enabled=LLM_CACHE_ENABLED)
+# Per-stage durations / call counts / payload sizes (JSON summary at exit, see run_report.py)
+run_report = RunReport()
+
 # -------------------------------------------------------------------
 # 🔧 SETUP
 # -------------------------------------------------------------------
 def init_google_sheets():
+    # Offline / benchmarking: in-process emulator instead of the real API (see sheets_emulator.py)
+    if os.environ.get("SHEETS_BACKEND", "").strip().lower() == "emulator":
+        from sheets_emulator import SheetsEmulator
+        return SheetsEmulator.from_env()
+
 ###################################################################################    
     # print("SERVICE_ACCOUNT_FILE env:", os.getenv("SERVICE_ACCOUNT_FILE"))
 
@@ -113,16 +176,20 @@ def init_gemini():
     return genai.GenerativeModel(model)
 
 
+def sheets_worker_service(sheets):
+    """Sheets client for a background thread (prefetching reader / writer).
+    A googleapiclient service wraps one httplib2 connection and is not thread-safe,
+    so each thread gets its own; the in-process emulator is simply shared."""
+    if os.environ.get("SHEETS_BACKEND", "").strip().lower() == "emulator":
+        return sheets
+    return init_google_sheets()
+
+
 # -------------------------------------------------------------------
 # 🧹 SHEET HELPERS
 # -------------------------------------------------------------------
-def read_sheet(service, sheet_name):
-    """Read a Google Sheet into a pandas DataFrame (auto-pads rows)."""
-    result = service.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=f"{sheet_name}!A:Z"
-    ).execute()
-    values = result.get("values", [])
+def values_to_dataframe(sheet_name, values):
+    """Turn a Sheets values grid (header row first) into a DataFrame (auto-pads rows)."""
     if not values:
         raise ValueError(f"No data found in sheet '{sheet_name}'.")
     headers, rows = values[0], values[1:]
@@ -133,7 +200,366 @@ def read_sheet(service, sheet_name):
     return pd.DataFrame(clean_rows, columns=headers)
 
 
-def update_sheet(service, sheet_name, df, columns_to_update=None):
+# Typed in-memory model (COMPACT_FRAMES)
+CATEGORY_COLUMNS = ["Client Type", "Client Category", "Campaign Status"]
+# Arrow-backed text only for columns the job never writes: Arrow arrays are immutable, so
+# every set_cells() into one would rebuild the whole column
+TEXT_COLUMNS = ["Chat Text", "Campaign Text"]
+NUMBER_COLUMNS = ["Target Customers Count", "Campaign Message Count"]
+DATETIME_COLUMNS = ["Start Date-Time", "End Date-Time"]
+
+
+# Rows at a time when Arrow-backed text has to be copied (stripped / turned into Python strings)
+TEXT_BATCH_ROWS = 5000
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def compact_frame(df):
+    """Convert a freshly read (all-object) frame to compact column types, in place:
+    - low-cardinality columns (CATEGORY_COLUMNS) -> categoricals
+    - free text (TEXT_COLUMNS) -> Arrow-backed strings when pyarrow is available
+    - counts / Start-End date-times -> Int64 / datetime64, parsed once here
+    A number/date column is only converted when every non-blank cell parses, so odd cells
+    keep their original value (and still get reported by the stage that reads them).
+    """
+    typed = set(CATEGORY_COLUMNS) | set(NUMBER_COLUMNS) | set(DATETIME_COLUMNS) | (set(TEXT_COLUMNS) if TEXT_DTYPE else set())
+    for col in df.columns:
+        if col not in typed:
+            continue
+        column = df[col]
+        blank = column.isna() | (column.astype(str).str.strip() == "")
+        if col in CATEGORY_COLUMNS:
+            df[col] = column.where(~blank, "").astype(str).astype("category")
+        elif col in TEXT_COLUMNS and TEXT_DTYPE:
+            df[col] = column.where(~blank, "").astype(str).astype(TEXT_DTYPE)
+        elif col in NUMBER_COLUMNS:
+            numbers = pd.to_numeric(column.where(~blank), errors="coerce")
+            if numbers[~blank].notna().all() and (numbers.dropna() % 1 == 0).all():
+                df[col] = numbers.astype("Int64")
+        elif col in DATETIME_COLUMNS:
+            parsed = sheet_datetimes(column)
+            if parsed[~blank].notna().all():
+                df[col] = parsed
+    return df
+
+
+def non_blank(column):
+    """[str(value).strip() != "" per cell]; Arrow-backed text is checked in Arrow, one
+    batch of rows at a time (stripping copies the text)."""
+    if isinstance(column.dtype, pd.StringDtype):
+        result = []
+        for start in range(0, len(column), TEXT_BATCH_ROWS):
+            part = column.iloc[start:start + TEXT_BATCH_ROWS]
+            result += part.str.strip().ne("").fillna(False).tolist()
+        return result
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Check each category once; the extra last entry is code -1 (NaN -> "nan", not blank)
+        filled = np.append(np.asarray(column.cat.categories.astype(str).str.strip() != ""), True)
+        return filled[column.cat.codes.to_numpy()].tolist()
+    return column.astype(str).str.strip().ne("").tolist()
+
+
+def ensure_columns(df, columns):
+    """Add any missing backend-managed columns (blank), typed like compact_frame() would."""
+    for col in columns:
+        if col not in df.columns:
+            df[col] = pd.Categorical([""] * len(df)) if (COMPACT_FRAMES and col in CATEGORY_COLUMNS) else ""
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@run_report.stage("read_sheets")
+def read_sheets(service, sheet_names):
+    """Read several tabs with ONE values().batchGet call -> {sheet_name: DataFrame}.
+
+    - The bare tab name is used as the range, so the API returns exactly the used
+      range of each tab (no A:Z cap on columns like 'Message Template #N').
+    - UNFORMATTED_VALUE: numbers arrive as numbers and date-times as serial numbers
+      (see sheet_datetimes / sheet_time), not as locale-formatted strings.
+    - With COMPACT_FRAMES the frames come back typed (see compact_frame).
+    """
+    result = service.values().batchGet(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=[f"'{name}'" for name in sheet_names],
+        valueRenderOption="UNFORMATTED_VALUE",
+        dateTimeRenderOption="SERIAL_NUMBER",
+    ).execute()
+    value_ranges = result.get("valueRanges", [])
+    run_report.count("read_sheets", rows=sum(len(vr.get("values", [])) for vr in value_ranges),
+                     cells=sum(len(row) for vr in value_ranges for row in vr.get("values", [])))
+    frames = {
+        name: values_to_dataframe(name, value_range.get("values", []))
+        for name, value_range in zip(sheet_names, value_ranges)
+    }
+    # Drop the raw response first: compaction can then free each object column it replaces
+    del result, value_ranges
+    if COMPACT_FRAMES:
+        for name, df in frames.items():
+            before = frame_mb(df)
+            compact_frame(df)
+            print(f"🧮 '{name}' in memory: {before:.1f} MB -> {frame_mb(df):.1f} MB (compact column types).")
+    return frames
+
+
+def read_sheet(service, sheet_name):
+    """Read a Google Sheet into a pandas DataFrame (auto-pads rows)."""
+    return read_sheets(service, [sheet_name])[sheet_name]
+
+
+def sheet_row_count(service, sheet_name):
+    """Grid row count of a tab (an upper bound on the rows holding data)."""
+    meta = sheets_retry.call(lambda: service.get(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=[f"'{sheet_name}'"],
+        fields="sheets(properties(title,gridProperties(rowCount)))",
+    ).execute(), reraise=True)
+    for sheet in meta.get("sheets", []):
+        return sheet["properties"]["gridProperties"]["rowCount"]
+    raise ValueError(f"Sheet '{sheet_name}' not found.")
+
+
+def iter_sheet_chunks(service, sheet_name, window=CLIENTS_READ_WINDOW):
+    """Page through a tab `window` rows at a time, yielding one DataFrame chunk per page.
+
+    - Only one page of raw values is alive at a time, so memory is bounded by the
+      window (plus whatever the caller keeps from earlier chunks).
+    - Row labels are sheet positions (label 0 = sheet row 2), so a chunk can be written
+      back with update_sheet(..., first_row=chunk.index[0] + 2) and chunks concatenate
+      into the same frame read_sheet() would return.
+    - Chunks are typed like read_sheets() (COMPACT_FRAMES); pages are retried on
+      throttling and a page that still fails aborts the run (never a silent gap).
+    - Blank rows at the end of a page are trimmed by the API, so they are simply absent.
+    """
+    row_count = sheet_row_count(service, sheet_name)
+    headers = None
+    start = 1       # the first page also carries the header row
+    while start <= row_count:
+        end = min(start + window, row_count)
+        with run_report.timed("read_sheet_page"):
+            values = sheets_retry.call(lambda: service.values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f"'{sheet_name}'!{start}:{end}",
+                valueRenderOption="UNFORMATTED_VALUE",
+                dateTimeRenderOption="SERIAL_NUMBER",
+            ).execute(), reraise=True).get("values", [])
+        run_report.count("read_sheet_page", rows=len(values), cells=sum(len(row) for row in values))
+        first_label = start - 2
+        if headers is None:
+            if not values:
+                raise ValueError(f"No data found in sheet '{sheet_name}'.")
+            headers, values, first_label = values[0], values[1:], 0
+        if values:
+            chunk = values_to_dataframe(sheet_name, [headers] + values)
+            chunk.index = pd.RangeIndex(first_label, first_label + len(chunk))
+            yield compact_frame(chunk) if COMPACT_FRAMES else chunk
+        del values
+        start = end + 1
+
+
+# Google Sheets serial date-times count days since 1899-12-30
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+
+def is_sheet_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sheet_time(value):
+    """Time-of-day cell as a datetime.time (serial day fraction), or None if it isn't numeric."""
+    if is_sheet_number(value):
+        return (SHEETS_EPOCH + timedelta(days=value % 1)).time()
+    return None
+
+
+# Plain ISO date / date-time text (no timezone): parsed in bulk by pandas
+ISO_DATETIME = r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$"
+
+
+def sheet_datetimes(values):
+    """Parse date-time cells: Series of cells -> datetime64 Series (NaT if blank/unparseable).
+
+    Serial numbers (UNFORMATTED_VALUE) are converted arithmetically and ISO text goes through one
+    pd.to_datetime call; only the leftovers (free-form text) hit dateutil, one by one.
+    """
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("datetime64[ns]")     # already parsed by compact_frame()
+    values = pd.Series(values, dtype=object)
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+
+    numeric = values.map(is_sheet_number).astype(bool)
+    if numeric.any():
+        days = pd.to_timedelta(values[numeric].astype(float), unit="D").dt.round("us")
+        result[numeric] = pd.Timestamp(SHEETS_EPOCH) + days
+
+    text = values[~numeric].map(lambda v: "" if pd.isna(v) else str(v).strip())
+    text = text[text != ""]
+    iso = text.str.match(ISO_DATETIME)
+    if iso.any():
+        result[iso[iso].index] = pd.to_datetime(text[iso], format="ISO8601", errors="coerce")
+
+    # Free-form text, e.g.
+    # ✅ 1 Nov 2025 9:00
+    # ✅ Nov 1, 2025 9am
+    # ✅ 1st November 2025 09:00 AM
+    leftovers = text[~iso | result[text.index].isna()]
+    for idx, value in leftovers.items():
+        try:
+            dt = parser.parse(value)
+        except (ValueError, OverflowError):
+            continue
+        # Aware values are compared with the job's local wall clock
+        result[idx] = dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+    return result
+
+
+def row_fingerprints(df, columns=None):
+    """Stable per-row content hash {row label: hex digest} over `columns` (default: all).
+    Taken right after a read (or write) it is a cheap stand-in for what the sheet holds,
+    so change detection never has to re-download the sheet.
+    Rows are stringified in batches: Arrow-backed text columns become Python strings only
+    one batch at a time instead of a full copy of the frame.
+    """
+    columns = columns or df.columns.tolist()
+    result = {}
+    for start in range(0, len(df), TEXT_BATCH_ROWS):
+        part = df.iloc[start:start + TEXT_BATCH_ROWS][columns]
+        for idx, values in zip(part.index, part.astype(str).itertuples(index=False, name=None)):
+            result[idx] = hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=16).hexdigest()
+    return result
+
+
+# Running totals of Sheets write traffic for this run
+sheets_write_stats = {"api_calls": 0, "bytes_sent": 0}
+
+
+def record_sheets_write(body):
+    """Count one Sheets write request and the size of its JSON body; returns the byte count."""
+    size = len(json.dumps(body, default=str).encode("utf-8"))
+    sheets_write_stats["api_calls"] += 1
+    sheets_write_stats["bytes_sent"] += size
+    return size
+
+
+# Helper to convert column index (1-based) to A, B, ..., AA, AB, etc.
+def col_letter(n):
+    result = ''
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        result = chr(65 + remainder) + result
+    return result
+
+
+def set_cells(df, dirty, col, values):
+    """Assign `values` (a Series indexed by row label) to `col`, recording (row label, col)
+    in the `dirty` set only for the cells whose value actually changes.
+    All backend writes to Clients/Campaigns cells go through here so only changed cells
+    are ever sent back to Sheets.
+    """
+    if values.empty:
+        return
+    old = df.loc[values.index, col].astype(object)
+    changed = values.index[(old.where(old.notna(), "").astype(str) != values.astype(str)).to_numpy()]
+    if len(changed):
+        new_values = values.loc[changed]
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            widen_column(df, col, new_values)
+        try:
+            if df[col].dtype.kind in "iuf" and new_values.dtype == object:
+                # Plain int64/float64 columns (COMPACT_FRAMES off) only take numbers
+                df.loc[changed, col] = new_values.astype(df[col].dtype)
+            else:
+                df.loc[changed, col] = new_values
+        except (TypeError, ValueError):
+            widen_column(df, col, new_values)
+            df.loc[changed, col] = new_values
+        dirty.update((idx, col) for idx in changed)
+
+
+def widen_column(df, col, values):
+    """Make a typed column able to hold `values`: categoricals get the new categories,
+    other typed columns (Int64, datetime64, Arrow strings) fall back to object."""
+    if isinstance(df[col].dtype, pd.CategoricalDtype):
+        new = pd.Index(pd.unique(pd.Series(list(values), dtype=object))).difference(df[col].cat.categories)
+        if len(new):
+            df[col] = df[col].cat.add_categories(new)
+    elif df[col].dtype != object:
+        df[col] = df[col].astype(object)
+
+
+def coalesce_dirty_cells(df, dirty_cells):
+    """Coalesce dirty (row label, column) cells into a minimal list of rectangular blocks.
+
+    Each column's dirty rows are split into contiguous runs; horizontally adjacent
+    columns with an identical run are merged. Returns (first_row, last_row,
+    first_col, last_col) tuples of 0-based DataFrame positions — only dirty cells
+    are covered.
+    """
+    rows_by_col = {}
+    for idx, col in dirty_cells:
+        rows_by_col.setdefault(df.columns.get_loc(col), set()).add(df.index.get_loc(idx))
+
+    # Vertical runs: (first_row, last_row) -> [column positions]
+    runs = {}
+    for col_pos, rows in rows_by_col.items():
+        rows = sorted(rows)
+        start = prev = rows[0]
+        for r in rows[1:]:
+            if r != prev + 1:
+                runs.setdefault((start, prev), []).append(col_pos)
+                start = r
+            prev = r
+        runs.setdefault((start, prev), []).append(col_pos)
+
+    # Merge adjacent columns sharing the same run into one block
+    blocks = []
+    for (r0, r1), cols in runs.items():
+        cols.sort()
+        c0 = prev = cols[0]
+        for c in cols[1:]:
+            if c != prev + 1:
+                blocks.append((r0, r1, c0, prev))
+                c0 = c
+            prev = c
+        blocks.append((r0, r1, c0, prev))
+    return sorted(blocks)
+
+
+def dirty_cells_body(sheet_name, df, dirty_cells, first_row=2):
+    """values().batchUpdate body writing only `dirty_cells` (coalesced into A1 ranges).
+    Values are copied out of df, so the body can be sent later from another thread."""
+    data = []
+    for r0, r1, c0, c1 in coalesce_dirty_cells(df, dirty_cells):
+        # Column by column: slicing a mixed-dtype (typed) frame as one block is slow
+        columns = [
+            ["" if pd.isna(v) else v for v in df.iloc[:, c].iloc[r0:r1 + 1].tolist()]
+            for c in range(c0, c1 + 1)
+        ]
+        data.append({
+            "range": f"{sheet_name}!{col_letter(c0 + 1)}{r0 + first_row}:{col_letter(c1 + 1)}{r1 + first_row}",
+            "values": [list(row) for row in zip(*columns)],
+        })
+    return {"valueInputOption": "RAW", "data": data}
+
+
+@run_report.stage("send_sheet_update")
+def send_sheet_update(service, sheet_name, body, cells):
+    """Send a dirty-cells batchUpdate body (1 API call; retried — rewriting the same values is safe)."""
+    size = record_sheets_write(body)
+    run_report.count("send_sheet_update", bytes_sent=size, ranges=len(body["data"]), cells=cells)
+    sheets_retry.call(lambda: service.values().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute(),
+                      reraise=True)
+    print(f"✅ Updated {cells} changed cell(s) in sheet '{sheet_name}' "
+          f"({len(body['data'])} range(s), 1 API call, {size / 1024:.1f} KB sent).")
+
+
+@run_report.stage("update_sheet")
+def update_sheet(service, sheet_name, df, columns_to_update=None, dirty_cells=None, first_row=2):
     """Write a DataFrame back to Google Sheets.
     Update specific columns in a Google Sheet in a single batch update.
     Safely update only specific columns (even non-contiguous ones)
@@ -141,20 +567,26 @@ def update_sheet(service, sheet_name, df, columns_to_update=None):
     Preserves dropdowns, formatting, and reduces write API calls.
     - If columns_to_update is None, updates all columns.
     - Does NOT clear the sheet, so dropdowns and formatting remain intact.
+    - All columns go out in ONE values().batchUpdate request (one range per column).
+    - If dirty_cells is given (set of (row label, column) from set_cells), only those
+      cells are written, coalesced into the minimal set of contiguous A1 ranges.
+    - first_row is the sheet row of df's first row (2 for a whole tab; chunks from
+      iter_sheet_chunks start further down).
     """
 
+    if dirty_cells is not None:
+        if not dirty_cells:
+            print(f"✅ No changed cells — skipping write to sheet '{sheet_name}'.")
+            return
+        send_sheet_update(service, sheet_name, dirty_cells_body(sheet_name, df, dirty_cells, first_row),
+                          len(dirty_cells))
+        return
+
     if columns_to_update is None:
         columns_to_update = df.columns.tolist()
-    print(f"📝 Updating columns individually: {', '.join(columns_to_update)}")
-
-    # Helper to convert column index (1-based) to A, B, ..., AA, AB, etc.
-    def col_letter(n):
-        result = ''
-        while n > 0:
-            n, remainder = divmod(n - 1, 26)
-            result = chr(65 + remainder) + result
-        return result
+    print(f"📝 Updating columns in one batch: {', '.join(columns_to_update)}")
 
+    data = []
     for col in columns_to_update:
         if col not in df.columns:
             print(f"⚠️ Column '{col}' not found in DataFrame — skipping.")
@@ -163,45 +595,67 @@ def update_sheet(service, sheet_name, df, columns_to_update=None):
         col_idx = df.columns.get_loc(col) + 1
         col_letter_str = col_letter(col_idx)
 
-        # Prepare column values (excluding header)
+        # Prepare column values (excluding header), written from row 2 down
         values = [[v] for v in df[col].tolist()]
+        if not values:
+            continue
+        data.append({
+            "range": f"{sheet_name}!{col_letter_str}{first_row}:{col_letter_str}{len(values) + first_row - 1}",
+            "values": values,
+        })
 
-        # Update this column only
-        service.values().update(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{sheet_name}!{col_letter_str}2",  # Start from row 2
-            valueInputOption="RAW",
-            body={"values": values},
-        ).execute()
-        print(f"✅ Column '{col}' updated ({col_letter_str})")
+    if not data:
+        print(f"✅ Nothing to update in sheet '{sheet_name}'.")
+        return
+
+    body = {"valueInputOption": "RAW", "data": data}
+    size = record_sheets_write(body)
+    run_report.count("update_sheet", bytes_sent=size, ranges=len(data))
+    # Retried like send_sheet_update: every column rides on this one call (rewriting is safe)
+    sheets_retry.call(lambda: service.values().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute(),
+                      reraise=True)
 
-    print(f"✅ Partial update completed for sheet '{sheet_name}'.")
+    print(f"✅ Partial update completed for sheet '{sheet_name}' "
+          f"({len(data)} column(s), 1 API call, {size / 1024:.1f} KB sent).")
 
 # -------------------------------------------------------------------
 # 🧠 LLM CALLS
 # -------------------------------------------------------------------
-def call_gemini_with_retry(model, prompt, max_retries=3):
-    """Call Gemini with basic retry/backoff handling."""
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = model.generate_content(prompt)
-            if response and response.text:
-                return response.text
-        except Exception as e:
-            print(f"⚠️ Gemini call failed (attempt {attempt}): {e}")
-            if "429" in str(e):  # rate limit
-                print("⏳ Waiting 60 seconds due to rate limit...")
-                time.sleep(60)
-            else:
-                time.sleep(5)
-    return None
+@run_report.stage("call_gemini_with_retry")
+def call_gemini_with_retry(model, prompt, max_retries=None, generation_config=None):
+    """Call Gemini through the shared retry policy (see retry_policy.py).
+    Every attempt goes through the circuit breaker and the shared rate limiter
+    (requests/minute + in-flight cap). Pass generation_config for structured
+    (JSON schema) output. Returns the response text, or None on failure.
+    """
+    kwargs = {"generation_config": generation_config} if generation_config else {}
+    attempts = 0
+
+    def attempt():
+        nonlocal attempts
+        attempts += 1
+        with gemini_limiter:
+            response = model.generate_content(prompt, **kwargs)
+        if not (response and response.text):
+            raise EmptyResponse("empty Gemini response")
+        return response.text
+
+    text = gemini_retry.call(attempt, max_retries=max_retries)
+    run_report.count("call_gemini_with_retry", prompt_chars=len(prompt), response_chars=len(text or ""),
+                     retries=max(attempts - 1, 0), failed=text is None)
+    return text
 
 
 # -------------------------------------------------------------------
 # 🧩 CLIENT ENRICHMENT
 # -------------------------------------------------------------------
 def extract_client_profile(model, chat_text):
-    """Use Gemini to extract client attributes."""
+    """Use Gemini to extract client attributes (cached by chat text)."""
+    model_name = getattr(model, "model_name", "")
+    cached = llm_cache.get("profile", model_name, chat_text)
+    if cached is not None:
+        return cached
+
     prompt = f"""
 You are a hospitality data analyst. Based on this hotel guest chat:
 
@@ -230,10 +684,16 @@ Respond with **only** JSON (no markdown), e.g.:
     if match:
         clean = match.group(0)
     try:
-        return json.loads(clean)
+        profile = validate_profile(json.loads(clean))
     except json.JSONDecodeError:
         print(f"❌ JSON parse failed for client chat:\n{response}")
         return None
+    if profile is None:
+        # Not cached: a malformed reply would otherwise be served for this chat until the TTL
+        print(f"❌ Profile reply does not match the expected fields for client chat:\n{response}")
+        return None
+    llm_cache.put("profile", model_name, chat_text, profile)
+    return profile
 
 
 def infer_client_category(model, client_type, interests, traits):
@@ -243,6 +703,12 @@ def infer_client_category(model, client_type, interests, traits):
     if not any([client_type, interests, traits]):
         return ""
 
+    model_name = getattr(model, "model_name", "")
+    cache_input = f"{client_type} | {interests} | {traits}"
+    cached = llm_cache.get("category", model_name, cache_input)
+    if cached is not None:
+        return cached
+
     prompt = f"""
     You are a hotel marketing analyst.
     Based on the following client profile, determine a short descriptive Client Category label or a few keywords.
@@ -261,52 +727,500 @@ def infer_client_category(model, client_type, interests, traits):
     clean = response.strip()
     if clean.startswith("```"):
         clean = clean.strip("`").replace("json", "", 1).strip().title()
+    llm_cache.put("category", model_name, cache_input, clean)
     return clean
 
 
+# Response schemas for structured enrichment output
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "client_type": {"type": "string"},
+        "client_interests": {"type": "array", "items": {"type": "string"}},
+        "client_traits": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["client_type", "client_interests", "client_traits"],
+}
+
+ENRICHMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **PROFILE_SCHEMA["properties"],
+        "client_category": {"type": "string"},
+    },
+    "required": PROFILE_SCHEMA["required"] + ["client_category"],
+}
+
+
+def validate_profile(data):
+    """Return a cleaned profile dict, or None if the reply doesn't match PROFILE_SCHEMA."""
+    if not isinstance(data, dict):
+        return None
+
+    client_type = data.get("client_type")
+    if not isinstance(client_type, str) or not client_type.strip():
+        return None
+
+    profile = {"client_type": client_type.strip()}
+    for key in ("client_interests", "client_traits"):
+        value = data.get(key)
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            return None
+        profile[key] = [v.strip() for v in value if v.strip()]
+    return profile
+
+
+def validate_enrichment(data):
+    """Return a cleaned enrichment dict, or None if the reply doesn't match ENRICHMENT_SCHEMA."""
+    profile = validate_profile(data)
+    if not profile:
+        return None
+
+    category = data.get("client_category")
+    if not isinstance(category, str) or not category.strip():
+        return None
+    profile["client_category"] = category.strip()
+    return profile
+
+
+def profile_updates(result):
+    """Map a validated profile/enrichment dict to Clients sheet column values."""
+    updates = {
+        "Client Type": result["client_type"],
+        "Client Interests": ", ".join(result["client_interests"]),
+        "Client Traits": ", ".join(result["client_traits"]),
+    }
+    if "client_category" in result:
+        updates["Client Category"] = result["client_category"]
+    return updates
+
+
+def extract_client_enrichment(model, chat_text):
+    """Use ONE structured Gemini call to extract type, interests, traits and category.
+    Returns a validated dict, or None so the caller can fall back to the two-step path.
+    """
+    model_name = getattr(model, "model_name", "")
+    cached = llm_cache.get("enrichment", model_name, chat_text)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+You are a hospitality data analyst and hotel marketing analyst. Based on this hotel guest chat:
+
+{chat_text}
+
+Identify:
+1. client_type
+2. client_interests (list)
+3. client_traits (list)
+4. client_category: 1–3 short descriptive categories or keywords (comma-separated), e.g. "Leisure, Family, Spa"
+"""
+    response = call_gemini_with_retry(
+        model,
+        prompt,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": ENRICHMENT_SCHEMA,
+        },
+    )
+    if not response:
+        return None
+
+    try:
+        result = validate_enrichment(json.loads(response))
+        llm_cache.put("enrichment", model_name, chat_text, result)
+        return result
+    except json.JSONDecodeError:
+        print(f"❌ JSON parse failed for combined enrichment:\n{response}")
+        return None
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def pack_profile_batches(items, max_clients=PROFILE_BATCH_SIZE, token_budget=PROFILE_BATCH_TOKEN_BUDGET):
+    """Greedily group (client_id, chat_text, ...) items into prompt-sized batches.
+
+    A batch is closed when it reaches max_clients, when the next transcript would
+    exceed token_budget, or when a Client ID repeats (replies are keyed by ID).
+    A transcript larger than the whole budget is sent on its own.
+    """
+    batches, batch, batch_ids, batch_tokens = [], [], set(), 0
+    for item in items:
+        client_id, chat = str(item[0]), item[1]
+        tokens = estimate_tokens(chat) + 20   # per-client framing overhead
+        if batch and (len(batch) >= max_clients
+                      or batch_tokens + tokens > token_budget
+                      or client_id in batch_ids):
+            batches.append(batch)
+            batch, batch_ids, batch_tokens = [], set(), 0
+        batch.append(item)
+        batch_ids.add(client_id)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def extract_client_profiles_batch(model, items, with_category=False):
+    """Use ONE Gemini call to extract profiles for several clients.
+
+    items: list of (client_id, chat_text).
+    Returns {client_id: validated profile} — clients missing or malformed in the
+    reply are simply absent, so the caller can retry them individually.
+    With with_category=True each profile also carries client_category.
+    """
+    schema = ENRICHMENT_SCHEMA if with_category else PROFILE_SCHEMA
+    validate = validate_enrichment if with_category else validate_profile
+    kind = "enrichment" if with_category else "profile"
+    model_name = getattr(model, "model_name", "")
+
+    # Serve cached clients first; only the misses go into the prompt
+    profiles, misses = {}, []
+    for client_id, chat in items:
+        cached = llm_cache.get(kind, model_name, chat)
+        if cached is not None:
+            profiles[str(client_id)] = cached
+        else:
+            misses.append((client_id, chat))
+    if not misses:
+        return profiles
+    items = misses
+    category_line = (
+        '4. client_category: 1–3 short descriptive categories or keywords (comma-separated), e.g. "Leisure, Family, Spa"\n'
+        if with_category else ""
+    )
+
+    transcripts = "\n\n".join(f"### Client ID: {client_id}\n{chat}" for client_id, chat in items)
+    prompt = f"""
+You are a hospitality data analyst. Below are {len(items)} hotel guest chats, each under its Client ID.
+
+{transcripts}
+
+For EACH Client ID identify:
+1. client_type
+2. client_interests (list)
+3. client_traits (list)
+{category_line}
+Respond with a JSON array containing exactly one object per Client ID, with "client_id" copied verbatim.
+"""
+    response = call_gemini_with_retry(
+        model,
+        prompt,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"client_id": {"type": "string"}, **schema["properties"]},
+                    "required": ["client_id"] + schema["required"],
+                },
+            },
+        },
+    )
+    if not response:
+        return profiles
+
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError:
+        print(f"❌ JSON parse failed for batched profiles ({len(items)} clients):\n{response[:500]}")
+        return profiles
+    if not isinstance(data, list):
+        return profiles
+
+    chats = {str(client_id): chat for client_id, chat in items}
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        client_id = str(entry.get("client_id", "")).strip()
+        profile = validate(entry)
+        if client_id in chats and profile and client_id not in profiles:
+            profiles[client_id] = profile
+            llm_cache.put(kind, model_name, chats[client_id], profile)
+    return profiles
+
+
+def enrich_client(analyzer, categorizer, client_id, chat, current, prefetched=None):
+    """Run Step 2A (profile) and Step 2B (category) for a single client.
+
+    Runs on a worker thread, so it never touches the DataFrame — it returns
+    a {column: value} dict that the caller applies on the main thread.
+    `current` holds the row's existing Client Type/Interests/Traits/Category.
+    `prefetched` is a validated profile from a batched prompt (skips Step 2A).
+    """
+    updates = {}
+
+    if prefetched:
+        updates.update(profile_updates(prefetched))
+        if current["Client Category"]:
+            updates.pop("Client Category", None)
+        print(f"✅ {client_id} profile updated (batched).")
+
+    # Combined mode: one structured call when both profile and category are missing
+    elif COMBINED_ENRICHMENT and not current["Client Type"] and not current["Client Category"]:
+        print(f"🔍 Analyzing + categorizing client {client_id} (single call) ...")
+        result = extract_client_enrichment(analyzer, chat)
+        if result:
+            updates.update(profile_updates(result))
+            print(f"🏷️ {client_id} profile updated, category: {result['client_category']}")
+            return updates
+        print(f"⚠️ {client_id} combined reply failed validation — falling back to two-step path.")
+
+    # Step 2A: Extract Type, Interests, Traits (LLM #1)
+    if not current["Client Type"] and not prefetched:
+        print(f"🔍 Analyzing client {client_id} ...")
+        profile = extract_client_profile(analyzer, chat)
+        if profile:
+            updates["Client Type"] = profile.get("client_type", "")
+            updates["Client Interests"] = ", ".join(profile.get("client_interests", []))
+            updates["Client Traits"] = ", ".join(profile.get("client_traits", []))
+            print(f"✅ {client_id} profile updated.")
+        else:
+            print(f"⚠️ {client_id} profile could not be parsed.")
+
+    # Step 2B: Infer Category (LLM #2)
+    if not current["Client Category"] and "Client Category" not in updates:
+        client_type = updates.get("Client Type", current["Client Type"])
+        interests = updates.get("Client Interests", current["Client Interests"])
+        traits = updates.get("Client Traits", current["Client Traits"])
+        print(f"🧩 Inferring category for {client_id} ...")
+        category = infer_client_category(categorizer, client_type, interests, traits)
+        updates["Client Category"] = category
+        print(f"🏷️ {client_id} category: {category}")
+
+    return updates
+
+
+def enrich_client_batch(analyzer, categorizer, batch):
+    """Enrich a packed batch of clients with one batched profile prompt.
+
+    batch: list of (idx, client_id, chat, current).
+    Clients missing or malformed in the batched reply are retried individually.
+    Returns a list of (idx, updates).
+    """
+    print(f"📦 Analyzing {len(batch)} clients in one batched prompt ...")
+    profiles = extract_client_profiles_batch(
+        analyzer,
+        [(client_id, chat) for _, client_id, chat, _ in batch],
+        with_category=COMBINED_ENRICHMENT,
+    )
+    missing = len(batch) - len(profiles)
+    if missing:
+        print(f"⚠️ {missing}/{len(batch)} clients missing or malformed in batched reply — retrying individually.")
+
+    return [
+        (idx, enrich_client(analyzer, categorizer, client_id, chat, current,
+                            prefetched=profiles.get(str(client_id))))
+        for idx, client_id, chat, current in batch
+    ]
+
+
+@run_report.stage("enrich_clients")
+def enrich_clients(df_clients, analyzer, categorizer, checkpoint, dirty, rows=None, journal=None):
+    """Fill missing client profiles/categories with a pool of Gemini workers.
+
+    - Concurrency is bounded by GEMINI_MAX_IN_FLIGHT and the call rate by the
+      shared token bucket (GEMINI_REQUESTS_PER_MINUTE) — no fixed sleeps.
+    - With PROFILE_BATCH_SIZE > 1, clients that need a profile are packed into
+      batched prompts (PROFILE_BATCH_TOKEN_BUDGET); one job per batch.
+    - Results are applied to df_clients as they complete, with set_cells (changed
+      cells are recorded in `dirty`), and `checkpoint()` is called after every BATCH_SIZE
+      enriched clients (and once at the end).
+    - `rows` (optional set of row labels) limits the work to those rows, e.g. the
+      new/changed rows of an incremental run.
+    - `journal` (EnrichmentJournal): every finished result is journaled before it is
+      applied; clients already in the journal (an interrupted run) are replayed from it
+      without calling Gemini.
+    """
+    backend_columns = ["Client Type", "Client Interests", "Client Traits", "Client Category"]
+
+    candidates = df_clients if rows is None else df_clients.loc[sorted(rows)]
+
+    # Vectorized pre-filter with the same rules as the loop below: iterrows() copies every
+    # cell of the rows it visits, so only visit rows with a chat and a missing type/category
+    def filled(col):
+        if col not in candidates.columns:
+            return np.zeros(len(candidates), dtype=bool)
+        return np.array(non_blank(candidates[col]), dtype=bool)
+    candidates = candidates[filled("Chat Text") & ~(filled("Client Type") & filled("Client Category"))]
+
+    pending = []
+    journal_keys = {}
+    replayed = []
+    for idx, row in candidates.iterrows():
+        chat = str(row.get("Chat Text", "")).strip()
+        if not chat:
+            continue
+        current = {col: str(row.get(col, "")).strip() for col in backend_columns}
+        if current["Client Type"] and current["Client Category"]:
+            continue
+        client_id = row.get("Client ID", f"C{idx+1}")
+        if journal is not None:
+            journal_keys[idx] = journal_key(client_id, chat)
+            updates = journal.get(journal_keys[idx])
+            if updates:
+                replayed.append((idx, updates))
+                continue
+        pending.append((idx, client_id, chat, current))
+
+    def apply(results):
+        # Apply finished updates column by column (bulk assignment)
+        columns = {}
+        for idx, updates in results:
+            for col, value in updates.items():
+                columns.setdefault(col, {})[idx] = value
+        for col, values in columns.items():
+            set_cells(df_clients, dirty, col, pd.Series(values, dtype=object))
+
+    run_report.count("enrich_clients", clients=len(pending), replayed=len(replayed))
+    if replayed:
+        print(f"📓 Resuming {len(replayed)} client(s) from the journal (no Gemini calls).")
+        apply(replayed)
+        if not pending:
+            checkpoint()
+
+    if not pending:
+        if not replayed:
+            print("✅ All clients already enriched — no Gemini calls needed.")
+        return
+
+    print(f"🚀 Enriching {len(pending)} client(s) with {GEMINI_MAX_IN_FLIGHT} worker(s) "
+          f"at ≤{GEMINI_REQUESTS_PER_MINUTE} requests/min...")
+
+    started = time.monotonic()
+    calls_before = gemini_limiter.calls
+    done = 0
+    next_checkpoint = BATCH_SIZE
+
+    def enrich_one(idx, client_id, chat, current):
+        return [(idx, enrich_client(analyzer, categorizer, client_id, chat, current))]
+
+    with ThreadPoolExecutor(max_workers=GEMINI_MAX_IN_FLIGHT) as pool:
+        futures = {}
+        if PROFILE_BATCH_SIZE > 1:
+            needs_profile = [item for item in pending if not item[3]["Client Type"]]
+            category_only = [item for item in pending if item[3]["Client Type"]]
+            for batch in pack_profile_batches([item[1:] + (item,) for item in needs_profile]):
+                rows = [item[-1] for item in batch]
+                if len(rows) == 1:
+                    futures[pool.submit(enrich_one, *rows[0])] = rows
+                else:
+                    futures[pool.submit(enrich_client_batch, analyzer, categorizer, rows)] = rows
+        else:
+            category_only = pending
+        for item in category_only:
+            futures[pool.submit(enrich_one, *item)] = [item]
+
+        handled = set()
+        try:
+            for future in as_completed(futures):
+                handled.add(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    rows = ", ".join(str(item[0] + 1) for item in futures[future])
+                    print(f"❌ Enrichment failed for row(s) {rows}: {e}")
+                    results = []
+
+                # Durable first (a crash after this point never costs these Gemini calls again), then apply
+                if journal is not None:
+                    journal.append([(journal_keys[idx], updates) for idx, updates in results])
+                apply(results)
+
+                done += len(futures[future])
+                if done >= next_checkpoint or done == len(pending):
+                    print(f"\n🔹 Checkpoint after {done}/{len(pending)} clients...")
+                    checkpoint()
+                    next_checkpoint = (done // BATCH_SIZE + 1) * BATCH_SIZE
+        except BaseException:
+            # A failed checkpoint (or Ctrl-C) ends the run: drop the queued Gemini calls, but journal
+            # the answers still in flight so the next run resumes from them instead of paying again
+            pool.shutdown(wait=True, cancel_futures=True)
+            if journal is not None:
+                leftovers = [
+                    (journal_keys[idx], updates)
+                    for future in futures
+                    if future not in handled and not future.cancelled() and future.exception() is None
+                    for idx, updates in future.result()
+                ]
+                try:
+                    journal.append(leftovers)
+                except Exception as e:
+                    print(f"⚠️ Could not journal {len(leftovers)} finished enrichment(s): {e}")
+            raise
+
+    elapsed = time.monotonic() - started
+    calls = gemini_limiter.calls - calls_before
+    per_min = 60.0 / elapsed if elapsed > 0 else 0.0
+    print(f"⚡ Enriched {done} client(s) with {calls} Gemini call(s) in {elapsed:.1f}s "
+          f"({done * per_min:.1f} clients/min, {calls * per_min:.1f} calls/min, "
+          f"{gemini_limiter.wait_seconds:.1f}s waiting on the rate limiter).")
+    gemini_retry.report()
+
+
 # -------------------------------------------------------------------
 # 🎯 CAMPAIGN LOGIC
 # -------------------------------------------------------------------
-def generate_campaign_id(existing_ids):
-    pattern = re.compile(r"CMP-(\d+)")
-    nums = [int(pattern.search(cid).group(1)) for cid in existing_ids if pattern.search(cid)]
-    next_id = max(nums) + 1 if nums else 1
-    return f"CMP-{next_id:04d}"
+def next_campaign_number(existing_ids):
+    """First free CMP-#### number after every existing ID (start of the running ID counter)."""
+    nums = pd.Series(existing_ids, dtype=object).astype(str).str.extract(r"CMP-(\d+)", expand=False).dropna()
+    return int(nums.astype(int).max()) + 1 if len(nums) else 1
 
 
-def find_matching_clients(df_clients, target_category):
+@run_report.stage("build_category_index")
+def build_category_index(df_clients):
     """
-    Match clients exactly the same way as Google Apps Script:
+    Build an inverted index {category token: [row positions]} from 'Client Category',
+    tokenized exactly the same way as Google Apps Script:
     - Split client categories by commas
     - Trim whitespace
     - Lowercase tokens
-    - Campaign category must match one whole token exactly
+    Built once per run and shared by find_matching_clients() and invoke_message_service().
     """
-    if not target_category:
-        return pd.DataFrame()
+    index = {}
+    if "Client Category" not in df_clients.columns:
+        return index
 
-    campaign_category = target_category.strip().lower()
+    for pos, value in enumerate(df_clients["Client Category"].tolist()):
+        raw_client_cat = str(value).strip().lower()
+        if not raw_client_cat:
+            continue
+        # GAS logic: split by commas only (a token is counted once per client)
+        for token in {t.strip() for t in raw_client_cat.split(",") if t.strip()}:
+            index.setdefault(token, []).append(pos)
+    return index
 
-    matched_rows = []
 
-    for _, row in df_clients.iterrows():
-        raw_client_cat = str(row.get("Client Category", "")).strip().lower()
+def count_matching_clients(category_index, target_category):
+    """Audience size for a campaign category (exact token match) without building a DataFrame."""
+    if not target_category:
+        return 0
+    return len(category_index.get(target_category.strip().lower(), []))
 
-        if not raw_client_cat:
-            continue
 
-        # GAS logic: split by commas only
-        client_tokens = [
-            token.strip()
-            for token in raw_client_cat.split(",")
-            if token.strip()
-        ]
+@run_report.stage("find_matching_clients")
+def find_matching_clients(df_clients, target_category, category_index=None):
+    """
+    Match clients exactly the same way as Google Apps Script:
+    - Split client categories by commas
+    - Trim whitespace
+    - Lowercase tokens
+    - Campaign category must match one whole token exactly
+    Pass a prebuilt category_index (see build_category_index) to avoid rescanning df_clients.
+    """
+    if not target_category:
+        return pd.DataFrame()
 
-        # exact token match
-        if campaign_category in client_tokens:
-            matched_rows.append(row)
+    if category_index is None:
+        category_index = build_category_index(df_clients)
 
-    return pd.DataFrame(matched_rows)
+    positions = category_index.get(target_category.strip().lower(), [])
+    run_report.count("find_matching_clients", matched=len(positions))
+    return df_clients.iloc[positions]
 
 # Add Message Template & Message Send Timing columns based on Campaign Message Count
 def add_message_templates(sheets, df_campaigns):
@@ -374,6 +1288,7 @@ def add_message_templates(sheets, df_campaigns):
 
         # Update the header row safely (entire first row) in Google Sheets
         header_values = [df_campaigns.columns.tolist()]
+        record_sheets_write({"values": header_values})
         sheets.values().update(
             spreadsheetId=spreadsheet_id,
             range=f"{sheet_name}!1:1",  # entire header row
@@ -396,7 +1311,8 @@ def add_message_templates(sheets, df_campaigns):
         print("✅ All required message template/timing columns already exist — no changes made.")
 
 # Invoke Message Services based on Message Templates/Timings
-def invoke_message_service(sheets, df_campaigns):
+@run_report.stage("invoke_message_service")
+def invoke_message_service(sheets, df_campaigns, df_clients=None, category_index=None):
     """
     Simulates invoking an external SMS (or message) sending service for all ACTIVE/UPCOMING campaigns
     that have a Campaign Message Count > 0.
@@ -408,6 +1324,8 @@ def invoke_message_service(sheets, df_campaigns):
     Args:
         sheets: Google Sheets API service object
         df_campaigns: DataFrame of the Campaigns sheet
+        df_clients: DataFrame of the Clients sheet (read from the sheet if not given)
+        category_index: prebuilt build_category_index(df_clients), shared with the campaign pass
     """
 
     print("\n📣 Checking campaigns for message service invocation...")
@@ -418,12 +1336,14 @@ def invoke_message_service(sheets, df_campaigns):
             print(f"⚠️ Missing column '{col}' — skipping message service trigger.")
             return
 
-    # Read Clients sheet once
-    try:
-        df_clients = read_sheet(sheets, CLIENTS_SHEET)
-    except Exception as e:
-        print(f"❌ Could not read Clients sheet: {e}")
-        return
+    # Read Clients sheet once (unless the caller already has it)
+    if df_clients is None:
+        try:
+            df_clients = read_sheet(sheets, CLIENTS_SHEET)
+        except Exception as e:
+            print(f"❌ Could not read Clients sheet: {e}")
+            return
+        category_index = None
 
     if df_clients.empty or "Client Category" not in df_clients.columns or "Client Phone" not in df_clients.columns:
         print("⚠️ Missing 'Client Category' or 'Client Phone' column in Clients sheet.")
@@ -441,6 +1361,9 @@ def invoke_message_service(sheets, df_campaigns):
 
     print(f"📢 Found {len(valid_campaigns)} eligible campaign(s) for message triggering.\n")
 
+    if category_index is None:
+        category_index = build_category_index(df_clients)
+
     # Loop through campaigns and simulate sending
     for _, row in valid_campaigns.iterrows():
         campaign_id = str(row.get("Campaign ID", "")).strip()
@@ -451,19 +1374,20 @@ def invoke_message_service(sheets, df_campaigns):
             print(f"⚠️ Campaign {campaign_id} missing Target Client Category — skipping.")
             continue
 
-        # --- Find matching clients ---
-        matched_clients = df_clients[
-            df_clients["Client Category"].astype(str).str.lower().apply(lambda cat: any(word in cat for word in target_category.split()))
-        ]
+        # --- Find matching clients (exact token match, same as the campaign pass) ---
+        matched_clients = find_matching_clients(df_clients, target_category, category_index)
 
         if matched_clients.empty:
             print(f"⚠️ No clients matched for campaign {campaign_id} (category: {target_category}).")
             continue
 
         phones = matched_clients["Client Phone"].dropna().unique().tolist() if "Client Phone" in matched_clients.columns else []
+        # Typed reads may return phone numbers as numbers
+        phones = [str(p).strip() for p in phones if str(p).strip()]
         print(f"📞 Found {len(phones)} phone(s) for campaign {campaign_id}: "f"{', '.join(phones[:3])}{'...' if len(phones) > 3 else ''}")
 
         emails = matched_clients["Client Email"].dropna().unique().tolist() if "Client Email" in matched_clients.columns else []
+        emails = [str(e).strip() for e in emails if str(e).strip()]
         print(f"📧 Found {len(emails)} email(s) for campaign {campaign_id}: "f"{', '.join(emails[:3])}{'...' if len(emails) > 3 else ''}")
         # print("\n")
 
@@ -479,7 +1403,10 @@ def invoke_message_service(sheets, df_campaigns):
             timing_value = row.get(timing_col, "")
             msg_timing = None
 
-            if pd.notna(timing_value) and str(timing_value).strip():
+            if sheet_time(timing_value) is not None:
+                # Typed time cell (serial day fraction)
+                msg_timing = sheet_time(timing_value)
+            elif pd.notna(timing_value) and str(timing_value).strip():
                 time_str = str(timing_value).strip()
                 try:
                     # Try several common time formats
@@ -515,9 +1442,11 @@ def invoke_message_service(sheets, df_campaigns):
             
                 try:
                     trigger_sms(msg_body, msg_from, msg_to, msg_timing)
+                    run_report.count("invoke_message_service", sms_sent=1)
                     print(f"   ✅ Message {i}/{msg_count} sent successfully for {campaign_id} at {msg_timing}")
                 except Exception as e:
                     print(f"   ❌ Failed to send message {i}/{msg_count} — {e}")
+                    run_report.count("invoke_message_service", failed=1)
                 
                 # ----- WhatsApp -----
 
@@ -528,9 +1457,11 @@ def invoke_message_service(sheets, df_campaigns):
 
                 try:
                     trigger_whatsapp_msg(msg_body, msg_from, msg_to, msg_timing)
+                    run_report.count("invoke_message_service", whatsapp_sent=1)
                     print(f"   ✅ Message {i}/{msg_count} sent successfully for {campaign_id} at {msg_timing}")
                 except Exception as e:
                     print(f"   ❌ Failed to send message {i}/{msg_count} — {e}")
+                    run_report.count("invoke_message_service", failed=1)
 
             for email in emails:
             
@@ -544,9 +1475,11 @@ def invoke_message_service(sheets, df_campaigns):
                 
                 try:
                     trigger_email(msg_body, msg_from, msg_to, mail_sub, msg_timing)
+                    run_report.count("invoke_message_service", emails_sent=1)
                     print(f"   ✅ Email {i}/{msg_count} sent successfully for {campaign_id} at {msg_timing}")
                 except Exception as e:
                     print(f"   ❌ Failed to send email {i}/{msg_count} — {e}")
+                    run_report.count("invoke_message_service", failed=1)
 
     print("\n✅ Message service invocation process completed.")
     print("#"*100,'\n')
@@ -555,12 +1488,130 @@ def invoke_message_service(sheets, df_campaigns):
 # -------------------------------------------------------------------
 # 🚀 MAIN PROCESS
 # -------------------------------------------------------------------
-def process_clients_and_campaigns():
+@run_report.stage("refresh_campaigns")
+def refresh_campaigns(df_campaigns, campaign_rows, df_clients, category_index, now, dirty):
+    """Assign missing Campaign IDs and recompute Campaign Status / Target Customers Count
+    for the rows in `campaign_rows`. Changed cells are recorded in `dirty`.
+    Returns {row label: next Start/End boundary or None} for every processed campaign.
+
+    Column-at-a-time: dates are parsed per column (see sheet_datetimes), statuses come
+    from vectorized comparisons and new IDs from one running counter.
+    """
+    if campaign_rows.empty:
+        return {}
+
+    def text(col):
+        if col not in campaign_rows.columns:
+            return pd.Series("", index=campaign_rows.index)
+        column = campaign_rows[col].astype(object)
+        return column.where(column.notna(), "").astype(str).str.strip()
+
+    campaign_ids = text("Campaign ID")
+    target_category = text("Target Client Category")
+    start_raw, end_raw = text("Start Date-Time"), text("End Date-Time")
+
+    # ✅ Keep this early skip — still fits perfectly
+    for idx in target_category.index[target_category == ""]:
+        print(f"⚠️ Skipping row {idx+1} — no Target Client Category.")
+
+    # Skip incomplete campaign rows
+    complete = (text("Campaign Text") != "") & (target_category != "") & (start_raw != "") & (end_raw != "")
+    if not complete.any():
+        return {}
+
+    # Parse date-times for the whole column: serial numbers (typed date cells), ISO text in bulk,
+    # anything else dateutil understands (✅ 1 Nov 2025 9:00, ✅ Nov 1, 2025 9am, ...)
+    start_dt = sheet_datetimes(campaign_rows.loc[complete, "Start Date-Time"])
+    end_dt = sheet_datetimes(campaign_rows.loc[complete, "End Date-Time"])
+    parsed = start_dt.notna() & end_dt.notna()
+    for idx in parsed.index[~parsed]:
+        print(f"⚠️ Could not parse date-time for campaign at row {idx+1}.")
+    rows = parsed.index[parsed]
+    if rows.empty:
+        return {}
+    start_dt, end_dt = start_dt[rows], end_dt[rows]
+
+    # === Step 1: Auto-generate Campaign IDs from one running counter ===
+    missing_ids = rows[(campaign_ids[rows] == "").to_numpy()]
+    if len(missing_ids):
+        first = next_campaign_number(df_campaigns["Campaign ID"].dropna().tolist())
+        new_ids = pd.Series([f"CMP-{n:04d}" for n in range(first, first + len(missing_ids))], index=missing_ids)
+        ## "Campaign ID" is updated here ##
+        set_cells(df_campaigns, dirty, "Campaign ID", new_ids)
+        campaign_ids[missing_ids] = new_ids
+        print(f"🆔 Assigned {len(new_ids)} Campaign ID(s): {new_ids.iloc[0]} – {new_ids.iloc[-1]}")
+
+    # === Step 2: Determine Campaign Status based on current time ===
+    now = pd.Timestamp(now)
+    new_status = pd.Series(np.select(
+        [(start_dt <= now) & (now < end_dt), now >= end_dt, start_dt > now],
+        ["ACTIVE", "INACTIVE", "UPCOMING"],
+        default="",
+    ), index=rows)
+    boundary = start_dt.where(now < start_dt, end_dt.where(now < end_dt))
+
+    # === Step 3: Audience size, only for ACTIVE or UPCOMING campaigns ===
+    live = rows[new_status.isin(["ACTIVE", "UPCOMING"]).to_numpy()]
+    if len(live):
+        if category_index is None:
+            category_index = build_category_index(df_clients)
+        counts = pd.Series(
+            [count_matching_clients(category_index, target) for target in target_category[live]],
+            index=live, dtype=object,
+        )
+        ## "Target Customers Count" is updated here ##
+        set_cells(df_campaigns, dirty, "Target Customers Count", counts)
+        for idx in live:
+            print(f"🎯 {campaign_ids[idx]} — Target '{target_category[idx]}' matched {counts[idx]} clients.")
+    for idx in rows.difference(live, sort=False):
+        print(f"⏸️ Skipping {campaign_ids[idx]} — status {new_status[idx] or 'UNKNOWN'} (no update).")
+
+    # === Step 4: Update Campaign Status ===
+    changed = rows[(text("Campaign Status")[rows].str.upper() != new_status).to_numpy()]
+    ## "Campaign Status" is updated here ##
+    set_cells(df_campaigns, dirty, "Campaign Status", new_status[changed])
+    for idx in changed:
+        print(f"📅 {campaign_ids[idx]} status set to {new_status[idx]}")
+
+    return {idx: (None if pd.isna(b) else b.to_pydatetime()) for idx, b in boundary.items()}
+
+
+def category_tokens(value):
+    """GAS-style tokens of a 'Client Category' value (comma split, trimmed, lowercase)."""
+    return {t.strip() for t in str(value).strip().lower().split(",") if t.strip()}
+
+
+def select_campaigns(df_campaigns, campaign_keys, campaign_hashes, previous_campaigns, affected_tokens, now):
+    """Row labels of the campaigns an incremental run has to (re)process: rows that are new or
+    edited since the last run, rows whose saved Start/End boundary has passed by `now`, and rows
+    whose Target Client Category is one of `affected_tokens`."""
+    selected = set()
+    for idx, key in campaign_keys.items():
+        previous = previous_campaigns.get(key)
+        boundary = parse_boundary(previous[1]) if previous else None
+        target = str(df_campaigns.at[idx, "Target Client Category"]).strip().lower() \
+            if "Target Client Category" in df_campaigns.columns else ""
+        if (previous is None or previous[0] != campaign_hashes[idx]
+                or (boundary and boundary <= now)
+                or target in affected_tokens):
+            selected.add(idx)
+    return selected
+
+
+def process_clients_and_campaigns(full=False):
     """
     Processes client chat data and campaign details using Gemini LLM.
     Adds:
     1. Smart change detection (writes only if new/changed data)
     2. Skips reprocessing already analyzed clients
+    3. Incremental mode (INCREMENTAL_MODE): only rows new/changed since the last
+       successful run are enriched/recounted, plus campaigns whose status boundary
+       has just passed. full=True (--full) ignores the saved watermark.
+    4. Streaming Clients reads (CLIENTS_READ_WINDOW): the tab is enriched window by
+       window and transcripts are dropped once their window is done.
+    5. Pipelined stages (PIPELINED_RUN): the next window is read while the current one is
+       enriched, and checkpoint writes go out on a background writer. Finished enrichments
+       are journaled first (JOURNAL_FILE), so an interrupted run resumes without Gemini calls.
     """
     sheets = init_google_sheets()
 
@@ -568,212 +1619,194 @@ def process_clients_and_campaigns():
     gemini_client_analyzer = init_gemini()      # extracts type, interests, traits
     gemini_client_categorizer = init_gemini()   # infers category
     print("✅ Initialized Gemini instances.")
-
-    # === STEP 1: Read Clients sheet ===
-    df_clients = read_sheet(sheets, CLIENTS_SHEET)
-    for col in ["Client Type", "Client Interests", "Client Traits", "Client Category"]:
-        if col not in df_clients.columns:
-            df_clients[col] = ""
-
-    total_clients = len(df_clients)
-    print(f"🧾 Found {total_clients} clients in '{CLIENTS_SHEET}'.")
+    if os.getenv("CLOUD_RUN_JOB") and not STATE_DIR:
+        print("⚠️ STATE_DIR is not set — files kept between runs (enrichment cache, run state, "
+              "journal) are lost when this Cloud Run execution ends.")
+
+    # === Incremental mode: compare row fingerprints with the last successful run ===
+    run_state = load_run_state(RUN_STATE_FILE) if (INCREMENTAL_MODE and not full) else empty_run_state()
+    incremental = run_state["last_run"] is not None
+    previous_clients = run_state["clients"]
+    if incremental:
+        print(f"♻️ Incremental run since {run_state['last_run']}.")
+    else:
+        print("🔁 Full run: processing every row.")
+
+    # === STEP 1: Read the sheets ===
+    # CLIENTS_READ_WINDOW > 0: Clients is paged (iter_sheet_chunks) and each window is enriched
+    # before the next one is read; otherwise both tabs come from one batchGet.
+    if CLIENTS_READ_WINDOW > 0:
+        df_campaigns = read_sheet(sheets, CAMPAIGNS_SHEET)
+        if PIPELINED_RUN:
+            # Reader stage: the next window is fetched on its own thread while this one is enriched
+            client_chunks = prefetch(iter_sheet_chunks(sheets_worker_service(sheets), CLIENTS_SHEET,
+                                                       CLIENTS_READ_WINDOW), PREFETCH_WINDOWS)
+        else:
+            client_chunks = iter_sheet_chunks(sheets, CLIENTS_SHEET, CLIENTS_READ_WINDOW)
+    else:
+        frames = read_sheets(sheets, [CLIENTS_SHEET, CAMPAIGNS_SHEET])
+        df_campaigns = frames[CAMPAIGNS_SHEET]
+        client_chunks = [frames.pop(CLIENTS_SHEET)]
     print("#"*100)
 
-    # === STEP 2: Fill missing client profiles ===
-    for start in range(0, total_clients, BATCH_SIZE):
-        batch = df_clients.iloc[start:start + BATCH_SIZE]
-        print(f"\n🔹 Processing batch {start // BATCH_SIZE + 1} ({len(batch)} clients)...")
+    # === STEP 2: Fill missing client profiles, one chunk at a time ===
+    # Select columns that backend manages
+    backend_columns = ["Client Type", "Client Interests", "Client Traits", "Client Category"]
+
+    seen_client_ids = {}        # duplicate-ID suffixes across chunks (see row_keys)
+    client_keys_seen = set()
+    clients_state = {}          # incremental watermark entries for the Clients tab
+    affected_tokens = set()     # category tokens whose audience may have changed
+    changed_count = 0
+    kept_chunks = []
+
+    # Finished enrichments of this (or an interrupted earlier) run
+    journal = EnrichmentJournal(JOURNAL_FILE, enabled=JOURNAL_ENABLED)
+    # Writer stage: checkpoint writes are sent in order on a background thread
+    writer = None
+    if PIPELINED_RUN:
+        writer_sheets = sheets_worker_service(sheets)
+        writer = BackgroundWriter(lambda job: send_sheet_update(writer_sheets, *job), WRITE_QUEUE_SIZE)
+
+    def enrich_chunk(chunk):
+        nonlocal changed_count
+        ensure_columns(chunk, backend_columns)
+        keys = row_keys(chunk, "Client ID", seen_client_ids)
+        client_keys_seen.update(keys.values())
+        if incremental:
+            hashes = row_fingerprints(chunk)
+            changed = {idx for idx, key in keys.items() if previous_clients.get(key, [None])[0] != hashes[idx]}
+            changed_count += len(changed)
+        else:
+            changed = None
+
+        # Cells changed by the backend since the last write: {(row label, column)}
+        dirty_clients = set()
+
+        # Fingerprint of each row's backend columns as currently stored in the sheet
+        # (taken from the initial read; refreshed after every write — no re-reads needed)
+        sheet_snapshot = row_fingerprints(chunk, backend_columns)
+
+        def checkpoint():
+            # After you process a batch of BATCH_SIZE clients
+            print("🔍 Checking for updates in Clients sheet...")
+
+            # Keep only rows whose backend columns now differ from the sheet snapshot
+            touched = {idx for idx, _ in dirty_clients}
+            current = row_fingerprints(chunk.loc[sorted(touched)], backend_columns) if touched else {}
+            changed_rows = {idx for idx, digest in current.items() if digest != sheet_snapshot.get(idx)}
+            changed_cells = {(idx, col) for idx, col in dirty_clients if idx in changed_rows}
+
+            if changed_cells:
+                print(f"💾 Changes found in {len(changed_rows)} row(s) — updating Clients sheet...")
+                # ✅ Write only the cells that changed since the last checkpoint
+                if writer:
+                    body = dirty_cells_body(CLIENTS_SHEET, chunk, changed_cells, first_row=chunk.index[0] + 2)
+                    writer.submit((CLIENTS_SHEET, body, len(changed_cells)))
+                else:
+                    update_sheet(sheets, CLIENTS_SHEET, chunk, dirty_cells=changed_cells,
+                                 first_row=chunk.index[0] + 2)
+                sheet_snapshot.update({idx: current[idx] for idx in changed_rows})
+            else:
+                print("✅ No new client updates — skipping Clients sheet write.")
+            dirty_clients.clear()
+
+        enrich_clients(chunk, gemini_client_analyzer, gemini_client_categorizer, checkpoint, dirty_clients,
+                       rows=changed, journal=journal)
+
+        # Watermark entries + affected audiences, while the chunk still has its transcripts
+        final_hashes = row_fingerprints(chunk)
+        has_chat = non_blank(chunk["Chat Text"]) if "Chat Text" in chunk.columns else [False] * len(chunk)
+        for idx, chat, client_type, category in zip(chunk.index, has_chat, chunk["Client Type"].tolist(),
+                                                    chunk["Client Category"].tolist()):
+            if changed is not None and idx in changed:
+                affected_tokens.update(category_tokens(category))
+                affected_tokens.update(category_tokens(previous_clients.get(keys[idx], [None, ""])[1]))
+            # Rows still waiting for enrichment stay out, so the next run retries them
+            if chat and not (str(client_type).strip() and str(category).strip()):
+                continue
+            clients_state[keys[idx]] = [final_hashes[idx], str(category)]
 
-        for idx, row in batch.iterrows():
-            client_id = row.get("Client ID", f"C{idx+1}")
-            chat = str(row.get("Chat Text", "")).strip()
+        # Transcripts are no longer needed — release them before the next chunk is read
+        return chunk.drop(columns=["Chat Text"], errors="ignore")
 
-            if not chat:
-                continue
+    enriched = False
+    try:
+        for chunk in client_chunks:
+            if CLIENTS_READ_WINDOW > 0:
+                print(f"📄 Clients rows {chunk.index[0] + 2}–{chunk.index[-1] + 2}: {len(chunk)} row(s).")
+            kept_chunks.append(enrich_chunk(chunk))
+            del chunk
+        enriched = True
+    finally:
+        client_chunks = None
+        journal.close()
+        if writer:
+            # Drain queued checkpoint writes (also when enrichment failed — finished work still lands)
+            try:
+                writer.close()
+            except Exception:
+                if enriched:
+                    raise
+                # Already logged by the writer; the enrichment error that is propagating wins
+            print(f"💾 Background writer sent {writer.sent} Clients update(s).")
+    if journal.appended or journal.replayed:
+        print(f"📓 Journal: {journal.appended} enrichment(s) recorded, {journal.replayed} replayed.")
+
+    df_clients = pd.concat(kept_chunks) if kept_chunks else pd.DataFrame(columns=backend_columns)
+    del kept_chunks
+    if COMPACT_FRAMES:
+        # Chunks carry their own category sets; concat falls back to object — re-categorize once
+        for col in CATEGORY_COLUMNS:
+            if col in df_clients.columns and df_clients[col].dtype == object:
+                df_clients[col] = df_clients[col].astype("category")
 
-            # Step 2A: Extract Type, Interests, Traits (LLM #1)
-            if not row.get("Client Type", "").strip():
-                print(f"🔍 Analyzing client {client_id} ...")
-                profile = extract_client_profile(gemini_client_analyzer, chat)
-                if profile:
-                    df_clients.at[idx, "Client Type"] = profile.get("client_type", "")
-                    df_clients.at[idx, "Client Interests"] = ", ".join(profile.get("client_interests", []))
-                    df_clients.at[idx, "Client Traits"] = ", ".join(profile.get("client_traits", []))
-                    print(f"✅ {client_id} profile updated.")
-                else:
-                    print(f"⚠️ {client_id} profile could not be parsed.")
-                time.sleep(REQUEST_DELAY)
-
-            # Step 2B: Infer Category (LLM #2)
-            if not row.get("Client Category", "").strip():
-                client_type = df_clients.at[idx, "Client Type"]
-                interests = df_clients.at[idx, "Client Interests"]
-                traits = df_clients.at[idx, "Client Traits"]
-                print(f"🧩 Inferring category for {client_id} ...")
-                category = infer_client_category(gemini_client_categorizer, client_type, interests, traits)
-                df_clients.at[idx, "Client Category"] = category
-                print(f"🏷️ {client_id} category: {category}")
-                time.sleep(REQUEST_DELAY)
-
-        # After you process all client batches
-        print("🔍 Checking for updates in Clients sheet...")
-
-        # Read the current Clients sheet (before update)
-        existing_clients = read_sheet(sheets, CLIENTS_SHEET)
-
-        # Select columns that backend manages
-        backend_columns = ["Client Type", "Client Interests", "Client Traits", "Client Category"]
-
-        # Compare only if both DataFrames have matching shape and headers
-        has_changes = False
-        if not existing_clients.empty and all(col in existing_clients.columns for col in backend_columns):
-            for col in backend_columns:
-                old_values = existing_clients[col].astype(str).fillna("").tolist()
-                new_values = df_clients[col].astype(str).fillna("").tolist()
-                if old_values != new_values:
-                    has_changes = True
-                    print(f"🟡 Detected updates in column: {col}")
-                    break       
-        
-        if has_changes:
-            print("💾 Changes found — updating Clients sheet...")
-            # print("#"*50)
-        else:
-            print("✅ No new client updates — skipping Clients sheet write.")
-            # print("#"*50)
-            backend_columns = []
-            # Reset clientsInfoUpdated flag
-            clientsInfoUpdated = False
-
-        # ✅ Update only if backend_columns is not empty
-        if backend_columns:        
-            # Set clientsInfoUpdated flag
-            clientsInfoUpdated = True
-            update_sheet(sheets, CLIENTS_SHEET, df_clients,
-                         columns_to_update=backend_columns)
+    total_clients = len(df_clients)
+    print(f"🧾 Found {total_clients} clients in '{CLIENTS_SHEET}'.")
+    removed_clients = set(previous_clients) - client_keys_seen if incremental else set()
+    for key in removed_clients:
+        affected_tokens |= category_tokens(previous_clients[key][1])
+    if incremental:
+        print(f"♻️ {changed_count} new/changed, {len(removed_clients)} removed client row(s) since the last run.")
     print("#"*100)
 
-    # === STEP 3: Process Campaigns sheet ===
-    df_campaigns = read_sheet(sheets, CAMPAIGNS_SHEET)
-
+    # === STEP 3: Process Campaigns sheet (already read in STEP 1) ===
     # Ensure required columns exist
-    for col in ["Campaign ID", "Target Customers Count", "Campaign Status"]:
-        if col not in df_campaigns.columns:
-            df_campaigns[col] = ""
+    ensure_columns(df_campaigns, ["Campaign ID", "Target Customers Count", "Campaign Status"])
 
     print(f"\n📢 Processing {len(df_campaigns)} campaigns...")
 
-    existing_ids = df_campaigns["Campaign ID"].dropna().tolist()
     now = datetime.now()
 
+    campaign_keys = row_keys(df_campaigns, "Campaign ID")
+    campaign_hashes = row_fingerprints(df_campaigns)
+    if incremental:
+        # Campaigns to (re)process: new/edited rows, passed Start/End boundaries, affected audiences
+        selected_campaigns = select_campaigns(df_campaigns, campaign_keys, campaign_hashes,
+                                              run_state["campaigns"], affected_tokens, now)
+        campaign_rows = df_campaigns.loc[sorted(selected_campaigns)]
+        print(f"♻️ {len(campaign_rows)} of {len(df_campaigns)} campaign(s) need processing this run.")
+    else:
+        campaign_rows = df_campaigns
+
+    # Category token -> client rows, built once from the enriched Clients data
+    category_index = build_category_index(df_clients) if len(campaign_rows) else None
+
     # Campaign ID: Auto generated if a new campaign is added.
     # Target Customers Count: Auto generated if a new client is added/categorised.
     # Campaign Status: Auto generated based on present time vs Start/End Date-Time.
-    # initialize columns to be written as an empty list
-    columnsToWrite = []
-    # Reset individual update flags
-    campaignIdUpdated=False
-    targetCustomersCountUpdated=False
-    campaignStatusUpdated=False
-    # Trigger relevant columns to be written, once any of these is modified.
-
-    for idx, row in df_campaigns.iterrows():
-        campaign_id = str(row.get("Campaign ID", "")).strip()
-        campaign_text = str(row.get("Campaign Text", "")).strip()
-        target_category = str(row.get("Target Client Category", "")).strip()
-        start_dt_str = str(row.get("Start Date-Time", "")).strip()
-        end_dt_str = str(row.get("End Date-Time", "")).strip()
-        current_status = str(row.get("Campaign Status", "")).strip().upper()
-
-        # ✅ Keep this early skip — still fits perfectly
-        if not target_category:
-            print(f"⚠️ Skipping row {idx+1} — no Target Client Category.")
-            continue
-
-        # Skip incomplete campaign rows
-        if not all([campaign_text, target_category, start_dt_str, end_dt_str]):
-            continue
-        
-        # Parse date-times flexibly
-        try:
-            # Only supports ISO formats
-            # ✅ **ISO format (simple)**        | `2025-11-01 09:00`
-            # ✅ **ISO format (with seconds)**  | `2025-11-01 09:00:00`
-            # start_dt = datetime.fromisoformat(start_dt_str.replace(" ", "T"))
-            # end_dt = datetime.fromisoformat(end_dt_str.replace(" ", "T"))
-
-            # Supports all the following formats of date-time
-            # ✅ 2025-11-01 09:00
-            # ✅ 1 Nov 2025 9:00
-            # ✅ Nov 1, 2025 9am
-            # ✅ 1st November 2025 09:00 AM
-            start_dt = parser.parse(start_dt_str)
-            end_dt = parser.parse(end_dt_str)
-        except Exception as e:
-            print(f"⚠️ Could not parse date-time for campaign at row {idx+1}: {e}")
-            continue
-        
-        # === Step 1: Auto-generate Campaign ID if missing ===
-        if not campaign_id:
-            campaign_id = generate_campaign_id(existing_ids)
-            df_campaigns.at[idx, "Campaign ID"] = campaign_id
-            existing_ids.append(campaign_id)
-            print(f"🆔 Assigned Campaign ID: {campaign_id}")
-            ## "Campaign ID" is updated here ##
-            campaignIdUpdated=True
-
-        # === Step 2: Determine Campaign Status based on current time ===
-        if start_dt <= now < end_dt:
-            new_status = "ACTIVE"
-        elif now >= end_dt:
-            new_status = "INACTIVE"
-        elif start_dt > now:
-            new_status = "UPCOMING"
-        else:
-            new_status = ""
-
-        # === Step 3: Analyze only when a client is added and campaign is ACTIVE or UPCOMING ===
-        # if ((clientsInfoUpdated) & (new_status in ["ACTIVE", "UPCOMING"])):
-        if (new_status in ["ACTIVE", "UPCOMING"]):
-            matched_clients = find_matching_clients(df_clients, target_category)
-            match_count = len(matched_clients)
-            df_campaigns.at[idx, "Target Customers Count"] = match_count
-            ## "Target Customers Count" is updated here ##
-            targetCustomersCountUpdated=True
-
-            print(f"🎯 {campaign_id} — Target '{target_category}' matched {match_count} clients.")
-            
-            if match_count > 0:
-                print("👥 Matching Clients:")
-                for _, client in matched_clients.iterrows():
-                    print(f"   - {client.get('Client Name')} | {client.get('Client Email')} | {client.get('Client Phone')}")
-        else:
-            print(f"⏸️ Skipping {campaign_id} — status {new_status or 'UNKNOWN'} (no update).")
-
-        # === Step 4: Update Campaign Status ===
-        if new_status != current_status:
-            df_campaigns.at[idx, "Campaign Status"] = new_status
-            print(f"📅 {campaign_id} status set to {new_status}")
-            ## "Campaign Status" is updated here ##
-            campaignStatusUpdated=True
-
-        time.sleep(REQUEST_DELAY)
-
-    # Append the Campaign sheet column to be updated based on changes
-    if(campaignIdUpdated):
-        columnsToWrite.append("Campaign ID")
-    if(targetCustomersCountUpdated):
-        columnsToWrite.append("Target Customers Count")
-    if(campaignStatusUpdated):
-        columnsToWrite.append("Campaign Status")
-
-    # Update the Campaign sheet only when 
-    # Clients and/or Campaigns sheet is updated
-    if(clientsInfoUpdated | campaignIdUpdated | targetCustomersCountUpdated | campaignStatusUpdated):
-        # Save updates back to sheet
+    # Only cells whose value actually changes are recorded and written back.
+    dirty_campaigns = set()
+    # Next Start/End boundary per processed campaign (when its status will change next)
+    next_boundary = refresh_campaigns(df_campaigns, campaign_rows, df_clients, category_index, now, dirty_campaigns)
+
+    # Update the Campaign sheet only when a Campaign ID, Target Customers Count
+    # or Campaign Status cell actually changed
+    if dirty_campaigns:
+        # Save updates back to sheet (changed cells only)
         ### This display must consider if there was any exception if filling any campaign details ###
         update_sheet(sheets, CAMPAIGNS_SHEET, df_campaigns,
-                    columns_to_update=columnsToWrite)
+                    dirty_cells=dirty_campaigns)
         print("\n✅ All campaign details updated successfully.")
         # print("#"*50)
     else:
@@ -790,10 +1823,92 @@ def process_clients_and_campaigns():
     # Configuration Controlled Message Service in Python backend
     if (MSG_SERVICE_PYTHON):
         # Invoke Message Services based on Message Templates/Timings
-        invoke_message_service(sheets, df_campaigns)
+        invoke_message_service(sheets, df_campaigns, df_clients, category_index)
+
+    # Sheets write traffic for the whole run
+    print(f"📊 Sheets writes: {sheets_write_stats['api_calls']} API call(s), "
+          f"{sheets_write_stats['bytes_sent'] / 1024:.1f} KB sent.")
+    print(f"🧮 Peak RSS: {peak_rss_mb():.1f} MB (compact frames {'on' if COMPACT_FRAMES else 'off'}; "
+          f"Clients {frame_mb(df_clients):.1f} MB, Campaigns {frame_mb(df_campaigns):.1f} MB in memory).")
+    if hasattr(sheets, "report"):
+        # Running against the in-process emulator: per-method call counters
+        sheets.report()
+
+    # Enrichment cache statistics (and size/TTL eviction)
+    llm_cache.report()
+    llm_cache.close()
+
+    # === Save the incremental watermark (reached only when the run succeeded) ===
+    if INCREMENTAL_MODE:
+        # (Client entries were collected per chunk, right after enrichment)
+        campaigns_state = {}
+        final_keys = row_keys(df_campaigns, "Campaign ID")
+        final_hashes = row_fingerprints(df_campaigns)
+        processed = set(campaign_rows.index)
+        for idx, key in final_keys.items():
+            if idx in processed:
+                boundary = next_boundary.get(idx)
+                boundary = boundary.isoformat() if boundary else None
+            else:
+                # Not processed this run: carry the previous boundary over (if any)
+                boundary = run_state["campaigns"].get(campaign_keys[idx], [None, None])[1] if incremental else None
+            campaigns_state[key] = [final_hashes[idx], boundary]
+
+        save_run_state(RUN_STATE_FILE, {
+            **empty_run_state(),
+            "last_run": now.isoformat(),
+            "clients": clients_state,
+            "campaigns": campaigns_state,
+        })
+        print(f"💾 Saved incremental watermark to '{RUN_STATE_FILE}' "
+              f"({len(clients_state)} client / {len(campaigns_state)} campaign row(s)).")
+
+    # Everything is in Sheets (and in the watermark) — the journal is no longer needed
+    journal.clear()
     
+def write_run_summary(status, error=None, path=RUN_REPORT_FILE):
+    """Write the structured run summary (stages + retries + API traffic) as JSON and log it as one line."""
+    summary = run_report.summary(
+        status=status,
+        error=error,
+        retries={"gemini": gemini_retry.stats(), "sheets": sheets_retry.stats()},
+        gemini={"calls": gemini_limiter.calls, "rate_limiter_wait_seconds": round(gemini_limiter.wait_seconds, 3)},
+        sheets_writes=dict(sheets_write_stats),
+        llm_cache={"hits": dict(llm_cache.hits), "misses": dict(llm_cache.misses)},
+        peak_rss_mb=round(peak_rss_mb(), 1),
+    )
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, path)
+    # One JSON line, so Cloud Logging stores it as a structured entry
+    print(json.dumps(summary, separators=(",", ":")))
+    print(f"📈 Run summary written to '{path}'.")
+    if run_report.profile_dir:
+        run_report.dump_profiles()
+
+
 # -------------------------------------------------------------------
 # ▶️ RUN
 # -------------------------------------------------------------------
 if __name__ == "__main__":
-    process_clients_and_campaigns()
+    arg_parser = argparse.ArgumentParser(description="AI Revenue Manager batch job")
+    arg_parser.add_argument("--full", action="store_true",
+                            help="ignore the incremental watermark and reprocess every row")
+    arg_parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                            help=f"write cProfile output per stage to DIR (default: {PROFILE_DIR})")
+    args = arg_parser.parse_args()
+    if args.profile:
+        run_report.enable_profiling(args.profile)
+
+    status, error = "ok", None
+    try:
+        process_clients_and_campaigns(full=args.full)
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        write_run_summary(status, error)
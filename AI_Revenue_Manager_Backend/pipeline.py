@@ -0,0 +1,86 @@
+##############################################################################################################
+# Producer / consumer helpers for the batch job (read -> enrich -> write run concurrently)
+#=============================================================================================================
+# - prefetch(): pulls the next item of an iterator (e.g. the next Clients page) on a background thread
+#   while the caller is still working on the current one.
+# - BackgroundWriter: one thread that sends queued Sheets writes in order, so enrichment never waits on
+#   a write round trip. close() drains the queue and re-raises the first failed write.
+##############################################################################################################
+import queue
+import threading
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=1):
+    """Yield items of `iterable`, producing up to `depth` items ahead on a background thread.
+    Exceptions raised by the producer are re-raised in the consumer."""
+    items = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put(_DONE)
+        except BaseException as e:      # handed to the consumer
+            items.put(e)
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class BackgroundWriter:
+    """Single background thread applying `send(job)` to queued jobs, in submission order."""
+
+    def __init__(self, send, max_pending=8, name="sheets-writer"):
+        self.send = send
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.sent = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is _DONE:
+                    return
+                if self.error is None:          # after a failure, later jobs are dropped
+                    self.send(job)
+                    self.sent += 1
+            except Exception as e:
+                self.error = e
+                print(f"❌ Background Sheets write failed: {e}")
+            finally:
+                self.jobs.task_done()
+
+    def submit(self, job):
+        """Queue a write (blocks when max_pending writes are already waiting)."""
+        if self.error is not None:
+            raise self.error
+        self.jobs.put(job)
+
+    def close(self):
+        self.jobs.put(_DONE)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
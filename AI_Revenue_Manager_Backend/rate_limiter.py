@@ -0,0 +1,59 @@
+##############################################################################################################
+# Shared rate limiter for Gemini calls
+#=============================================================================================================
+# Token bucket refilled at GEMINI_REQUESTS_PER_MINUTE, plus a cap on the number of calls in flight.
+# One instance is shared by every enrichment worker so the whole job stays inside the Gemini quota,
+# replacing the fixed sleep that used to follow each call.
+##############################################################################################################
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket (requests/minute) with a max in-flight limit.
+
+    Use as a context manager around a single API call:
+
+        with limiter:
+            model.generate_content(prompt)
+    """
+
+    def __init__(self, requests_per_minute, max_in_flight):
+        self.rate = max(requests_per_minute, 1) / 60.0     # tokens per second
+        self.capacity = max(max_in_flight, 1)               # allowed burst
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.capacity)
+
+        # Counters used for the throughput report
+        self.calls = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """Block until a slot and a token are both available."""
+        self.slots.acquire()
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.calls += 1
+                    self.wait_seconds += now - started
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def release(self):
+        self.slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
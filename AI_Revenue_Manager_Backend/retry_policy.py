@@ -0,0 +1,274 @@
+##############################################################################################################
+# Retry policy + shared circuit breaker for Gemini calls
+#=============================================================================================================
+# - Errors are classified by type / HTTP status instead of searching the message for "429":
+#     throttle  -> 429 / ResourceExhausted            (retried, and counted by the circuit breaker)
+#     transient -> 5xx, timeouts, connection errors   (retried)
+#     fatal     -> other 4xx, blocked/invalid prompts  (not retried)
+# - Retries back off exponentially from RETRY_DELAY with jitter, up to MAX_RETRIES attempts, and never
+#   sooner than the delay the server asked for (RetryInfo / "retry in Ns" / Retry-After).
+# - One CircuitBreaker is shared by every worker: repeated throttling opens it, pausing ALL workers
+#   together for the cooldown; afterwards it lets calls back in gradually (1, 2, 4, ... in flight).
+##############################################################################################################
+import random
+import re
+import threading
+import time
+
+THROTTLE = "throttle"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+RETRY_IN_SECONDS = re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE)
+RETRY_DELAY_SECONDS = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+class EmptyResponse(Exception):
+    """Gemini answered without any text (treated as transient)."""
+
+
+def error_status(exc):
+    """HTTP-like status code of an API exception, if it carries one."""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    resp = getattr(exc, "resp", None)              # googleapiclient HttpError
+    status = getattr(resp, "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc):
+    """Return THROTTLE, TRANSIENT or FATAL for an exception raised by an API call."""
+    try:
+        from google.api_core import exceptions as gexc
+        if isinstance(exc, (gexc.ResourceExhausted, gexc.TooManyRequests)):
+            return THROTTLE
+        if isinstance(exc, (gexc.ServiceUnavailable, gexc.InternalServerError, gexc.DeadlineExceeded,
+                            gexc.GatewayTimeout, gexc.BadGateway, gexc.Aborted, gexc.Unknown)):
+            return TRANSIENT
+        if isinstance(exc, gexc.RetryError):
+            return TRANSIENT
+    except ImportError:
+        pass
+
+    status = error_status(exc)
+    if status == 429:
+        return THROTTLE
+    if status is not None and (status >= 500 or status == 408):
+        return TRANSIENT
+    if status is not None and 400 <= status < 500:
+        return FATAL
+    if isinstance(exc, (EmptyResponse, ConnectionError, TimeoutError)):
+        return TRANSIENT
+    if isinstance(exc, (ValueError, TypeError, KeyError)):
+        # e.g. response.text on a blocked/safety-filtered reply — retrying will not help
+        return FATAL
+    return TRANSIENT
+
+
+def server_retry_delay(exc):
+    """Delay (seconds) the server asked for, or None."""
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+        if isinstance(detail, dict) and "retryDelay" in detail:
+            try:
+                return float(str(detail["retryDelay"]).rstrip("s"))
+            except ValueError:
+                pass
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if "Retry-After" in headers:
+        try:
+            return float(headers["Retry-After"])
+        except (TypeError, ValueError):
+            pass
+    text = str(exc)
+    for pattern in (RETRY_IN_SECONDS, RETRY_DELAY_SECONDS):
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class CircuitBreaker:
+    """Shared pause switch for all workers calling the same API.
+
+    CLOSED    -> calls flow freely.
+    OPEN      -> `threshold` throttles in a row: every worker waits until the cooldown ends.
+    HALF_OPEN -> calls are let back in gradually: 1 in flight, doubling after each success
+                 until `max_in_flight` is reached (CLOSED again). A throttle here re-opens it
+                 with twice the cooldown (capped at max_cooldown).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=3, cooldown=30, max_cooldown=300, max_in_flight=4):
+        self.threshold = max(threshold, 1)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_in_flight = max(max_in_flight, 1)
+        self.cond = threading.Condition()
+        self.state = self.CLOSED
+        self.consecutive_throttles = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.allowed = self.max_in_flight
+        self.in_flight = 0
+
+        # Counters
+        self.trips = 0
+        self.paused_seconds = 0.0
+
+    def __enter__(self):
+        started = time.monotonic()
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                if self.state == self.OPEN:
+                    if now < self.open_until:
+                        self.cond.wait(self.open_until - now)
+                        continue
+                    self.state, self.allowed = self.HALF_OPEN, 1
+                    print("🔌 Circuit breaker half-open — resuming Gemini calls gradually.")
+                if self.in_flight < self.allowed:
+                    break
+                self.cond.wait()
+            self.in_flight += 1
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            with self.cond:
+                self.paused_seconds += waited
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+        return False
+
+    def record_success(self):
+        with self.cond:
+            self.consecutive_throttles = 0
+            if self.state == self.HALF_OPEN:
+                self.allowed *= 2
+                if self.allowed >= self.max_in_flight:
+                    self.state, self.allowed = self.CLOSED, self.max_in_flight
+                    self.cooldown = self.base_cooldown
+                    print("🔌 Circuit breaker closed — Gemini calls back at full concurrency.")
+                self.cond.notify_all()
+
+    def record_throttle(self, retry_after=None):
+        with self.cond:
+            self.consecutive_throttles += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == self.OPEN or self.consecutive_throttles < self.threshold:
+                return
+            pause = max(self.cooldown, retry_after or 0)
+            self.state = self.OPEN
+            self.open_until = time.monotonic() + pause
+            self.trips += 1
+            self.cond.notify_all()
+        print(f"🛑 Circuit breaker open — pausing all Gemini workers for {pause:.1f}s.")
+
+
+class RetryPolicy:
+    """Runs a call with classified retries, jittered exponential backoff and an optional breaker."""
+
+    def __init__(self, max_retries=3, base_delay=5, max_delay=60, breaker=None, name="Gemini"):
+        self.max_retries = max(max_retries, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.name = name
+        self.lock = threading.Lock()
+
+        # Counters
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.transient_errors = 0
+        self.fatal_errors = 0
+        self.gave_up = 0
+        self.backoff_seconds = 0.0
+
+    def backoff(self, attempt, server_delay=None):
+        """Equal-jitter exponential backoff, never shorter than the server-requested delay."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(ceiling / 2, ceiling)
+        if server_delay:
+            delay = max(delay, min(server_delay, self.max_delay))
+        return delay
+
+    def _count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def call(self, fn, max_retries=None, reraise=False):
+        """Call fn() until it succeeds; returns its result, or None once retries are exhausted
+        or the error is not retryable (reraise=True raises the last error instead)."""
+        max_retries = max_retries or self.max_retries
+        self._count(calls=1)
+        for attempt in range(1, max_retries + 1):
+            self._count(attempts=1)
+            try:
+                if self.breaker:
+                    with self.breaker:
+                        result = fn()
+                    self.breaker.record_success()
+                else:
+                    result = fn()
+                return result
+            except Exception as e:
+                kind = classify_error(e)
+                server_delay = server_retry_delay(e) if kind == THROTTLE else None
+                if kind == THROTTLE:
+                    self._count(throttled=1)
+                    if self.breaker:
+                        self.breaker.record_throttle(server_delay)
+                elif kind == TRANSIENT:
+                    self._count(transient_errors=1)
+                else:
+                    self._count(fatal_errors=1)
+                    print(f"❌ {self.name} call failed (not retryable): {e}")
+                    if reraise:
+                        raise
+                    return None
+
+                if attempt == max_retries:
+                    self._count(gave_up=1)
+                    print(f"❌ {self.name} call failed after {attempt} attempt(s) ({kind}): {e}")
+                    if reraise:
+                        raise
+                    return None
+                delay = self.backoff(attempt, server_delay)
+                self._count(retries=1, backoff_seconds=delay)
+                print(f"⚠️ {self.name} call failed (attempt {attempt}, {kind}): {e} — retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return None
+
+    def stats(self):
+        """Counters as a dict (for the JSON run summary)."""
+        stats = {name: getattr(self, name) for name in (
+            "calls", "attempts", "retries", "throttled", "transient_errors", "fatal_errors", "gave_up")}
+        stats["backoff_seconds"] = round(self.backoff_seconds, 3)
+        if self.breaker:
+            stats["breaker_trips"] = self.breaker.trips
+            stats["breaker_paused_seconds"] = round(self.breaker.paused_seconds, 3)
+        return stats
+
+    def report(self):
+        line = (f"🔁 {self.name} retries: {self.calls} call(s), {self.attempts} attempt(s), {self.retries} retry(ies), "
+                f"{self.throttled} throttled, {self.transient_errors} transient, {self.fatal_errors} fatal, "
+                f"{self.gave_up} gave up, {self.backoff_seconds:.1f}s backing off")
+        if self.breaker:
+            line += f"; breaker tripped {self.breaker.trips}x, workers paused {self.breaker.paused_seconds:.1f}s"
+        print(line + ".")
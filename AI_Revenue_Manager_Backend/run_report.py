@@ -0,0 +1,114 @@
+##############################################################################################################
+# Stage-level run report (+ optional per-stage cProfile output)
+#=============================================================================================================
+# - @run_report.stage("name") / `with run_report.timed("name"):` record calls, total/max duration and
+#   errors per stage; run_report.count("name", key=n) adds payload counters (bytes, cells, prompts...).
+# - summary() returns everything as a dict; main.py writes it as JSON (RUN_REPORT_FILE) at exit.
+# - Profiling (python main.py --profile [DIR]): each stage gets its own cProfile, enabled around the
+#   outermost instrumented call on the main thread and dumped to DIR/<stage>.prof (open it with
+#   snakeviz / flameprof for a flamegraph, or `python -m pstats`) plus a DIR/<stage>.txt top list.
+#   Stages running on worker threads (Gemini calls, background writes) are timed but not profiled.
+##############################################################################################################
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RunReport:
+    """Thread-safe per-stage counters for one run of the batch job."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+        self.profile_dir = None
+        self.profiles = {}
+        self.active_profile = None       # stage whose profiler is running (main thread only)
+
+    def enable_profiling(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.profile_dir = directory
+        print(f"🔬 Profiling enabled — per-stage cProfile output in '{directory}'.")
+
+    def _entry(self, name):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0}
+        return entry
+
+    def count(self, name, **counters):
+        """Add payload/retry counters to a stage, e.g. count("update_sheet", bytes_sent=1234)."""
+        with self.lock:
+            entry = self._entry(name)
+            for key, value in counters.items():
+                entry[key] = entry.get(key, 0) + value
+
+    @contextmanager
+    def timed(self, name):
+        profiler = None
+        if (self.profile_dir and self.active_profile is None
+                and threading.current_thread() is threading.main_thread()):
+            profiler = self.profiles.get(name)
+            if profiler is None:
+                profiler = self.profiles[name] = cProfile.Profile()
+            self.active_profile = name
+            profiler.enable()
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                self.active_profile = None
+            with self.lock:
+                entry = self._entry(name)
+                entry["calls"] += 1
+                entry["errors"] += failed
+                entry["seconds"] += elapsed
+                entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+    def stage(self, name):
+        """Decorator: time every call of the function as stage `name`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timed(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def dump_profiles(self):
+        """Write DIR/<stage>.prof and a DIR/<stage>.txt (top 40 by cumulative time) per profiled stage."""
+        for name, profiler in self.profiles.items():
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(self.profile_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+        if self.profiles:
+            print(f"🔬 Wrote {len(self.profiles)} stage profile(s) to '{self.profile_dir}'.")
+
+    def summary(self, **extra):
+        """Stages sorted by total time, plus any extra sections supplied by the caller."""
+        with self.lock:
+            stages = {
+                name: {key: round(value, 4) if isinstance(value, float) else value for key, value in entry.items()}
+                for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+            }
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_seconds": round(time.time() - self.started, 3),
+            "stages": stages,
+            **extra,
+        }
@@ -0,0 +1,62 @@
+##############################################################################################################
+# Incremental run state (row-fingerprint watermark)
+#=============================================================================================================
+# A small local JSON file remembering, per row, the content hash seen at the end of the last SUCCESSFUL run:
+#   clients:   {row key: [hash, Client Category]}   (category kept so removed/changed tokens can be recounted)
+#   campaigns: {row key: [hash, next status boundary (ISO) or null]}
+# The next run only enriches / recounts / re-schedules rows whose hash changed, plus campaigns whose
+# Start/End boundary has passed since. Run with --full (or delete the file) to reprocess everything.
+##############################################################################################################
+import json
+import os
+from datetime import datetime
+
+STATE_VERSION = 1
+
+
+def empty_run_state():
+    return {"version": STATE_VERSION, "last_run": None, "clients": {}, "campaigns": {}}
+
+
+def load_run_state(path):
+    """Load the state file; a missing, unreadable or outdated file means 'no watermark' (full run)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return empty_run_state()
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return empty_run_state()
+    return state
+
+
+def save_run_state(path, state):
+    """Atomically write the state file (write temp file, then rename)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def row_keys(df, id_column, seen=None):
+    """Stable key per row: the ID column value (duplicates get a #n suffix), else the row label.
+    Pass the same `seen` dict for every chunk of a tab read in pieces, so suffixes stay tab-wide.
+    """
+    keys = []
+    seen = {} if seen is None else seen
+    ids = df[id_column].tolist() if id_column in df.columns else [""] * len(df)
+    for idx, value in zip(df.index, ids):
+        value = str(value).strip()
+        if not value:
+            keys.append(f"row:{idx}")
+            continue
+        seen[value] = seen.get(value, 0) + 1
+        keys.append(value if seen[value] == 1 else f"{value}#{seen[value]}")
+    return dict(zip(df.index, keys))
+
+
+def parse_boundary(value):
+    return datetime.fromisoformat(value) if value else None
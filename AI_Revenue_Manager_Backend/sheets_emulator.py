@@ -0,0 +1,262 @@
+##############################################################################################################
+# In-process Google Sheets emulator (offline benchmarking / local runs)
+#=============================================================================================================
+# Implements the slice of `service.spreadsheets()` used by main.py:
+#   get (sheet properties) and values().get / update / batchGet / batchUpdate (...).execute()
+# backed by in-memory tables, with configurable per-call latency, a per-minute quota that raises
+# HTTP 429 like the real API, random error injection and per-method call counters.
+#
+# Selected by init_google_sheets() when SHEETS_BACKEND=emulator. Other env vars:
+#   SHEETS_EMULATOR_FILE              JSON seed {"Clients": [[header...], [row...]], "Campaigns": [...]};
+#                                     written back at exit so consecutive runs see each other's writes
+#   SHEETS_EMULATOR_LATENCY           seconds added to every call (default 0)
+#   SHEETS_EMULATOR_QUOTA_PER_MINUTE  max calls per rolling minute before 429s (default: unlimited)
+#   SHEETS_EMULATOR_ERROR_RATE        probability (0-1) of a 503 on any call (default 0)
+##############################################################################################################
+import atexit
+import collections
+import json
+import os
+import random
+import re
+import threading
+import time
+
+A1_REF = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+def col_number(letters):
+    """'A' -> 1, 'Z' -> 26, 'AA' -> 27."""
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def col_letters(n):
+    result = ''
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        result = chr(65 + remainder) + result
+    return result
+
+
+def parse_a1(range_str):
+    """Split "Sheet!A2:C10" into (sheet, first_row, first_col, last_row, last_col).
+    Rows/cols are 1-based; None means open-ended (whole column / row / tab).
+    """
+    sheet, _, ref = range_str.partition("!")
+    sheet = sheet.strip().strip("'")
+    if not ref:
+        return sheet, 1, 1, None, None
+
+    match = A1_REF.match(ref.strip().upper())
+    if not match:
+        raise ValueError(f"Unsupported A1 range: {range_str}")
+    c0, r0, c1, r1 = match.groups()
+    first_col = col_number(c0) if c0 else 1
+    first_row = int(r0) if r0 else 1
+    if ":" not in ref:
+        # Single cell
+        return sheet, first_row, first_col, first_row, first_col
+    last_col = col_number(c1) if c1 else None
+    last_row = int(r1) if r1 else None
+    return sheet, first_row, first_col, last_row, last_col
+
+
+def http_error(status, message):
+    """Build the same exception type googleapiclient raises for a failed request."""
+    try:
+        import httplib2
+        from googleapiclient.errors import HttpError
+        resp = httplib2.Response({"status": status, "reason": message})
+        content = json.dumps({"error": {"code": status, "message": message}}).encode("utf-8")
+        return HttpError(resp, content)
+    except ImportError:
+        return RuntimeError(f"HttpError {status}: {message}")
+
+
+def wire_copy(payload):
+    """Serialize a request body like googleapiclient does (non-JSON values raise TypeError)."""
+    return json.loads(json.dumps(payload))
+
+
+class EmulatedRequest:
+    """Mimics googleapiclient's HttpRequest: nothing happens until execute()."""
+
+    def __init__(self, emulator, method, handler):
+        self.emulator = emulator
+        self.method = method
+        self.handler = handler
+
+    def execute(self):
+        self.emulator.before_call(self.method)
+        # Responses cross "the wire" as JSON, so callers get fresh objects like with the real client
+        return json.loads(json.dumps(self.handler()))
+
+
+class EmulatedValues:
+    def __init__(self, emulator):
+        self.emulator = emulator
+
+    def get(self, spreadsheetId, range, valueRenderOption="FORMATTED_VALUE", **kwargs):
+        return EmulatedRequest(self.emulator, "get",
+                               lambda: self.emulator.read_range(range, valueRenderOption))
+
+    def batchGet(self, spreadsheetId, ranges, valueRenderOption="FORMATTED_VALUE", **kwargs):
+        if isinstance(ranges, str):
+            ranges = [ranges]
+        return EmulatedRequest(self.emulator, "batchGet", lambda: {
+            "spreadsheetId": spreadsheetId,
+            "valueRanges": [self.emulator.read_range(r, valueRenderOption) for r in ranges],
+        })
+
+    def update(self, spreadsheetId, range, valueInputOption="RAW", body=None, **kwargs):
+        values = wire_copy((body or {}).get("values", []))
+        return EmulatedRequest(self.emulator, "update",
+                               lambda: self.emulator.write_range(range, values))
+
+    def batchUpdate(self, spreadsheetId, body=None, **kwargs):
+        data = wire_copy((body or {}).get("data", []))
+
+        def handler():
+            responses = [self.emulator.write_range(d["range"], d.get("values", [])) for d in data]
+            return {
+                "spreadsheetId": spreadsheetId,
+                "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+                "responses": responses,
+            }
+        return EmulatedRequest(self.emulator, "batchUpdate", handler)
+
+
+class SheetsEmulator:
+    """Drop-in stand-in for `build("sheets", "v4", ...).spreadsheets()`."""
+
+    def __init__(self, tables=None, latency=0.0, quota_per_minute=None, error_rate=0.0, seed=None):
+        self.tables = {name: [list(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent_calls = collections.deque()
+        self.stats = collections.Counter()
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("SHEETS_EMULATOR_FILE", "").strip()
+        quota = os.environ.get("SHEETS_EMULATOR_QUOTA_PER_MINUTE", "").strip()
+        emulator = cls(
+            latency=float(os.environ.get("SHEETS_EMULATOR_LATENCY", "0") or 0),
+            quota_per_minute=int(quota) if quota else None,
+            error_rate=float(os.environ.get("SHEETS_EMULATOR_ERROR_RATE", "0") or 0),
+        )
+        if path:
+            if os.path.exists(path):
+                emulator.load(path)
+            atexit.register(emulator.save, path)
+        print(f"🧪 Using in-process Sheets emulator (tables: {', '.join(emulator.tables) or 'none'}).")
+        return emulator
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.tables = {name: [list(r) for r in rows] for name, rows in json.load(f).items()}
+
+    def save(self, path):
+        with self.lock, open(path, "w", encoding="utf-8") as f:
+            json.dump(self.tables, f)
+
+    # ---------------------------------------------------------
+    # `service.spreadsheets()` surface
+    # ---------------------------------------------------------
+    def values(self):
+        return EmulatedValues(self)
+
+    def get(self, spreadsheetId, ranges=None, fields=None, includeGridData=False, **kwargs):
+        """spreadsheets().get: sheet properties only (title + grid size of each tab)."""
+        def handler():
+            names = [parse_a1(r)[0] for r in ranges] if ranges else list(self.tables)
+            with self.lock:
+                return {"spreadsheetId": spreadsheetId, "sheets": [
+                    {"properties": {"title": name, "gridProperties": {
+                        "rowCount": len(self.tables.get(name, [])),
+                        "columnCount": max((len(r) for r in self.tables.get(name, [])), default=0),
+                    }}}
+                    for name in names if name in self.tables
+                ]}
+        return EmulatedRequest(self, "spreadsheets.get", handler)
+
+    # ---------------------------------------------------------
+    # Call accounting, latency, quota and injected errors
+    # ---------------------------------------------------------
+    def before_call(self, method):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.stats[method] += 1
+            self.stats["api_calls"] += 1
+            if self.quota_per_minute:
+                now = time.monotonic()
+                while self.recent_calls and now - self.recent_calls[0] >= 60:
+                    self.recent_calls.popleft()
+                if len(self.recent_calls) >= self.quota_per_minute:
+                    self.stats["quota_errors"] += 1
+                    raise http_error(429, "Quota exceeded for quota metric 'Read/Write requests' (emulated)")
+                self.recent_calls.append(now)
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats["injected_errors"] += 1
+                raise http_error(503, "The service is currently unavailable (emulated)")
+
+    def report(self):
+        counts = ", ".join(f"{k}={v}" for k, v in sorted(self.stats.items()))
+        print(f"🧪 Sheets emulator calls: {counts or 'none'}")
+
+    # ---------------------------------------------------------
+    # Table operations
+    # ---------------------------------------------------------
+    def read_range(self, range_str, value_render_option="FORMATTED_VALUE"):
+        sheet, r0, c0, r1, c1 = parse_a1(range_str)
+        with self.lock:
+            if sheet not in self.tables:
+                raise http_error(400, f"Unable to parse range: {range_str}")
+            grid = self.tables[sheet]
+            last_row = len(grid) if r1 is None else min(r1, len(grid))
+            out = []
+            for row in grid[r0 - 1:last_row]:
+                cells = row[c0 - 1:] if c1 is None else row[c0 - 1:c1]
+                if value_render_option != "UNFORMATTED_VALUE":
+                    cells = ["" if v is None else (v if isinstance(v, str) else str(v)) for v in cells]
+                # Like the real API: trailing empty cells are omitted
+                while cells and cells[-1] in ("", None):
+                    cells = cells[:-1]
+                out.append(list(cells))
+            # ...and so are trailing empty rows
+            while out and not out[-1]:
+                out.pop()
+            self.stats["cells_read"] += sum(len(r) for r in out)
+
+        end_col = col_letters(c1) if c1 else col_letters(max((c0 - 1 + len(r) for r in out), default=c0))
+        result = {"range": f"'{sheet}'!{col_letters(c0)}{r0}:{end_col}{r0 + max(len(out), 1) - 1}",
+                  "majorDimension": "ROWS"}
+        if out:
+            result["values"] = out
+        return result
+
+    def write_range(self, range_str, values):
+        sheet, r0, c0, _, _ = parse_a1(range_str)
+        with self.lock:
+            grid = self.tables.setdefault(sheet, [])
+            cells = 0
+            for i, row_values in enumerate(values):
+                while len(grid) < r0 + i:
+                    grid.append([])
+                row = grid[r0 - 1 + i]
+                if len(row) < c0 - 1 + len(row_values):
+                    row.extend([""] * (c0 - 1 + len(row_values) - len(row)))
+                row[c0 - 1:c0 - 1 + len(row_values)] = row_values
+                cells += len(row_values)
+            self.stats["cells_written"] += cells
+        return {"updatedRange": range_str, "updatedRows": len(values), "updatedCells": cells}
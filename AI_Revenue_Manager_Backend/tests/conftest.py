@@ -0,0 +1,6 @@
+# Unit tests for the batch job's pure helpers:  python -m pytest tests -q  (from AI_Revenue_Manager_Backend)
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SPREADSHEET_ID", "tests")
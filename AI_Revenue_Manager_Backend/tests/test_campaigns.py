@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import main
+
+NOW = datetime(2026, 3, 1, 12, 0)
+DAY = timedelta(days=1)
+
+
+def serial(dt):
+    """A date-time cell as UNFORMATTED_VALUE returns it (days since 1899-12-30)."""
+    return (dt - main.SHEETS_EPOCH).total_seconds() / 86400
+
+
+# ---------------------------------------------------------
+# sheet_datetimes
+# ---------------------------------------------------------
+def test_sheet_datetimes_parses_every_cell_format():
+    cells = pd.Series([serial(NOW), "2026-03-01 12:00", "2026-03-01", "1 Mar 2026 12:00", "Mar 1, 2026 12pm",
+                       "", None, np.nan, "soon", 45000], index=range(10, 20))
+    parsed = main.sheet_datetimes(cells)
+    assert parsed.index.tolist() == cells.index.tolist()
+    assert parsed[[10, 11, 13, 14]].tolist() == [pd.Timestamp(NOW)] * 4
+    assert parsed[12] == pd.Timestamp(2026, 3, 1)
+    assert parsed[[15, 16, 17, 18]].isna().all()
+    assert parsed[19] == pd.Timestamp(2023, 3, 15)
+
+
+def test_sheet_datetimes_keeps_sub_second_serials_to_the_microsecond():
+    exact = datetime(2026, 3, 1, 9, 30, 15)
+    assert main.sheet_datetimes([serial(exact)])[0] == pd.Timestamp(exact)
+
+
+def test_sheet_datetimes_converts_aware_text_to_local_wall_clock():
+    parsed = main.sheet_datetimes(["2026-03-01T12:00:00+00:00"])[0]
+    expected = datetime.fromisoformat("2026-03-01T12:00:00+00:00").astimezone().replace(tzinfo=None)
+    assert parsed == pd.Timestamp(expected)
+
+
+# ---------------------------------------------------------
+# next_campaign_number
+# ---------------------------------------------------------
+def test_next_campaign_number():
+    assert main.next_campaign_number([]) == 1
+    assert main.next_campaign_number(["", "promo", None]) == 1
+    assert main.next_campaign_number(["CMP-0009", "CMP-0010", "CMP-0002"]) == 11
+    assert main.next_campaign_number(["old CMP-0041 copy", "CMP-7"]) == 42
+
+
+# ---------------------------------------------------------
+# refresh_campaigns
+# ---------------------------------------------------------
+def campaigns():
+    rows = [
+        # Campaign ID, Campaign Text, Target Client Category, Start, End, Campaign Status, Target Customers Count
+        ["CMP-0007", "Spa days", "Spa", serial(NOW - DAY), serial(NOW + DAY), "", ""],
+        ["", "Golf week", " golf ", (NOW + DAY).strftime("%Y-%m-%d %H:%M"), (NOW + 2 * DAY).isoformat(), "", ""],
+        ["", "Old spa offer", "Spa", "1 Feb 2026 9:00", "2 Feb 2026 9:00", "ACTIVE", 5],
+        ["CMP-0011", "No audience", "", serial(NOW - DAY), serial(NOW + DAY), "", ""],
+        ["", "Bad dates", "Spa", "soon", "later", "", ""],
+        ["CMP-0003", "Dining", "Dining", serial(NOW - DAY), serial(NOW + DAY), "active", 1],
+    ]
+    return pd.DataFrame(rows, columns=["Campaign ID", "Campaign Text", "Target Client Category", "Start Date-Time",
+                                       "End Date-Time", "Campaign Status", "Target Customers Count"])
+
+
+def clients():
+    return pd.DataFrame({"Client Category": ["Spa, Dining", "spa", "Golf", "", "Spa Retreat"]})
+
+
+def test_refresh_campaigns_assigns_ids_statuses_and_counts():
+    df = campaigns()
+    dirty = set()
+    boundaries = main.refresh_campaigns(df, df, clients(), None, NOW, dirty)
+
+    # Rows without a target or with unparseable dates are skipped entirely
+    assert boundaries == {0: NOW + DAY, 1: NOW + DAY, 2: None, 5: NOW + DAY}
+    # One running counter after the highest existing ID
+    assert df["Campaign ID"].tolist() == ["CMP-0007", "CMP-0012", "CMP-0013", "CMP-0011", "", "CMP-0003"]
+    assert df["Campaign Status"].tolist() == ["ACTIVE", "UPCOMING", "INACTIVE", "", "", "active"]
+    # Audiences only for ACTIVE / UPCOMING campaigns (whole-token, case-insensitive matches)
+    assert df["Target Customers Count"].tolist() == [2, 1, 5, "", "", 1]
+    assert dirty == {
+        (1, "Campaign ID"), (2, "Campaign ID"),
+        (0, "Campaign Status"), (1, "Campaign Status"), (2, "Campaign Status"),
+        (0, "Target Customers Count"), (1, "Target Customers Count"),
+    }
+
+
+def test_refresh_campaigns_only_touches_the_given_rows():
+    df = campaigns()
+    dirty = set()
+    boundaries = main.refresh_campaigns(df, df.loc[[1, 2]], clients(), None, NOW, dirty)
+    assert set(boundaries) == {1, 2}
+    # New IDs still continue after every ID in the tab
+    assert df.loc[[1, 2], "Campaign ID"].tolist() == ["CMP-0012", "CMP-0013"]
+    assert {idx for idx, _ in dirty} == {1, 2}
+
+
+def test_refresh_campaigns_with_nothing_to_do():
+    df = campaigns()
+    dirty = set()
+    assert main.refresh_campaigns(df, df.iloc[0:0], clients(), None, NOW, dirty) == {}
+    assert main.refresh_campaigns(df, df.loc[[3, 4]], clients(), None, NOW, dirty) == {}
+    assert dirty == set()
+
+
+def test_refresh_campaigns_is_idempotent():
+    df = campaigns()
+    main.refresh_campaigns(df, df, clients(), None, NOW, set())
+    dirty = set()
+    main.refresh_campaigns(df, df, clients(), None, NOW, dirty)
+    assert dirty == set()
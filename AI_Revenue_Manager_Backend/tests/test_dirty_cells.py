@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from main import coalesce_dirty_cells, dirty_cells_body, update_sheet
+
+
+def frame(rows=8):
+    # Row labels are not positions (like a window from iter_sheet_chunks)
+    return pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in ["A", "B", "C", "D", "E"]},
+        index=pd.RangeIndex(100, 100 + rows),
+    )
+
+
+def test_single_cell():
+    assert coalesce_dirty_cells(frame(), {(103, "B")}) == [(3, 3, 1, 1)]
+
+
+def test_column_splits_into_contiguous_runs():
+    dirty = {(100, "C"), (101, "C"), (102, "C"), (105, "C")}
+    assert coalesce_dirty_cells(frame(), dirty) == [(0, 2, 2, 2), (5, 5, 2, 2)]
+
+
+def test_adjacent_columns_with_the_same_run_merge():
+    dirty = {(idx, col) for idx in (101, 102) for col in ("B", "C", "D")}
+    assert coalesce_dirty_cells(frame(), dirty) == [(1, 2, 1, 3)]
+
+
+def test_non_adjacent_columns_stay_separate():
+    dirty = {(idx, col) for idx in (101, 102) for col in ("A", "C", "E")}
+    assert coalesce_dirty_cells(frame(), dirty) == [(1, 2, 0, 0), (1, 2, 2, 2), (1, 2, 4, 4)]
+
+
+def test_adjacent_columns_with_different_runs_do_not_merge():
+    dirty = {(101, "B"), (102, "B"), (101, "C")}
+    assert coalesce_dirty_cells(frame(), dirty) == [(1, 1, 2, 2), (1, 2, 1, 1)]
+
+
+def test_blocks_cover_exactly_the_dirty_cells():
+    rng = np.random.default_rng(7)
+    df = frame(30)
+    dirty = {(100 + int(r), df.columns[int(c)]) for r, c in rng.integers(0, [30, 5], size=(60, 2))}
+    covered = {
+        (df.index[r], df.columns[c])
+        for r0, r1, c0, c1 in coalesce_dirty_cells(df, dirty)
+        for r in range(r0, r1 + 1)
+        for c in range(c0, c1 + 1)
+    }
+    assert covered == dirty
+
+
+class RecordingSheets:
+    """values().batchUpdate(...).execute() of the Sheets client, recording each body."""
+
+    def __init__(self):
+        self.bodies = []
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.bodies.append(body)
+        return self
+
+    def execute(self):
+        return {}
+
+
+def test_update_sheet_writes_only_the_dirty_blocks():
+    df = frame().reset_index(drop=True)
+    df.loc[2, "C"] = np.nan
+    sheets = RecordingSheets()
+    update_sheet(sheets, "Clients", df, dirty_cells={(1, "B"), (2, "B"), (1, "C"), (2, "C")})
+    [body] = sheets.bodies
+    assert body["valueInputOption"] == "RAW"
+    # Row 1 of the sheet is the header: frame row 1 is sheet row 3
+    assert body["data"] == [{"range": "Clients!B3:C4", "values": [["B1", "C1"], ["B2", ""]]}]
+
+
+def test_update_sheet_without_dirty_cells_makes_no_call():
+    sheets = RecordingSheets()
+    update_sheet(sheets, "Clients", frame(), dirty_cells=set())
+    assert sheets.bodies == []
+
+
+def test_body_uses_a1_ranges_with_the_first_row_offset():
+    df = frame()
+    df.loc[102, "C"] = np.nan
+    dirty = {(101, "B"), (102, "B"), (101, "C"), (102, "C")}
+    body = dirty_cells_body("Clients", df, dirty, first_row=102)
+    assert body["valueInputOption"] == "RAW"
+    assert body["data"] == [{"range": "Clients!B103:C104", "values": [["B1", "C1"], ["B2", ""]]}]
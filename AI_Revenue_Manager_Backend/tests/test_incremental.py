@@ -0,0 +1,228 @@
+import json
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import main
+from llm_cache import LLMCache
+from rate_limiter import RateLimiter
+from run_state import empty_run_state, load_run_state, row_keys, save_run_state
+from sheets_emulator import SheetsEmulator
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+# ---------------------------------------------------------
+# Row keys, fingerprints and the state file
+# ---------------------------------------------------------
+def test_row_keys_suffix_duplicate_ids():
+    df = pd.DataFrame({"Client ID": ["C1", "C2", "C1", " ", "C1 "]}, index=[10, 11, 12, 13, 14])
+    assert row_keys(df, "Client ID") == {10: "C1", 11: "C2", 12: "C1#2", 13: "row:13", 14: "C1#3"}
+
+
+def test_row_keys_without_id_column_use_row_labels():
+    df = pd.DataFrame({"Name": ["a", "b"]}, index=[3, 4])
+    assert row_keys(df, "Client ID") == {3: "row:3", 4: "row:4"}
+
+
+def test_row_fingerprints_change_only_with_the_hashed_columns():
+    df = pd.DataFrame({"A": ["x", "y"], "B": [1, 2]}, index=[5, 6])
+    hashes = main.row_fingerprints(df)
+    assert set(hashes) == {5, 6} and hashes[5] != hashes[6]
+    assert main.row_fingerprints(df.copy()) == hashes
+
+    edited = df.copy()
+    edited.loc[6, "B"] = 3
+    assert main.row_fingerprints(edited)[5] == hashes[5]
+    assert main.row_fingerprints(edited)[6] != hashes[6]
+    assert main.row_fingerprints(edited, ["A"]) == main.row_fingerprints(df, ["A"])
+
+
+def test_state_file_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "run_state.json")
+    assert load_run_state(path) == empty_run_state()
+    state = {**empty_run_state(), "last_run": NOW.isoformat(), "clients": {"C1": ["abc", "Spa"]}}
+    save_run_state(path, state)
+    assert load_run_state(path) == state
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"version": 0, "last_run": "x"}), "[]"])
+def test_unreadable_or_outdated_state_means_a_full_run(tmp_path, content):
+    path = tmp_path / "run_state.json"
+    path.write_text(content, encoding="utf-8")
+    assert load_run_state(str(path)) == empty_run_state()
+
+
+# ---------------------------------------------------------
+# Campaign selection
+# ---------------------------------------------------------
+def campaigns_frame():
+    return pd.DataFrame({
+        "Campaign ID": ["CMP-0001", "CMP-0002", "CMP-0003", "CMP-0004"],
+        "Target Client Category": ["Spa", " Golf ", "Dining", "Family"],
+    })
+
+
+def test_select_campaigns():
+    df = campaigns_frame()
+    keys = row_keys(df, "Campaign ID")
+    hashes = main.row_fingerprints(df)
+    previous = {
+        "CMP-0001": [hashes[0], None],
+        "CMP-0002": [hashes[1], (NOW + timedelta(days=1)).isoformat()],
+        "CMP-0003": ["edited since", None],
+        # CMP-0004 is new
+    }
+    assert main.select_campaigns(df, keys, hashes, previous, set(), NOW) == {2, 3}
+
+
+def test_select_campaigns_whose_boundary_has_passed():
+    df = campaigns_frame()
+    keys = row_keys(df, "Campaign ID")
+    hashes = main.row_fingerprints(df)
+    previous = {key: [hashes[idx], None] for idx, key in keys.items()}
+    previous["CMP-0001"][1] = (NOW - timedelta(minutes=1)).isoformat()
+    previous["CMP-0002"][1] = NOW.isoformat()
+    previous["CMP-0003"][1] = (NOW + timedelta(minutes=1)).isoformat()
+    assert main.select_campaigns(df, keys, hashes, previous, set(), NOW) == {0, 1}
+
+
+def test_select_campaigns_with_an_affected_audience():
+    df = campaigns_frame()
+    keys = row_keys(df, "Campaign ID")
+    hashes = main.row_fingerprints(df)
+    previous = {key: [hashes[idx], None] for idx, key in keys.items()}
+    assert main.select_campaigns(df, keys, hashes, previous, {"golf", "family"}, NOW) == {1, 3}
+
+
+# ---------------------------------------------------------
+# Whole runs against the Sheets emulator
+# ---------------------------------------------------------
+CLIENT_HEADER = ["Client ID", "Chat Text", "Client Type", "Client Interests", "Client Traits", "Client Category"]
+CAMPAIGN_HEADER = ["Campaign ID", "Campaign Text", "Target Client Category", "Start Date-Time",
+                   "End Date-Time", "Campaign Status", "Target Customers Count"]
+PROFILE = {"client_type": "Business Traveler", "client_interests": ["Work"], "client_traits": ["Efficient"]}
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Profiles every chat as a business trip, except chats containing FAIL (unparseable reply)."""
+
+    model_name = "models/test-stub"
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        self.prompts.append(prompt)
+        sections = re.findall(r"### Client ID: (\S+)\n(.*?)(?=\n\n### Client ID:|\n\nFor EACH|\Z)", prompt, re.DOTALL)
+        if sections:
+            return StubResponse(json.dumps([dict(PROFILE, client_id=cid) for cid, chat in sections
+                                            if "FAIL" not in chat]))
+        if "Client Type:" in prompt:
+            return StubResponse("Business")
+        return StubResponse("not json" if "FAIL" in prompt else json.dumps(PROFILE))
+
+
+class Job:
+    """process_clients_and_campaigns() against an in-memory spreadsheet, recording Gemini
+    prompts and the campaigns each incremental run selects."""
+
+    def __init__(self, sheets, gemini):
+        self.sheets = sheets
+        self.gemini = gemini
+        self.selected = []
+
+    def run(self, full=False):
+        self.gemini.prompts.clear()
+        main.process_clients_and_campaigns(full=full)
+        return load_run_state(main.RUN_STATE_FILE)
+
+    def cell(self, sheet, row, column):
+        return self.sheets.tables[sheet][row][self.sheets.tables[sheet][0].index(column)]
+
+    def set_cell(self, sheet, row, column, value):
+        self.sheets.tables[sheet][row][self.sheets.tables[sheet][0].index(column)] = value
+
+
+@pytest.fixture(params=[(0, False), (2, False), (2, True)], ids=["one-read", "windowed", "pipelined"])
+def job(request, tmp_path, monkeypatch):
+    day, now = timedelta(days=1), datetime.now()      # statuses are computed against the wall clock
+    sheets = SheetsEmulator({
+        main.CLIENTS_SHEET: [
+            CLIENT_HEADER,
+            ["C1", "Quiet room for a work trip", "", "", "", ""],
+            ["C2", "Spa weekend please", "Leisure", "Spa", "Relaxed", "Spa"],
+            ["C3", "FAIL: this chat cannot be profiled", "", "", "", ""],
+        ],
+        main.CAMPAIGNS_SHEET: [
+            CAMPAIGN_HEADER,
+            ["CMP-0001", "Spa offer", "Spa", (now - day).isoformat(), (now + 30 * day).isoformat(), "", ""],
+            ["CMP-0002", "Business offer", "Business", (now - day).isoformat(), (now + 30 * day).isoformat(), "", ""],
+            ["CMP-0003", "Golf offer", "Golf", (now + 10 * day).isoformat(), (now + 20 * day).isoformat(), "", ""],
+        ],
+    })
+    job = Job(sheets, StubGemini())
+    select_campaigns = main.select_campaigns
+
+    def recording_select_campaigns(*args):
+        job.selected.append(select_campaigns(*args))
+        return job.selected[-1]
+
+    monkeypatch.chdir(tmp_path)         # files the run writes to the working directory
+    monkeypatch.setenv("SHEETS_BACKEND", "emulator")
+    monkeypatch.setattr(main, "init_google_sheets", lambda: sheets)
+    monkeypatch.setattr(main, "init_gemini", lambda: job.gemini)
+    monkeypatch.setattr(main, "gemini_limiter", RateLimiter(60000, 4))
+    monkeypatch.setattr(main, "llm_cache", LLMCache(str(tmp_path / "llm.sqlite3"), enabled=False))
+    monkeypatch.setattr(main, "INCREMENTAL_MODE", True)
+    monkeypatch.setattr(main, "RUN_STATE_FILE", str(tmp_path / "run_state.json"))
+    monkeypatch.setattr(main, "CLIENTS_READ_WINDOW", request.param[0])
+    monkeypatch.setattr(main, "PIPELINED_RUN", request.param[1])
+    monkeypatch.setattr(main, "select_campaigns", recording_select_campaigns)
+    return job
+
+
+def test_first_run_saves_a_watermark_without_unenriched_rows(job):
+    state = job.run()
+    assert state["last_run"] is not None
+    # C3's chat could not be profiled: left out, so the next run retries it
+    assert set(state["clients"]) == {"C1", "C2"}
+    assert state["clients"]["C1"][1] == "Business"
+    assert set(state["campaigns"]) == {"CMP-0001", "CMP-0002", "CMP-0003"}
+    assert job.selected == []                     # full run: no selection
+    assert job.cell(main.CLIENTS_SHEET, 1, "Client Category") == "Business"
+    assert job.cell(main.CLIENTS_SHEET, 3, "Client Category") == ""
+
+
+def test_unchanged_sheet_only_retries_unenriched_rows(job):
+    job.run()
+    state = job.run()
+    assert job.selected == [set()]
+    assert len(job.gemini.prompts) == 1 and "FAIL" in job.gemini.prompts[0]
+    assert set(state["clients"]) == {"C1", "C2"}
+
+
+def test_recategorized_client_selects_campaigns_of_old_and_new_category(job):
+    job.run()
+    for column in ("Client Type", "Client Interests", "Client Traits", "Client Category"):
+        job.set_cell(main.CLIENTS_SHEET, 2, column, "")
+    job.set_cell(main.CLIENTS_SHEET, 2, "Chat Text", "Actually this is a work trip")
+    state = job.run()
+    assert job.selected == [{0, 1}]               # Spa (old category) and Business (new one), not Golf
+    assert state["clients"]["C2"][1] == "Business"
+    assert job.cell(main.CAMPAIGNS_SHEET, 1, "Target Customers Count") == 0
+    assert job.cell(main.CAMPAIGNS_SHEET, 2, "Target Customers Count") == 2
+
+
+def test_full_run_ignores_the_watermark(job):
+    job.run()
+    job.run(full=True)
+    assert job.selected == []
+    assert any("FAIL" in prompt for prompt in job.gemini.prompts)
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+import llm_cache as llm_cache_module
+from llm_cache import LLMCache, normalize_input
+
+
+class Clock:
+    """Stand-in for time.time() in llm_cache."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache" / "llm.sqlite3"), max_entries=3, ttl_days=1)
+    yield cache
+    cache.close()
+
+
+def test_normalize_input():
+    assert normalize_input("Need a  quiet\r\nroom \t ") == "Need a quiet room"
+    assert normalize_input("Café") == normalize_input("Café")
+    assert normalize_input(42) == "42"
+
+
+def test_key_ignores_cosmetic_differences_only():
+    key = LLMCache.make_key("profile", "gemini", "Need a quiet room")
+    assert LLMCache.make_key("profile", "gemini", " Need a  quiet\r\nroom ") == key
+    assert LLMCache.make_key("profile", "gemini", "need a quiet room") != key
+    assert LLMCache.make_key("category", "gemini", "Need a quiet room") != key
+    assert LLMCache.make_key("profile", "gemini-pro", "Need a quiet room") != key
+    assert LLMCache.make_key("profile", None, "x") == LLMCache.make_key("profile", "", "x")
+
+
+def test_round_trip_and_counters(cache, clock):
+    assert cache.get("profile", "gemini", "chat") is None
+    cache.put("profile", "gemini", "chat", {"client_type": "Family", "client_interests": ["Pool"]})
+    assert cache.get("profile", "gemini", "chat ") == {"client_type": "Family", "client_interests": ["Pool"]}
+    assert cache.get("category", "gemini", "chat") is None
+    assert cache.hits == {"profile": 1}
+    assert cache.misses == {"profile": 1, "category": 1}
+    assert os.path.exists(cache.path)       # parent directory created on first use
+
+
+def test_empty_results_are_not_stored(cache, clock):
+    for value in (None, "", {}, []):
+        cache.put("category", "gemini", "chat", value)
+    assert cache.get("category", "gemini", "chat") is None
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("category", "gemini", "chat", "Leisure")
+    clock.now += 86400 - 1
+    assert cache.get("category", "gemini", "chat") == "Leisure"
+    clock.now += 2
+    assert cache.get("category", "gemini", "chat") is None
+
+
+def test_reading_does_not_extend_ttl(cache, clock):
+    cache.put("category", "gemini", "chat", "Leisure")
+    clock.now += 86400 - 1
+    cache.get("category", "gemini", "chat")
+    clock.now += 2
+    assert cache.get("category", "gemini", "chat") is None
+
+
+def test_least_recently_used_entries_are_evicted_on_close(tmp_path, clock):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path, max_entries=3, ttl_days=30)
+    for i in range(4):
+        clock.now += 1
+        cache.put("category", "gemini", f"chat {i}", f"value {i}")
+    clock.now += 1
+    cache.get("category", "gemini", "chat 0")     # 0 is now the most recently used
+    cache.close()
+
+    cache = LLMCache(path, max_entries=3, ttl_days=30)
+    assert cache.get("category", "gemini", "chat 1") is None
+    assert [cache.get("category", "gemini", f"chat {i}") for i in (0, 2, 3)] == ["value 0", "value 2", "value 3"]
+    cache.close()
+
+
+def test_expired_entries_are_purged_on_open(tmp_path, clock):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path, ttl_days=1)
+    cache.put("category", "gemini", "chat", "Leisure")
+    cache.close()
+    clock.now += 2 * 86400
+    cache = LLMCache(path, ttl_days=1)
+    assert cache._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone() == (0,)
+    cache.close()
+
+
+def test_disabled_cache_never_touches_disk(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), enabled=False)
+    cache.put("profile", "gemini", "chat", {"client_type": "Family"})
+    assert cache.get("profile", "gemini", "chat") is None
+    cache.close()
+    assert not os.listdir(tmp_path)
+    assert cache.hits == {} and cache.misses == {}
+
+
+def test_only_valid_profile_replies_are_cached(tmp_path, monkeypatch):
+    import main
+
+    replies = iter(['{"client_type": "", "client_interests": "Pool"}',
+                    '```json\n{"client_type": " Family ", "client_interests": ["Pool"], "client_traits": []}\n```'])
+    monkeypatch.setattr(main, "call_gemini_with_retry", lambda model, prompt: next(replies))
+    monkeypatch.setattr(main, "llm_cache", LLMCache(str(tmp_path / "llm.sqlite3")))
+
+    assert main.extract_client_profile(None, "chat") is None
+    assert main.llm_cache.get("profile", "", "chat") is None
+    profile = {"client_type": "Family", "client_interests": ["Pool"], "client_traits": []}
+    assert main.extract_client_profile(None, "chat") == profile
+    assert main.extract_client_profile(None, "chat") == profile      # served from the cache
+    main.llm_cache.close()
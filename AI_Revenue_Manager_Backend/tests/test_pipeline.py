@@ -0,0 +1,196 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import main
+from enrichment_journal import EnrichmentJournal, journal_key
+from pipeline import BackgroundWriter, prefetch
+
+
+# ---------------------------------------------------------
+# EnrichmentJournal
+# ---------------------------------------------------------
+def test_journal_key_follows_the_chat():
+    assert journal_key(" C1 ", "chat") == journal_key("C1", "chat")
+    assert journal_key("C1", "chat") != journal_key("C1", "edited chat")
+    assert journal_key("C1", "chat") != journal_key("C2", "chat")
+
+
+def test_journal_is_replayed_by_the_next_run(tmp_path):
+    path = str(tmp_path / "state" / "journal.jsonl")
+    journal = EnrichmentJournal(path)
+    journal.append([("C1|a", {"Client Type": "Family"}), ("C2|b", {})])     # empty updates are skipped
+    journal.append([("C1|a", {"Client Type": "Business", "Client Category": "Work"})])
+    assert journal.appended == 2
+    journal.close()                       # the run dies here
+
+    resumed = EnrichmentJournal(path)
+    assert resumed.get("C1|a") == {"Client Type": "Business", "Client Category": "Work"}   # latest wins
+    assert resumed.get("C2|b") is None
+    assert resumed.replayed == 1
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = EnrichmentJournal(str(path))
+    journal.append([("C1|a", {"Client Type": "Family"})])
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "C2|b", "upd')
+    assert EnrichmentJournal(str(path)).entries == {"C1|a": {"Client Type": "Family"}}
+
+
+def test_clear_removes_the_file(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = EnrichmentJournal(str(path))
+    journal.append([("C1|a", {"Client Type": "Family"})])
+    journal.clear()
+    assert not path.exists()
+    assert journal.get("C1|a") is None
+    assert EnrichmentJournal(str(path)).entries == {}
+
+
+def test_disabled_journal_writes_and_replays_nothing(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = EnrichmentJournal(str(path), enabled=False)
+    journal.append([("C1|a", {"Client Type": "Family"})])
+    assert journal.get("C1|a") is None
+    journal.clear()
+    assert not path.exists()
+
+
+# ---------------------------------------------------------
+# prefetch
+# ---------------------------------------------------------
+def test_prefetch_yields_every_item_in_order():
+    assert list(prefetch(iter(range(10)), depth=2)) == list(range(10))
+
+
+def test_prefetch_reads_ahead():
+    produced = []
+
+    def pages():
+        for i in range(3):
+            produced.append(i)
+            yield i
+
+    items = prefetch(pages(), depth=1)
+    assert next(items) == 0
+    deadline = time.monotonic() + 2
+    while len(produced) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert produced[:2] == [0, 1]         # page 1 was fetched while page 0 was being used
+    assert list(items) == [1, 2]
+
+
+def test_prefetch_reraises_producer_errors_in_the_consumer():
+    def pages():
+        yield 1
+        raise ValueError("page 2 failed")
+
+    items = prefetch(pages())
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="page 2 failed"):
+        next(items)
+
+
+def test_prefetch_stops_the_producer_when_the_consumer_quits():
+    produced = []
+
+    def pages():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = prefetch(pages(), depth=1)
+    assert next(items) == 0
+    items.close()
+    time.sleep(1.2)                       # the producer notices the stop flag within its 0.5s put timeout
+    count = len(produced)
+    time.sleep(0.6)
+    assert len(produced) == count < 100
+
+
+# ---------------------------------------------------------
+# BackgroundWriter
+# ---------------------------------------------------------
+def test_writer_sends_jobs_in_submission_order():
+    sent = []
+
+    def send(job):
+        time.sleep(0.001 * (job % 3))     # uneven send times must not reorder writes
+        sent.append(job)
+
+    writer = BackgroundWriter(send, max_pending=2)
+    for job in range(20):
+        writer.submit(job)
+    writer.close()
+    assert sent == list(range(20))
+    assert writer.sent == 20
+
+
+def test_writer_runs_on_its_own_thread():
+    threads = []
+    writer = BackgroundWriter(lambda job: threads.append(threading.current_thread()))
+    writer.submit("job")
+    writer.close()
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_failed_write_drops_later_jobs_and_is_reraised():
+    sent = []
+    failed = threading.Event()
+
+    def send(job):
+        if job == 2:
+            failed.set()
+            raise RuntimeError("Sheets said no")
+        sent.append(job)
+
+    writer = BackgroundWriter(send)
+    for job in range(4):
+        writer.submit(job)
+    assert failed.wait(2)
+    writer.jobs.join()
+    with pytest.raises(RuntimeError, match="Sheets said no"):
+        writer.submit(5)                  # enrichment learns about the failure at its next checkpoint
+    with pytest.raises(RuntimeError, match="Sheets said no"):
+        writer.close()
+    assert sent == [0, 1]
+    assert writer.sent == 2
+
+
+# ---------------------------------------------------------
+# enrich_clients
+# ---------------------------------------------------------
+def test_failed_checkpoint_cancels_queued_clients_and_journals_finished_ones(tmp_path, monkeypatch):
+    enriched = []
+
+    def enrich_client(analyzer, categorizer, client_id, chat, current):
+        time.sleep(0.05)
+        enriched.append(client_id)
+        return {"Client Type": "Family", "Client Category": "Leisure"}
+
+    def checkpoint():
+        raise RuntimeError("Sheets said no")
+
+    monkeypatch.setattr(main, "enrich_client", enrich_client)
+    monkeypatch.setattr(main, "GEMINI_MAX_IN_FLIGHT", 2)
+    monkeypatch.setattr(main, "PROFILE_BATCH_SIZE", 1)
+    monkeypatch.setattr(main, "BATCH_SIZE", 1)
+    clients = pd.DataFrame({
+        "Client ID": [f"C{i}" for i in range(20)],
+        "Chat Text": [f"chat {i}" for i in range(20)],
+        "Client Type": "", "Client Interests": "", "Client Traits": "", "Client Category": "",
+    })
+    journal = EnrichmentJournal(str(tmp_path / "journal.jsonl"))
+
+    with pytest.raises(RuntimeError, match="Sheets said no"):
+        main.enrich_clients(clients, None, None, checkpoint, set(), journal=journal)
+    journal.close()
+
+    assert 2 <= len(enriched) < 20                     # queued clients never reached Gemini
+    resumed = EnrichmentJournal(journal.path)          # ...and every one that did is journaled
+    assert set(resumed.entries) == {journal_key(cid, f"chat {cid[1:]}") for cid in enriched}
@@ -0,0 +1,221 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from google.api_core import exceptions as gexc
+from googleapiclient.errors import HttpError
+
+import retry_policy
+from retry_policy import (
+    FATAL, THROTTLE, TRANSIENT, CircuitBreaker, EmptyResponse, RetryPolicy, classify_error, server_retry_delay,
+)
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, message="", headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff sleeps of RetryPolicy.call, recorded instead of slept."""
+    recorded = []
+    monkeypatch.setattr(retry_policy.time, "sleep", recorded.append)
+    return recorded
+
+
+# ---------------------------------------------------------
+# Classification
+# ---------------------------------------------------------
+@pytest.mark.parametrize("exc, kind", [
+    (http_error(429), THROTTLE),
+    (gexc.ResourceExhausted("quota"), THROTTLE),
+    (StatusError(429), THROTTLE),
+    (http_error(500), TRANSIENT),
+    (http_error(503), TRANSIENT),
+    (http_error(408), TRANSIENT),
+    (gexc.ServiceUnavailable("down"), TRANSIENT),
+    (gexc.DeadlineExceeded("slow"), TRANSIENT),
+    (ConnectionError(), TRANSIENT),
+    (TimeoutError(), TRANSIENT),
+    (EmptyResponse(), TRANSIENT),
+    (http_error(400), FATAL),
+    (http_error(403), FATAL),
+    (http_error(404), FATAL),
+    (gexc.InvalidArgument("bad prompt"), FATAL),
+    (ValueError("blocked reply"), FATAL),
+])
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def test_429_message_text_alone_is_not_a_throttle():
+    assert classify_error(ValueError("quota 429 in the prompt text")) == FATAL
+
+
+# ---------------------------------------------------------
+# Server-requested delay
+# ---------------------------------------------------------
+def test_retry_after_header():
+    assert server_retry_delay(StatusError(429, headers={"Retry-After": "7"})) == 7.0
+
+
+def test_unparseable_retry_after_header_is_ignored():
+    assert server_retry_delay(StatusError(429, headers={"Retry-After": "soon"})) is None
+
+
+def test_retry_info_detail():
+    delay = SimpleNamespace(seconds=3, nanos=500_000_000)
+    exc = StatusError(429)
+    exc.details = [SimpleNamespace(retry_delay=delay)]
+    assert server_retry_delay(exc) == 3.5
+
+
+def test_retry_delay_in_message():
+    assert server_retry_delay(StatusError(429, "Quota exceeded, please retry in 12.5s.")) == 12.5
+    assert server_retry_delay(StatusError(429, "retry_delay { seconds: 9 }")) == 9.0
+    assert server_retry_delay(StatusError(429, "Quota exceeded")) is None
+
+
+# ---------------------------------------------------------
+# RetryPolicy.call
+# ---------------------------------------------------------
+def failing(*errors, result="ok"):
+    """fn() raising `errors` one per call, then returning `result`."""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+
+def test_throttle_is_retried_no_sooner_than_retry_after(sleeps):
+    policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=60)
+    fn = failing(StatusError(429, headers={"Retry-After": "20"}))
+    assert policy.call(fn) == "ok"
+    assert len(fn.calls) == 2
+    assert sleeps[0] >= 20
+    assert (policy.throttled, policy.retries, policy.gave_up) == (1, 1, 0)
+
+
+def test_retry_after_is_capped_by_max_delay(sleeps):
+    policy = RetryPolicy(max_retries=2, base_delay=1, max_delay=5)
+    policy.call(failing(StatusError(429, headers={"Retry-After": "600"})))
+    assert sleeps == [5]
+
+
+def test_transient_errors_back_off_exponentially(sleeps):
+    policy = RetryPolicy(max_retries=4, base_delay=2, max_delay=60)
+    assert policy.call(failing(http_error(503), http_error(500), http_error(503))) == "ok"
+    # Equal jitter: attempt n waits between half and all of base * 2^(n-1)
+    for attempt, delay in enumerate(sleeps, start=1):
+        ceiling = 2 * 2 ** (attempt - 1)
+        assert ceiling / 2 <= delay <= ceiling
+    assert policy.transient_errors == 3
+
+
+def test_fatal_error_is_not_retried(sleeps):
+    policy = RetryPolicy(max_retries=5, base_delay=1)
+    fn = failing(http_error(400))
+    assert policy.call(fn) is None
+    assert len(fn.calls) == 1 and sleeps == []
+    assert policy.fatal_errors == 1
+    with pytest.raises(HttpError):
+        policy.call(failing(http_error(404)), reraise=True)
+
+
+def test_gives_up_after_max_retries(sleeps):
+    policy = RetryPolicy(max_retries=3, base_delay=1)
+    fn = failing(*[http_error(503)] * 5)
+    assert policy.call(fn) is None
+    assert len(fn.calls) == 3 and len(sleeps) == 2
+    assert policy.gave_up == 1
+    with pytest.raises(HttpError):
+        policy.call(failing(*[http_error(503)] * 5), reraise=True)
+
+
+# ---------------------------------------------------------
+# CircuitBreaker
+# ---------------------------------------------------------
+def test_breaker_trips_after_threshold_consecutive_throttles():
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+    breaker.record_throttle()
+    breaker.record_throttle()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success()                       # a success resets the streak
+    breaker.record_throttle()
+    breaker.record_throttle()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_throttle()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+
+
+def test_open_breaker_honours_a_longer_retry_after():
+    breaker = CircuitBreaker(threshold=1, cooldown=1)
+    breaker.record_throttle(retry_after=60)
+    assert breaker.open_until - time.monotonic() > 50
+
+
+def test_half_open_ramps_up_then_closes():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05, max_in_flight=4)
+    breaker.record_throttle()
+    started = time.monotonic()
+    with breaker:
+        assert time.monotonic() - started >= 0.04      # waited out the cooldown
+        assert (breaker.state, breaker.allowed) == (CircuitBreaker.HALF_OPEN, 1)
+    breaker.record_success()
+    assert (breaker.state, breaker.allowed) == (CircuitBreaker.HALF_OPEN, 2)
+    breaker.record_success()
+    assert (breaker.state, breaker.allowed) == (CircuitBreaker.CLOSED, 4)
+
+
+def test_half_open_admits_one_call_at_a_time():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01, max_in_flight=4)
+    breaker.record_throttle()
+    entered = threading.Event()
+
+    def second_call():
+        with breaker:
+            entered.set()
+
+    with breaker:
+        worker = threading.Thread(target=second_call)
+        worker.start()
+        assert not entered.wait(0.1)                   # blocked while the probe is in flight
+    assert entered.wait(1)
+    worker.join()
+
+
+def test_throttle_while_half_open_reopens_with_doubled_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01, max_cooldown=0.03)
+    breaker.record_throttle()
+    with breaker:
+        pass
+    breaker.record_throttle()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.cooldown == 0.02 and breaker.trips == 2
+    with breaker:
+        pass
+    breaker.record_throttle()
+    assert breaker.cooldown == 0.03                    # capped at max_cooldown
+
+
+def test_policy_feeds_throttles_to_the_breaker(sleeps):
+    breaker = CircuitBreaker(threshold=2, cooldown=0.01)
+    policy = RetryPolicy(max_retries=3, base_delay=0, breaker=breaker)
+    assert policy.call(failing(http_error(429), http_error(429))) == "ok"
+    assert breaker.trips == 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN   # the successful probe doubled the allowance
+    assert policy.stats()["breaker_trips"] == 1
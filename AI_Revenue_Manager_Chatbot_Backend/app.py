@@ -1,7 +1,26 @@
 import os
+import time
+import asyncio
+import json
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi import Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import google.generativeai as genai
+import httpx  # async HTTP client
+
+import metrics
+from session_store import create_session_backend, MemorySessionBackend
+from history_compaction import compact_history, conversation_key, prefix_hash, summary_prompt
+from response_cache import cache_key, personalize, prompt_fingerprint, reply_template
+
+# Optional: HTTP/2 for the Apps Script client (needs the `h2` package)
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # from config import (
     # GEMINI_API_KEY,
@@ -21,20 +40,92 @@ import google.generativeai as genai
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "").strip()
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "").strip()
 APPS_SCRIPT_URL = os.environ.get("APPS_SCRIPT_URL", "").strip()
+# Per-instance cap on concurrent Gemini calls (size together with Cloud Run --concurrency)
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "32"))
+# Seconds a chat may wait for a free slot + its Gemini reply (the whole stream, when streamed)
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "30"))
+# Upper bound for closing an abandoned Gemini stream
+STREAM_CLOSE_TIMEOUT_SECONDS = 2
+# Warm the Gemini connection at startup with a (free) count_tokens call
+GEMINI_WARMUP = os.environ.get("GEMINI_WARMUP", "true").strip().lower() not in ("0", "false", "no")
+# Pooled connections to Apps Script shared by all /save-chat requests
+APPS_SCRIPT_MAX_CONNECTIONS = int(os.environ.get("APPS_SCRIPT_MAX_CONNECTIONS", "20"))
+# Server-side chat sessions (requests with a sessionId), see session_store.py
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory").strip().lower()
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", str(6 * 3600)))
+# Approx. tokens of past turns sent verbatim; older turns are folded into a booking-facts
+# summary (see history_compaction.py). 0 sends the whole history.
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "2000"))
+# Cached replies for opening questions (see response_cache.py); 0 disables the cache
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "2000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", str(6 * 3600)))
+# Only turns with at most this many past messages are cached (0 = first turn only)
+RESPONSE_CACHE_MAX_HISTORY = int(os.environ.get("RESPONSE_CACHE_MAX_HISTORY", "2"))
 # SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
 
-print("GEMINI_MODEL:", GEMINI_API_KEY)
-print("GEMINI_MODEL:", GEMINI_MODEL)
-print("GEMINI_MODEL:", APPS_SCRIPT_URL)
-
 # ---------------------------------------------------------
-# CONFIGURE GEMINI
+# STARTUP: CONFIGURE GEMINI + SHARED CLIENTS (once per instance)
 # ---------------------------------------------------------
-# Make sure your environment contains:
-# export GOOGLE_API_KEY="your-key"
-genai.configure(api_key=GEMINI_API_KEY)
+async def warm_up(model):
+    """Open the Gemini connection before the first guest arrives (failures are only logged)."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(model.count_tokens_async("ping"), 10)
+        print(f"✅ Gemini warmed up in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print("⚠️ Gemini warm-up failed (first chat will open the connection):", e)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Validate config once; the endpoints keep answering with the same messages if something is missing
+    app.state.gemini_model = None
+    if not GEMINI_API_KEY:
+        print("⚠️ GEMINI_API_KEY is not set — /llm-chat is disabled")
+    elif not GEMINI_MODEL:
+        print("⚠️ GEMINI_MODEL is not set — /llm-chat is disabled")
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+        app.state.gemini_model = genai.GenerativeModel(model_name=GEMINI_MODEL)
+        print("✅ Gemini model ready:", GEMINI_MODEL)
+        if GEMINI_WARMUP:
+            await warm_up(app.state.gemini_model)
+    if not APPS_SCRIPT_URL:
+        print("⚠️ APPS_SCRIPT_URL is not set — /save-chat is disabled")
+
+    app.state.sessions = create_session_backend(SESSION_BACKEND, SESSION_MAX, SESSION_TTL_SECONDS)
+    print(f"✅ Session store ready ({SESSION_BACKEND}, max {SESSION_MAX}, TTL {SESSION_TTL_SECONDS}s)")
+    # Rolling booking-facts summaries per conversation (history compaction)
+    app.state.summaries = MemorySessionBackend(SESSION_MAX, SESSION_TTL_SECONDS)
+    app.state.summarizing = set()
+    app.state.background_tasks = set()
+    # Replies to opening questions, keyed on SYSTEM_PROMPT + model (see response_cache.py)
+    app.state.response_cache = MemorySessionBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS)
+    app.state.prompt_fingerprint = prompt_fingerprint(SYSTEM_PROMPT, GEMINI_MODEL)
+    if RESPONSE_CACHE_SIZE > 0:
+        print(f"✅ Response cache ready (max {RESPONSE_CACHE_SIZE}, TTL {RESPONSE_CACHE_TTL_SECONDS}s, "
+              f"history <= {RESPONSE_CACHE_MAX_HISTORY} messages)")
+
+    # One keep-alive connection pool for every /save-chat forward (no TLS handshake per call)
+    app.state.http_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=10.0,
+        limits=httpx.Limits(
+            max_connections=APPS_SCRIPT_MAX_CONNECTIONS,
+            max_keepalive_connections=APPS_SCRIPT_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+    )
+    print(f"✅ Apps Script client ready (HTTP/{'2' if HTTP2_AVAILABLE else '1.1'}, "
+          f"{APPS_SCRIPT_MAX_CONNECTIONS} pooled connections)")
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -57,17 +148,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: times every request end to end (see metrics.py)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # ---------------------------------------------------------
 # REQUEST / RESPONSE MODELS
 # ---------------------------------------------------------
 class ChatRequest(BaseModel):
-    chatHistory: list    # list of {role: "user"/"assistant", text: "..."}
+    chatHistory: list = []    # list of {role: "user"/"assistant", text: "..."}
     userMessage: str
     clientName: str | None = "Guest"   # Optional: frontend can send the name
+    # Optional: with a sessionId the history is kept server-side and chatHistory
+    # only needs to be sent to seed a new (or expired) session
+    sessionId: str | None = None
 
 
 class ChatResponse(BaseModel):
     response: str
+    sessionId: str | None = None
 
 class ChatSession(BaseModel):
     clientId: str
@@ -123,26 +221,75 @@ Your objectives:
 # ---------------------------------------------------------
 # FORMAT MESSAGES FOR GEMINI
 # ---------------------------------------------------------
-def convert_messages(history, system_prompt, client_name):
-    """
-    Convert chat history into Gemini-compatible messages
-    using roles: user, model.
-    """
-    messages = [
+def system_message(system_prompt, client_name):
+    return {
+        "role": "user",
+        "parts": [{"text": system_prompt.replace("{clientName}", client_name)}]
+    }
+
+
+def history_messages(history):
+    """Frontend history items ({role, text}) -> Gemini messages (roles: user, model)."""
+    return [
         {
-            "role": "user",
-            "parts": [{"text": system_prompt.replace("{clientName}", client_name)}]
+            "role": "user" if item["role"] == "user" else "model",
+            "parts": [{"text": item["text"]}]
         }
+        for item in history
     ]
 
-    for item in history:
-        role = "user" if item["role"] == "user" else "model"
-        messages.append({
-            "role": role,
-            "parts": [{"text": item["text"]}]
+
+# ---------------------------------------------------------
+# NON-BLOCKING GEMINI CALL
+# ---------------------------------------------------------
+gemini_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+
+async def generate_reply(model, messages):
+    """
+    Await Gemini through the SDK's async API, so the event loop keeps serving
+    other chats and health checks meanwhile. At most GEMINI_MAX_CONCURRENCY calls
+    run at once; raises TimeoutError after GEMINI_TIMEOUT_SECONDS (slot wait included).
+    """
+    async def call():
+        async with gemini_slots:
+            metrics.GEMINI_IN_FLIGHT.inc()
+            try:
+                response = await model.generate_content_async(contents=messages)
+            finally:
+                metrics.GEMINI_IN_FLIGHT.dec()
+            return response.text
+
+    return await asyncio.wait_for(call(), GEMINI_TIMEOUT_SECONDS)
+
+# ---------------------------------------------------------
+# HISTORY COMPACTION (background summary updates)
+# ---------------------------------------------------------
+async def update_summary(model, key, summary, messages, summarized):
+    """Fold messages[summarized:] into the conversation's booking-facts summary."""
+    try:
+        text = await generate_reply(model, summary_prompt(summary, messages[summarized:]))
+        await app.state.summaries.put(key, {
+            "summary": text.strip(),
+            "summarized": len(messages),
+            "prefix": prefix_hash(messages),
         })
+        metrics.HISTORY_SUMMARIES.inc(outcome="ok")
+    except Exception as e:
+        metrics.HISTORY_SUMMARIES.inc(outcome="error")
+        print("⚠️ History summary update failed (older turns stay verbatim):", e)
+    finally:
+        app.state.summarizing.discard(key)
 
-    return messages
+
+def schedule_summary(model, key, summary, messages, summarized):
+    """Start update_summary() unless one is already running for this conversation."""
+    if key in app.state.summarizing:
+        return
+    app.state.summarizing.add(key)
+    task = asyncio.create_task(update_summary(model, key, summary, messages, summarized))
+    app.state.background_tasks.add(task)
+    task.add_done_callback(app.state.background_tasks.discard)
 
 # ---------------------------------------------------------
 # Cloud Run’s health check
@@ -159,55 +306,251 @@ def convert_messages(history, system_prompt, client_name):
 async def root():
     return {"chatbot backend deployment status": "ok"}
 
+# ---------------------------------------------------------
+# METRICS (Prometheus text format)
+# ---------------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # ---------------------------------------------------------
 # LLM CHAT ENDPOINT
 # ---------------------------------------------------------
+async def prepare_chat(req, model):
+    """
+    Session lookup + history compaction for one chat turn.
+    Returns (session or None, client name, the new user turn, the messages to send
+    to Gemini, response-cache key or None if the turn is not cacheable).
+    """
+    session = None
+    if req.sessionId:
+        # Session mode: the history is kept server-side (already in Gemini format)
+        session = await app.state.sessions.get(req.sessionId)
+        if session is None:
+            # New or expired session: seed it from whatever history the client sent
+            session = {"clientName": req.clientName or "Guest", "messages": history_messages(req.chatHistory)}
+            metrics.SESSION_LOOKUPS.inc(result="new")
+        else:
+            metrics.SESSION_LOOKUPS.inc(result="hit")
+        if "clientName" in req.model_fields_set and req.clientName:
+            session["clientName"] = req.clientName
+        client_name = session["clientName"]
+        past = session["messages"]
+    else:
+        # full chat history converted
+        client_name = req.clientName or "Guest"
+        past = history_messages(req.chatHistory)
+
+    # Compaction: recent turns verbatim (HISTORY_TOKEN_BUDGET), older ones as a cached summary
+    system = system_message(SYSTEM_PROMPT, client_name)
+    recent = past
+    if HISTORY_TOKEN_BUDGET > 0 and past:
+        key = conversation_key(req.sessionId, client_name, past)
+        summary, recent, summarized, fold_upto = compact_history(
+            past, await app.state.summaries.get(key), HISTORY_TOKEN_BUDGET)
+        if summary:
+            system["parts"].append({"text": "\n\nEarlier in this conversation (booking notes):\n" + summary})
+        if fold_upto > summarized:
+            schedule_summary(model, key, summary, past[:fold_upto], summarized)
+
+    # append fresh message
+    user_turn = {"role": "user", "parts": [{"text": req.userMessage}]}
+    messages = [system, *recent, user_turn]
+    metrics.CHAT_HISTORY_MESSAGES.observe(len(past))
+    metrics.PROMPT_CHARS.observe(sum(len(part["text"]) for m in messages for part in m["parts"]))
+
+    reply_key = None
+    if RESPONSE_CACHE_SIZE > 0 and len(past) <= RESPONSE_CACHE_MAX_HISTORY:
+        reply_key = cache_key(app.state.prompt_fingerprint, client_name, past, req.userMessage)
+    return session, client_name, user_turn, messages, reply_key
+
+
+async def cached_reply(reply_key, client_name):
+    """The cached reply personalized for this guest, or None."""
+    if reply_key is None:
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(result="bypass")
+        return None
+    entry = await app.state.response_cache.get(reply_key)
+    if entry is None:
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(result="miss")
+        return None
+    metrics.RESPONSE_CACHE_LOOKUPS.inc(result="hit")
+    metrics.RESPONSE_CACHE_SAVED_SECONDS.inc(entry["seconds"])
+    return personalize(entry["template"], client_name)
+
+
+async def cache_reply(reply_key, client_name, ai_reply, seconds):
+    """Store a fresh Gemini reply (with how long it took) for the next guest asking the same."""
+    if reply_key is None:
+        return
+    template = reply_template(ai_reply, client_name)
+    if template is None:
+        return
+    await app.state.response_cache.put(reply_key, {"template": template, "seconds": seconds})
+    metrics.RESPONSE_CACHE_ENTRIES.set(len(app.state.response_cache))
+
+
+async def remember_turn(req, session, user_turn, ai_reply):
+    """Session mode: append a completed turn (failed or cancelled turns are not remembered)."""
+    if session is None:
+        return
+    session["messages"] += [user_turn, {"role": "model", "parts": [{"text": ai_reply}]}]
+    await app.state.sessions.put(req.sessionId, session)
+    metrics.SESSIONS.set(len(app.state.sessions))
+
+
+def missing_config_reply():
+    metrics.ERRORS.inc(endpoint="/llm-chat", type="ConfigMissing")
+    return "No gemini api" if not GEMINI_API_KEY else "No gemini model"
+
+
 @app.post("/llm-chat", response_model=ChatResponse)
 async def llm_chat(req: ChatRequest):
     print("🔥 /llm-chat endpoint HIT")
     # return {"response": "Hello world"}
 
-    # full chat history converted
-    messages = convert_messages(req.chatHistory, SYSTEM_PROMPT, req.clientName or "Guest")
-    # append fresh message
-    messages.append({"role": "user", "parts": [{"text": req.userMessage}]})
+    # Shared model built at startup (see lifespan); None if the config is incomplete
+    model = getattr(app.state, "gemini_model", None)
+    if model is None:
+        # return {"status": "error", "message": "GEMINI API Key / Model not configured"}
+        return {"response": missing_config_reply()}
+
+    session, client_name, user_turn, messages, reply_key = await prepare_chat(req, model)
+
+    ai_reply = await cached_reply(reply_key, client_name)
+    if ai_reply is None:
+        # generate response
+        started = time.perf_counter()
+        try:
+            ai_reply = await generate_reply(model, messages)
+            elapsed = time.perf_counter() - started
+            metrics.GEMINI_CALL_SECONDS.observe(elapsed, outcome="ok")
+        except TimeoutError:
+            metrics.GEMINI_CALL_SECONDS.observe(time.perf_counter() - started, outcome="timeout")
+            metrics.ERRORS.inc(endpoint="/llm-chat", type="Timeout")
+            print(f"❌ Gemini API timeout after {GEMINI_TIMEOUT_SECONDS}s")
+            return {"response": f"Gemini did not answer within {GEMINI_TIMEOUT_SECONDS:g}s"}
+        except Exception as e:
+            metrics.GEMINI_CALL_SECONDS.observe(time.perf_counter() - started, outcome="error")
+            metrics.ERRORS.inc(endpoint="/llm-chat", type=type(e).__name__)
+            print("❌ Gemini API error:", e)
+            # return {"status": "error", "message": str(e)}
+            return {"response": str(e)}
+        await cache_reply(reply_key, client_name, ai_reply, elapsed)
+
+    await remember_turn(req, session, user_turn, ai_reply)
 
-    # Check GEMINI_API_KEY
-    if not GEMINI_API_KEY:
-        # raise RuntimeError("GEMINI_API_KEY is not set in the environment")
-        # return {"status": "error", "message": "GEMINI API Key not configured"}
-        return {"response": "No gemini api"}
-    # test print if gemini api key is read successfully
-    print("🔥 GEMINI_API_KEY starts with:", GEMINI_API_KEY[:6])
-
-    # Fetch gemini api key
-    import google.generativeai as genai
-    genai.configure(api_key=GEMINI_API_KEY)
-    
-    if not GEMINI_MODEL:
-        # raise RuntimeError("GEMINI_MODEL is not set in the environment")
-        # return {"status": "error", "message": "GEMINI Model not configured"}
-        return {"response": "No gemini model"}
-    # test print if gemini model is read successfully
-    print("🔥 GEMINI_MODEL:", GEMINI_MODEL)
-    
-    # return {"response": "gemini api and model are both fine"}
-    
-    # fetch gemini model and generate response
-    try:
-        # model = genai.models.TextGenerationModel(GEMINI_MODEL)
-        # response = model.generate_text(messages)
-        # ai_reply = response.text
-        model = genai.GenerativeModel(model_name=GEMINI_MODEL)
-        response = model.generate_content(contents=messages)
-        ai_reply = response.text
-    except Exception as e:
-        print("❌ Gemini API error:", e)
-        # return {"status": "error", "message": str(e)}
-        return {"response": str(e)}
-    
     # return {"response": "no exception"}
-    return ChatResponse(response=ai_reply)
+    return ChatResponse(response=ai_reply, sessionId=req.sessionId)
+
+# ---------------------------------------------------------
+# STREAMING LLM CHAT ENDPOINT (server-sent events)
+# ---------------------------------------------------------
+# Same request body as /llm-chat. The reply arrives as SSE events:
+#   data: {"text": "<next chunk>"}                        (repeated)
+#   event: done   data: {"response": "<full reply>", "sessionId": ...}
+#   event: error  data: {"message": "..."}
+# If the client disconnects, the Gemini stream is abandoned (cancelled) and the
+# turn is not remembered. A response-cache hit is sent as a single chunk.
+
+
+def sse(data, event=None):
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def chunk_text(chunk):
+    try:
+        return chunk.text
+    except (ValueError, AttributeError):
+        # e.g. a final chunk carrying only finish_reason / safety ratings
+        return ""
+
+
+@app.post("/llm-chat/stream")
+async def llm_chat_stream(req: ChatRequest, request: Request):
+    print("🔥 /llm-chat/stream endpoint HIT")
+
+    model = getattr(app.state, "gemini_model", None)
+    if model is None:
+        message = missing_config_reply()
+        return StreamingResponse(iter([sse({"message": message}, event="error")]), media_type="text/event-stream")
+
+    session, client_name, user_turn, messages, reply_key = await prepare_chat(req, model)
+    cached = await cached_reply(reply_key, client_name)
+
+    async def events():
+        if cached is not None:
+            # Cache hit: the whole reply as one chunk
+            await remember_turn(req, session, user_turn, cached)
+            yield sse({"text": cached})
+            yield sse({"response": cached, "sessionId": req.sessionId}, event="done")
+            return
+        started = time.perf_counter()
+        outcome = "error"
+        chunks = None
+        reply = []
+        try:
+            # Same contract as generate_reply: GEMINI_TIMEOUT_SECONDS includes the wait for a slot
+            deadline = started + GEMINI_TIMEOUT_SECONDS
+            await asyncio.wait_for(gemini_slots.acquire(), GEMINI_TIMEOUT_SECONDS)
+            metrics.GEMINI_IN_FLIGHT.inc()
+            finished = False
+            try:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(contents=messages, stream=True),
+                    max(deadline - time.perf_counter(), 0))
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(),
+                                                       max(deadline - time.perf_counter(), 0))
+                    except StopAsyncIteration:
+                        finished = True
+                        break
+                    text = chunk_text(chunk)
+                    if not text:
+                        continue
+                    if not reply:
+                        metrics.FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                    reply.append(text)
+                    yield sse({"text": text})
+                    if await request.is_disconnected():
+                        outcome = "cancelled"
+                        return
+            finally:
+                if not finished and chunks is not None and hasattr(chunks, "aclose"):
+                    # Stop reading the Gemini stream (cancels the underlying call); bounded
+                    # so a stuck close cannot hold the slot
+                    with suppress(Exception):
+                        await asyncio.wait_for(chunks.aclose(), STREAM_CLOSE_TIMEOUT_SECONDS)
+                metrics.GEMINI_IN_FLIGHT.dec()
+                gemini_slots.release()
+            ai_reply = "".join(reply)
+            await cache_reply(reply_key, client_name, ai_reply, time.perf_counter() - started)
+            await remember_turn(req, session, user_turn, ai_reply)
+            outcome = "ok"
+            yield sse({"response": ai_reply, "sessionId": req.sessionId}, event="done")
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away mid-stream
+            outcome = "cancelled"
+            raise
+        except TimeoutError:
+            outcome = "timeout"
+            metrics.ERRORS.inc(endpoint="/llm-chat/stream", type="Timeout")
+            print(f"❌ Gemini API timeout after {GEMINI_TIMEOUT_SECONDS}s")
+            yield sse({"message": f"Gemini did not answer within {GEMINI_TIMEOUT_SECONDS:g}s"}, event="error")
+        except Exception as e:
+            metrics.ERRORS.inc(endpoint="/llm-chat/stream", type=type(e).__name__)
+            print("❌ Gemini API error:", e)
+            yield sse({"message": str(e)}, event="error")
+        finally:
+            metrics.GEMINI_CALL_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ---------------------------------------------------------
 # SAVE CHAT SESSION ENDPOINT
@@ -236,10 +579,6 @@ async def llm_chat(req: ChatRequest):
 #         print("❌ ERROR:", e)
 #         raise e
 
-from fastapi import Request
-import httpx  # async HTTP client
-import json
-
 @app.post("/save-chat")
 async def save_chat(request: Request):
     """
@@ -255,35 +594,40 @@ async def save_chat(request: Request):
 
         if not APPS_SCRIPT_URL:
             # raise RuntimeError("APPS_SCRIPT_URL is not set in the environment")
+            metrics.ERRORS.inc(endpoint="/save-chat", type="ConfigMissing")
             return {"status": "error", "message": "Apps Script URL not configured"}
-        # test print if apps script url is read successfully
-        print("APPS_SCRIPT_URL:", APPS_SCRIPT_URL)
-
-        # Forward to Apps Script
-        async with httpx.AsyncClient() as client:
+        # Forward to Apps Script (shared pooled client, see lifespan)
+        client = app.state.http_client
+        started = time.perf_counter()
+        try:
             resp = await client.post(
                 APPS_SCRIPT_URL,
                 json=session,
                 headers={"Content-Type": "application/json"},
                 timeout=10.0
             )
+        except Exception:
+            metrics.APPS_SCRIPT_SECONDS.observe(time.perf_counter() - started, outcome="error")
+            raise
+        metrics.APPS_SCRIPT_SECONDS.observe(time.perf_counter() - started, outcome=str(resp.status_code))
 
-            # resp_data = resp.json()
+        # resp_data = resp.json()
 
-            # Robust parsing
-            resp_text = resp.text.strip()
-            try:
-                resp_data = json.loads(resp_text)
-            except json.JSONDecodeError:
-                # fallback: treat raw text as message
-                resp_data = {"status": "unknown", "message": resp_text}
-                print("⚠️ Warning: Apps Script response not valid JSON, raw text:", resp_text)
+        # Robust parsing
+        resp_text = resp.text.strip()
+        try:
+            resp_data = json.loads(resp_text)
+        except json.JSONDecodeError:
+            # fallback: treat raw text as message
+            resp_data = {"status": "unknown", "message": resp_text}
+            print("⚠️ Warning: Apps Script response not valid JSON, raw text:", resp_text)
 
-            print("📤 Response from Apps Script:", resp_data)
+        print("📤 Response from Apps Script:", resp_data)
 
         return {"status": "success", "appsScriptResponse": resp_data}
 
     except Exception as e:
+        metrics.ERRORS.inc(endpoint="/save-chat", type=type(e).__name__)
         print("❌ ERROR saving chat:", e)
         return {"status": "error", "message": str(e)}
 
@@ -0,0 +1,131 @@
+"""
+Benchmark: prompt size and Gemini latency per turn of a long concierge chat,
+with and without history compaction (HISTORY_TOKEN_BUDGET).
+
+    python bench_history.py                      # 60 turns, stateless full-history requests
+    python bench_history.py --turns 120 --session
+    python bench_history.py --budget 1000 --json results.json
+
+Gemini is stubbed in-process; its simulated latency grows with the prompt
+(base + per-token cost), which is how real completions behave.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("GEMINI_MODEL", "bench-model")
+os.environ.setdefault("GEMINI_WARMUP", "false")
+
+import google.generativeai as genai  # noqa: E402
+
+GUEST_LINES = [
+    "We are arriving on the 14th and leaving on the 18th, two adults and a 6-year-old.",
+    "My wife is allergic to shellfish, please keep that in mind for dinner bookings.",
+    "Could we get a quiet room with a sea view? Budget is around 250 per night.",
+    "Is the spa open in the evening? We'd love a couples massage on Saturday.",
+    "What excursions do you recommend for a family with a young child?",
+    "It's our 10th anniversary on the 16th, anything special you can arrange?",
+    "Do you have airport transfers? Our flight lands at 3pm.",
+    "Can you recommend a vegetarian-friendly restaurant nearby?",
+]
+REPLY = ("Certainly! " + "I have noted that and will make sure everything is arranged for your stay. " * 6).strip()
+NOTES = "- " + "\n- ".join(["Stay 14th-18th", "2 adults + child (6)", "Shellfish allergy (wife)",
+                            "Sea view, quiet, ~250/night", "Couples massage Sat", "Anniversary 16th",
+                            "Airport pickup 3pm"])
+
+
+class BenchModel:
+    """Stub whose latency is base + per-token cost of the prompt; records prompt sizes."""
+    base_latency = 0.05
+    seconds_per_token = 0.000025
+    calls = []
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents=None, **kwargs):
+        import asyncio
+        if isinstance(contents, str):          # background summary update
+            chars, kind, text = len(contents), "summary", NOTES
+        else:
+            chars = sum(len(p["text"]) for m in contents for p in m["parts"])
+            kind, text = "chat", REPLY
+        latency = self.base_latency + chars / 4 * self.seconds_per_token
+        await asyncio.sleep(latency)
+        BenchModel.calls.append({"kind": kind, "chars": chars, "latency": latency})
+
+        class Response:
+            pass
+        response = Response()
+        response.text = text
+        return response
+
+
+genai.GenerativeModel = BenchModel
+genai.configure = lambda **kwargs: None
+
+import app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+def run(turns, budget, session, think_time):
+    app.HISTORY_TOKEN_BUDGET = budget
+    BenchModel.calls = []
+    history, rows = [], []
+    with contextlib.redirect_stdout(io.StringIO()), TestClient(app.app) as client:
+        for turn in range(1, turns + 1):
+            message = GUEST_LINES[(turn - 1) % len(GUEST_LINES)]
+            payload = {"userMessage": message, "clientName": "Piya"}
+            if session:
+                payload["sessionId"] = "bench-session"
+            else:
+                payload["chatHistory"] = history
+            started = time.perf_counter()
+            reply = client.post("/llm-chat", json=payload).json()["response"]
+            elapsed = time.perf_counter() - started
+            chat_call = [c for c in BenchModel.calls if c["kind"] == "chat"][-1]
+            rows.append({"turn": turn, "prompt_chars": chat_call["chars"],
+                         "gemini_seconds": round(chat_call["latency"], 4), "request_seconds": round(elapsed, 4)})
+            history = history + [{"role": "user", "text": message}, {"role": "assistant", "text": reply}]
+            time.sleep(think_time)      # guest typing; background summaries run meanwhile
+    summaries = sum(1 for c in BenchModel.calls if c["kind"] == "summary")
+    return rows, summaries
+
+
+def main():
+    ap = argparse.ArgumentParser(description="History compaction benchmark (stubbed Gemini)")
+    ap.add_argument("--turns", type=int, default=60)
+    ap.add_argument("--budget", type=int, default=app.HISTORY_TOKEN_BUDGET or 2000,
+                    help="HISTORY_TOKEN_BUDGET for the compacted run")
+    ap.add_argument("--session", action="store_true", help="use sessionId instead of resending chatHistory")
+    ap.add_argument("--think-time", type=float, default=0.1, help="seconds between turns")
+    ap.add_argument("--json", help="also write the per-turn results here")
+    args = ap.parse_args()
+
+    full, _ = run(args.turns, 0, args.session, args.think_time)
+    compacted, summaries = run(args.turns, args.budget, args.session, args.think_time)
+
+    print(f"{args.turns} turns, {'session' if args.session else 'full-history'} requests, "
+          f"budget {args.budget} tokens ({summaries} background summary updates)\n")
+    print(f"{'turn':>5} | {'prompt chars':>12} {'compacted':>10} | {'gemini s':>8} {'compacted':>10}")
+    step = max(args.turns // 12, 1)
+    for a, b in zip(full, compacted):
+        if a["turn"] == 1 or a["turn"] % step == 0 or a["turn"] == args.turns:
+            print(f"{a['turn']:>5} | {a['prompt_chars']:>12} {b['prompt_chars']:>10} | "
+                  f"{a['gemini_seconds']:>8.3f} {b['gemini_seconds']:>10.3f}")
+    total_a = sum(r["prompt_chars"] for r in full)
+    total_b = sum(r["prompt_chars"] for r in compacted)
+    print(f"\nTotal prompt chars: {total_a} -> {total_b} ({100 * (1 - total_b / total_a):.0f}% less)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "full": full, "compacted": compacted,
+                       "summary_updates": summaries}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
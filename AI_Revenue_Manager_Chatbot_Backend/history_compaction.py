@@ -0,0 +1,104 @@
+# ---------------------------------------------------------
+# TOKEN-BUDGETED HISTORY COMPACTION
+# ---------------------------------------------------------
+# Long concierge chats are sent to Gemini as:
+#   system prompt + rolling summary of booking facts + most recent turns (verbatim)
+# The most recent turns are kept while they fit in the token budget; everything
+# older is folded into the summary. The summary is cached per conversation and
+# updated incrementally (previous summary + newly folded turns) by a background
+# Gemini call, so it never delays a reply. Turns the summary does not cover yet
+# are simply kept verbatim until it catches up — no booking fact is dropped.
+import hashlib
+
+# Same rough heuristic as the batch job: ~4 characters per token
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """
+You maintain the booking notes of a hotel concierge conversation.
+Update the notes below with the new conversation turns.
+
+Keep ONLY facts useful for the rest of the conversation:
+- Guest name, stay dates, number of guests (adults / children)
+- Room preferences, budget
+- Dining preferences and FOOD ALLERGIES / dietary restrictions
+- Spa, activities, excursions, transportation requests
+- Purpose of visit (vacation, work, anniversary, honeymoon, ...)
+- Open questions or promises the concierge made
+
+Write short bullet points (max ~150 words). Newer facts replace older ones.
+Return ONLY the updated notes.
+
+Current notes:
+{summary}
+
+New conversation turns:
+{turns}
+"""
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_text(message):
+    return "".join(part.get("text", "") for part in message["parts"])
+
+
+def prefix_hash(messages):
+    """Fingerprint of a conversation prefix (guards a cached summary against edited history)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for message in messages:
+        digest.update(message["role"].encode())
+        digest.update(message_text(message).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def conversation_key(session_id, client_name, messages):
+    """Cache key of a conversation: its sessionId, else the guest name + first message."""
+    if session_id:
+        return f"s:{session_id}"
+    first = message_text(messages[0]) if messages else ""
+    return "h:" + hashlib.blake2b(f"{client_name}\0{first}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def recent_start(messages, token_budget, keep_min=2):
+    """Index of the first message of the most recent turns that fit in `token_budget`
+    (the last `keep_min` messages are always kept)."""
+    used = 0
+    start = len(messages)
+    while start > 0:
+        cost = estimate_tokens(message_text(messages[start - 1]))
+        if used + cost > token_budget and len(messages) - start >= keep_min:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def compact_history(messages, state, token_budget):
+    """Split the past messages for the prompt.
+
+    state: cached {"summary", "summarized", "prefix"} of this conversation (or None).
+    Returns (summary or None, verbatim messages, summarized, fold_upto): the summary
+    covers messages[:summarized] and everything after it is sent verbatim;
+    fold_upto > summarized means the summary should be brought up to messages[:fold_upto].
+    """
+    fold_upto = recent_start(messages, token_budget) if token_budget > 0 else 0
+    if fold_upto == 0:
+        return None, messages, 0, 0        # everything fits (or compaction is off)
+    summarized = 0
+    summary = None
+    if state and state["summarized"] <= len(messages) and state["prefix"] == prefix_hash(messages[:state["summarized"]]):
+        summary, summarized = state["summary"], state["summarized"]
+    if fold_upto > summarized:
+        # Over budget: fold down to half of it, so the next turns fit without another update
+        fold_upto = recent_start(messages, token_budget // 2)
+    return summary, messages[summarized:], summarized, fold_upto
+
+
+def summary_prompt(summary, messages):
+    turns = "\n".join(
+        f"{'Guest' if m['role'] == 'user' else 'Concierge'}: {message_text(m)}" for m in messages
+    )
+    return SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=turns)
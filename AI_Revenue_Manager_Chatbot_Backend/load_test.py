@@ -0,0 +1,215 @@
+"""
+Load test for /llm-chat: many concurrent chats against one instance.
+
+    python load_test.py                          # in-process: app.py on a local uvicorn, stubbed Gemini
+    python load_test.py --blocking-stub          # same, but the stub blocks the event loop (the old behaviour)
+    python load_test.py --stream                 # /llm-chat/stream: also reports time to first chunk
+    python load_test.py --response-cache         # keep the response cache on (the questions repeat)
+    python load_test.py --url https://<service>  # a deployed instance (real Gemini calls — uses quota)
+
+While the chats run, "/" is polled as a health check, so the report shows whether
+the instance keeps answering other requests while Gemini calls are in flight.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+
+QUESTIONS = [
+    "Do you have a swimming pool?",
+    "What time is check-in?",
+    "Can I book a spa treatment for two on Saturday?",
+    "We are celebrating our anniversary, any dinner recommendations?",
+    "Is airport transfer available?",
+]
+
+
+# ---------------------------------------------------------
+# STUBBED GEMINI (in-process mode only)
+# ---------------------------------------------------------
+REPLY = "Certainly! Happy to help with that. Let me check availability for you and confirm the details."
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubStream:
+    """Streamed reply: the first chunk after `first_chunk` seconds, the rest spread over the remaining latency."""
+
+    def __init__(self, words, first_chunk, per_chunk):
+        self.words = words
+        self.first_chunk = first_chunk
+        self.per_chunk = per_chunk
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_chunk)
+        for i, word in enumerate(self.words):
+            if i:
+                await asyncio.sleep(self.per_chunk)
+            yield StubResponse(word + " ")
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: answers after `latency` seconds."""
+    latency = 0.5
+    blocking = False
+    first_chunk_share = 0.2        # streaming: share of `latency` before the first chunk
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents=None, **kwargs):
+        time.sleep(self.latency)
+        return StubResponse(REPLY)
+
+    async def count_tokens_async(self, contents=None, **kwargs):
+        return {"total_tokens": 1}
+
+    async def generate_content_async(self, contents=None, stream=False, **kwargs):
+        if stream:
+            words = REPLY.split()
+            first = self.latency * self.first_chunk_share
+            return StubStream(words, first, (self.latency - first) / max(len(words) - 1, 1))
+        if self.blocking:
+            time.sleep(self.latency)       # what a synchronous call inside `async def` does
+        else:
+            await asyncio.sleep(self.latency)
+        return StubResponse(REPLY)
+
+
+def start_local_server(gemini_latency, blocking, response_cache=False):
+    """Run app.py on a free local port with Gemini stubbed; returns the base URL."""
+    os.environ.setdefault("GEMINI_API_KEY", "load-test")
+    os.environ.setdefault("GEMINI_MODEL", "load-test-model")
+    if not response_cache:
+        os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+    import google.generativeai as genai
+    import uvicorn
+
+    StubModel.latency = gemini_latency
+    StubModel.blocking = blocking
+    genai.GenerativeModel = StubModel
+    genai.configure = lambda **kwargs: None
+    import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning",
+                                           access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+# ---------------------------------------------------------
+# LOAD
+# ---------------------------------------------------------
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def stream_chat(client, payload):
+    """POST /llm-chat/stream; returns seconds until the first text chunk (None if there was none)."""
+    started = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/llm-chat/stream", json=payload) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith("event: error"):
+                raise httpx.HTTPError("stream ended with an error event")
+            if first is None and line.startswith("data: "):
+                first = time.perf_counter() - started
+    return first
+
+
+async def run_load(base_url, chats, concurrency, health_interval, stream=False):
+    latencies, failures, health, first_chunks = [], 0, [], []
+    slots = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency + 2, max_keepalive_connections=concurrency + 2)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def chat(i):
+            nonlocal failures
+            payload = {"chatHistory": [], "userMessage": QUESTIONS[i % len(QUESTIONS)], "clientName": f"Guest {i}"}
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    if stream:
+                        first = await stream_chat(client, payload)
+                        if first is not None:
+                            first_chunks.append(first)
+                    else:
+                        resp = await client.post("/llm-chat", json=payload)
+                        resp.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    failures += 1
+
+        async def health_checks():
+            while not done.is_set():
+                started = time.perf_counter()
+                try:
+                    await client.get("/")
+                    health.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(health_interval)
+
+        prober = asyncio.create_task(health_checks())
+        started = time.perf_counter()
+        await asyncio.gather(*(chat(i) for i in range(chats)))
+        wall = time.perf_counter() - started
+        done.set()
+        await prober
+    return wall, latencies, failures, health, first_chunks
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent /llm-chat load test")
+    ap.add_argument("--url", help="base URL of a running instance (default: start app.py in-process)")
+    ap.add_argument("--chats", type=int, default=200, help="total chats to send")
+    ap.add_argument("--concurrency", type=int, default=50, help="chats in flight at once")
+    ap.add_argument("--gemini-latency", type=float, default=0.5, help="stubbed Gemini seconds per reply")
+    ap.add_argument("--blocking-stub", action="store_true",
+                    help="stub blocks the event loop (shows the behaviour before async Gemini calls)")
+    ap.add_argument("--stream", action="store_true", help="use /llm-chat/stream (SSE)")
+    ap.add_argument("--response-cache", action="store_true",
+                    help="in-process: keep the response cache enabled (most chats become cache hits)")
+    ap.add_argument("--health-interval", type=float, default=0.1, help="seconds between '/' probes")
+    args = ap.parse_args()
+
+    base_url = args.url or start_local_server(args.gemini_latency, args.blocking_stub, args.response_cache)
+    print(f"Target: {base_url} — {args.chats} chats, {args.concurrency} concurrent")
+    wall, latencies, failures, health, first_chunks = asyncio.run(
+        run_load(base_url, args.chats, args.concurrency, args.health_interval, args.stream))
+
+    print(f"Completed:   {len(latencies)} ok, {failures} failed in {wall:.2f}s "
+          f"({len(latencies) / wall:.1f} chats/s)")
+    if latencies:
+        print(f"Chat latency p50/p95/p99: {percentile(latencies, 50):.3f}s / "
+              f"{percentile(latencies, 95):.3f}s / {percentile(latencies, 99):.3f}s")
+        if first_chunks:
+            print(f"First chunk p50/p95/p99:  {percentile(first_chunks, 50):.3f}s / "
+                  f"{percentile(first_chunks, 95):.3f}s / {percentile(first_chunks, 99):.3f}s")
+        # Average number of chats actually being served at the same time
+        print(f"Parallelism: {sum(latencies) / wall:.1f} chats in flight on average")
+    if health:
+        print(f"Health '/' p50/p99:       {statistics.median(health):.3f}s / {percentile(health, 99):.3f}s "
+              f"({len(health)} probes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# ---------------------------------------------------------
+# PROMETHEUS-STYLE METRICS (no extra dependency)
+# ---------------------------------------------------------
+# Counters, gauges and histograms kept in process memory and rendered in the
+# Prometheus text format by GET /metrics. Observing a value is a lock + bisect,
+# so it is cheap enough for the request path. Percentiles (p50/p95/p99) come
+# from the histograms, e.g. in PromQL:
+#   histogram_quantile(0.95, sum by (le) (rate(chatbot_http_request_duration_seconds_bucket[5m])))
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: covers fast health checks up to slow Gemini completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)    # first bucket with le >= value
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of the block."""
+        return _Timer(self, labels)
+
+    def render(self):
+        with self.lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self.values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [le])} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+
+REGISTRY = []
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------
+# CHATBOT METRICS
+# ---------------------------------------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "chatbot_http_request_duration_seconds", "End-to-end request latency.", ["method", "path", "status"])
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "chatbot_http_requests_in_flight", "Requests currently being served by this instance.")
+GEMINI_CALL_SECONDS = Histogram(
+    "chatbot_gemini_call_duration_seconds", "Gemini generate_content latency (whole reply when streaming).", ["outcome"])
+FIRST_TOKEN_SECONDS = Histogram(
+    "chatbot_gemini_time_to_first_token_seconds", "Streaming: seconds until the first reply chunk (slot wait included).")
+GEMINI_IN_FLIGHT = Gauge(
+    "chatbot_gemini_calls_in_flight", "Gemini calls currently awaited by this instance.")
+CHAT_HISTORY_MESSAGES = Histogram(
+    "chatbot_chat_history_messages", "Past messages in the conversation of each /llm-chat request.",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256))
+PROMPT_CHARS = Histogram(
+    "chatbot_prompt_chars", "Characters sent to Gemini per /llm-chat request (system prompt + history + message).",
+    buckets=(1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000))
+ERRORS = Counter(
+    "chatbot_errors_total", "Errors by endpoint and type.", ["endpoint", "type"])
+SESSION_LOOKUPS = Counter(
+    "chatbot_session_lookups_total", "Session-mode /llm-chat requests by result (hit / new).", ["result"])
+SESSIONS = Gauge(
+    "chatbot_sessions", "Chat sessions held by this instance.")
+HISTORY_SUMMARIES = Counter(
+    "chatbot_history_summary_updates_total", "Background booking-facts summary updates by outcome.", ["outcome"])
+APPS_SCRIPT_SECONDS = Histogram(
+    "chatbot_apps_script_forward_duration_seconds", "Latency of forwarding /save-chat to Apps Script.", ["outcome"])
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "chatbot_response_cache_lookups_total",
+    "Response-cache lookups by result (hit / miss / bypass = history too long or cache off).", ["result"])
+RESPONSE_CACHE_SAVED_SECONDS = Counter(
+    "chatbot_response_cache_saved_seconds_total", "Gemini seconds saved by response-cache hits.")
+RESPONSE_CACHE_ENTRIES = Gauge(
+    "chatbot_response_cache_entries", "Replies held in the response cache.")
+
+
+class MetricsMiddleware:
+    """Pure ASGI timing middleware (streams pass through untouched).
+    Requests are labelled with the matched route template, not the raw URL."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                path=getattr(route, "path", "unmatched"),
+                status=status,
+            )
@@ -0,0 +1,68 @@
+# ---------------------------------------------------------
+# RESPONSE CACHE FOR REPEATED OPENING QUESTIONS
+# ---------------------------------------------------------
+# Many chats open with the same factual question ("Do you have a swimming pool?",
+# "What time is check-in?"). For turns with no (or a very short) history the
+# reply does not depend on the conversation, so it is cached and reused.
+#
+# Key: model + SYSTEM_PROMPT fingerprint + normalized history + normalized question,
+# with the guest name replaced by a slot (so "Piya" and "Ann" share entries).
+# Value: the reply with the guest name in its greeting (first sentence) replaced
+# by the slot; a hit re-personalizes it for the current guest. Replies that use the
+# name beyond the greeting are considered personal and are not cached.
+# Entries live in a MemorySessionBackend (bounded LRU, TTL counted from the store).
+import hashlib
+import re
+import unicodedata
+
+NAME_SLOT = "\0clientName\0"
+
+
+def normalize_question(text):
+    """Case-, punctuation- and whitespace-insensitive form of a message."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def prompt_fingerprint(system_prompt, model_name):
+    """Changes whenever the system prompt or the Gemini model changes (invalidates the cache)."""
+    return hashlib.blake2b(f"{model_name}\0{system_prompt}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _name_pattern(client_name):
+    return re.compile(rf"(?<!\w){re.escape(client_name)}(?!\w)")
+
+
+def _depersonalize(text, client_name):
+    return _name_pattern(client_name).sub(NAME_SLOT, text) if client_name else text
+
+
+def cache_key(fingerprint, client_name, past, question):
+    """Key of a short conversation (past: Gemini-format messages)."""
+    digest = hashlib.blake2b(fingerprint.encode(), digest_size=16)
+    for message in past:
+        text = "".join(part.get("text", "") for part in message["parts"])
+        digest.update(message["role"].encode())
+        digest.update(normalize_question(_depersonalize(text, client_name)).encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(normalize_question(_depersonalize(question, client_name)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def reply_template(reply, client_name):
+    """The reply with the guest name in its greeting replaced by NAME_SLOT,
+    or None if it should not be shared (empty, or the name appears past the greeting)."""
+    if not reply.strip():
+        return None
+    if not client_name:
+        return reply
+    end = re.search(r"[.!?\n]", reply)
+    end = end.end() if end else len(reply)
+    pattern = _name_pattern(client_name)
+    if pattern.search(reply, end):
+        return None
+    return pattern.sub(NAME_SLOT, reply[:end]) + reply[end:]
+
+
+def personalize(template, client_name):
+    return template.replace(NAME_SLOT, client_name)
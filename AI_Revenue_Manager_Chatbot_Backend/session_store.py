@@ -0,0 +1,78 @@
+# ---------------------------------------------------------
+# SERVER-SIDE CHAT SESSIONS
+# ---------------------------------------------------------
+# Session mode of /llm-chat: the conversation is kept here, keyed by the
+# frontend's sessionId, so each turn only carries the new userMessage.
+#
+# A session is a plain JSON-serializable dict:
+#   {"clientName": "...", "messages": [{"role": "user"/"model", "parts": [{"text": ...}]}, ...]}
+# (messages are already in Gemini format, so nothing is re-converted per turn).
+#
+# Backends implement the async get/put/delete interface of SessionBackend.
+# MemorySessionBackend keeps sessions in this instance only (LRU + TTL);
+# a Redis-compatible backend can be plugged in later through create_session_backend()
+# (e.g. JSON values with SET ... EX ttl) to share sessions across Cloud Run instances.
+import time
+from collections import OrderedDict
+
+
+class SessionBackend:
+    """Interface of a session store."""
+
+    async def get(self, session_id):
+        """The session dict, or None if unknown/expired."""
+        raise NotImplementedError
+
+    async def put(self, session_id, session):
+        raise NotImplementedError
+
+    async def delete(self, session_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class MemorySessionBackend(SessionBackend):
+    """In-process LRU store: at most `max_sessions` sessions, each expiring
+    `ttl_seconds` after it was last stored (every chat turn stores it again).
+    Reading a session only makes it the most recently used one for eviction;
+    it does not push back its expiry."""
+
+    def __init__(self, max_sessions=10000, ttl_seconds=6 * 3600):
+        self.max_sessions = max(max_sessions, 1)
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()     # session_id -> (expires_at, session)
+        self.evicted = 0
+
+    async def get(self, session_id):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, session = entry
+        if expires_at < time.monotonic():
+            del self.sessions[session_id]
+            self.evicted += 1
+            return None
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def put(self, session_id, session):
+        self.sessions[session_id] = (time.monotonic() + self.ttl_seconds, session)
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+
+    async def delete(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+def create_session_backend(kind="memory", max_sessions=10000, ttl_seconds=6 * 3600):
+    """Session backend selected by SESSION_BACKEND."""
+    if kind == "memory":
+        return MemorySessionBackend(max_sessions, ttl_seconds)
+    raise ValueError(f"Unknown SESSION_BACKEND '{kind}' (available: memory)")
@@ -0,0 +1,6 @@
+# Unit tests for the chatbot's pure helpers:  python -m pytest tests -q  (from AI_Revenue_Manager_Chatbot_Backend)
+# test_app.py (next to app.py) is a manual script against a running server, not part of this suite.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,79 @@
+from history_compaction import compact_history, conversation_key, prefix_hash, recent_start, summary_prompt
+
+
+def chat(count, chars=39):
+    """`count` alternating user/model messages of 10 estimated tokens each."""
+    return [
+        {"role": "user" if i % 2 == 0 else "model", "parts": [{"text": f"{i}".ljust(chars, "x")}]}
+        for i in range(count)
+    ]
+
+
+def state_for(messages, summarized, summary="- Guest: Piya"):
+    return {"summary": summary, "summarized": summarized, "prefix": prefix_hash(messages[:summarized])}
+
+
+def test_recent_start_keeps_the_turns_that_fit():
+    messages = chat(6)
+    assert recent_start(messages, 100) == 0
+    assert recent_start(messages, 40) == 2
+    assert recent_start(messages, 45) == 2
+
+
+def test_recent_start_always_keeps_keep_min_messages():
+    messages = chat(6, chars=4000)
+    assert recent_start(messages, 10) == 4
+    assert recent_start(messages, 10, keep_min=3) == 3
+
+
+def test_everything_fits():
+    messages = chat(6)
+    assert compact_history(messages, None, 100) == (None, messages, 0, 0)
+    assert compact_history(messages, None, 0) == (None, messages, 0, 0)
+
+
+def test_over_budget_without_a_summary_keeps_everything_and_folds_to_half_the_budget():
+    messages = chat(6)
+    summary, verbatim, summarized, fold_upto = compact_history(messages, None, 40)
+    assert (summary, verbatim, summarized) == (None, messages, 0)
+    assert fold_upto == recent_start(messages, 20) == 4
+
+
+def test_summary_that_covers_the_overflow_is_used():
+    messages = chat(6)
+    assert compact_history(messages, state_for(messages, 4), 40) == ("- Guest: Piya", messages[4:], 4, 2)
+
+
+def test_summary_that_lags_behind_is_used_and_brought_up_to_half_the_budget():
+    messages = chat(8)
+    summary, verbatim, summarized, fold_upto = compact_history(messages, state_for(messages, 2), 40)
+    assert (summary, verbatim, summarized) == ("- Guest: Piya", messages[2:], 2)
+    assert fold_upto == recent_start(messages, 20) == 6
+
+
+def test_summary_of_an_edited_prefix_is_ignored():
+    messages = chat(6)
+    state = state_for(messages, 4)
+    edited = [dict(m) for m in messages]
+    edited[1] = {"role": "model", "parts": [{"text": "an edited reply".ljust(39, "x")}]}
+    assert compact_history(edited, state, 40) == (None, edited, 0, 4)
+
+
+def test_summary_of_a_longer_conversation_is_ignored():
+    messages = chat(6)
+    state = state_for(chat(10), 8)
+    assert compact_history(messages, state, 40) == (None, messages, 0, 4)
+
+
+def test_conversation_key():
+    messages = chat(2)
+    assert conversation_key("abc", "Piya", messages) == "s:abc"
+    assert conversation_key(None, "Piya", messages) == conversation_key("", "Piya", chat(4))
+    assert conversation_key(None, "Piya", messages) != conversation_key(None, "Ann", messages)
+    assert conversation_key(None, "Piya", []).startswith("h:")
+
+
+def test_summary_prompt_labels_the_turns():
+    prompt = summary_prompt(None, chat(2, chars=1))
+    assert "(none yet)" in prompt
+    assert "Guest: 0" in prompt and "Concierge: 1" in prompt
@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, MetricsMiddleware
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry, so test metrics don't leak into the chatbot's /metrics."""
+    registry = []
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_counter_renders_one_line_per_label_set(registry):
+    errors = Counter("test_errors_total", "Errors.", ["endpoint", "type"])
+    errors.inc(endpoint="/llm-chat", type="TimeoutError")
+    errors.inc(2, endpoint="/llm-chat", type="TimeoutError")
+    errors.inc(endpoint="/save-chat", type="HTTPError")
+    assert errors.render() == [
+        "# HELP test_errors_total Errors.",
+        "# TYPE test_errors_total counter",
+        'test_errors_total{endpoint="/llm-chat",type="TimeoutError"} 3',
+        'test_errors_total{endpoint="/save-chat",type="HTTPError"} 1',
+    ]
+
+
+def test_label_values_are_escaped(registry):
+    errors = Counter("test_errors_total", "Errors.", ["type"])
+    errors.inc(type='say "hi"\\\n')
+    assert errors.render()[-1] == 'test_errors_total{type="say \\"hi\\"\\\\\\n"} 1'
+
+
+def test_gauge_goes_up_and_down(registry):
+    in_flight = Gauge("test_in_flight", "In flight.")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    assert in_flight.render()[-1] == "test_in_flight 1"
+    in_flight.set(7)
+    assert in_flight.render() == ["# HELP test_in_flight In flight.", "# TYPE test_in_flight gauge", "test_in_flight 7"]
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = Histogram("test_seconds", "Latency.", ["outcome"], buckets=(1, 0.1, 0.5))
+    for value in (0.05, 0.1, 0.3, 2):
+        latency.observe(value, outcome="ok")
+    assert latency.render()[2:] == [
+        'test_seconds_bucket{outcome="ok",le="0.1"} 2',       # le is inclusive
+        'test_seconds_bucket{outcome="ok",le="0.5"} 3',
+        'test_seconds_bucket{outcome="ok",le="1"} 3',
+        'test_seconds_bucket{outcome="ok",le="+Inf"} 4',
+        'test_seconds_sum{outcome="ok"} 2.45',
+        'test_seconds_count{outcome="ok"} 4',
+    ]
+
+
+def test_histogram_timer_observes_the_block_even_when_it_raises(registry):
+    latency = Histogram("test_seconds", "Latency.")
+    with pytest.raises(ValueError):
+        with latency.time():
+            raise ValueError
+    with latency.time() as timer:
+        pass
+    assert timer.elapsed >= 0
+    assert latency.render()[-1] == "test_seconds_count 2"
+
+
+def test_render_joins_every_registered_metric(registry):
+    Counter("test_a_total", "A.").inc()
+    Gauge("test_b", "B.").set(2)
+    text = metrics.render()
+    assert text.endswith("\n")
+    assert text.splitlines() == [
+        "# HELP test_a_total A.", "# TYPE test_a_total counter", "test_a_total 1",
+        "# HELP test_b B.", "# TYPE test_b gauge", "test_b 2",
+    ]
+
+
+def test_chatbot_metrics_are_registered():
+    names = [metric.name for metric in metrics.REGISTRY]
+    assert "chatbot_http_request_duration_seconds" in names
+    assert len(names) == len(set(names))
+
+
+def test_middleware_labels_requests_by_route_template(registry, monkeypatch):
+    seconds = Histogram("test_request_seconds", "Latency.", ["method", "path", "status"])
+    in_flight = Gauge("test_in_flight", "In flight.")
+    monkeypatch.setattr(metrics, "HTTP_REQUEST_SECONDS", seconds)
+    monkeypatch.setattr(metrics, "HTTP_REQUESTS_IN_FLIGHT", in_flight)
+    seen_in_flight = []
+
+    async def app(scope, receive, send):
+        seen_in_flight.append(in_flight.values[()])
+        scope["route"] = SimpleNamespace(path="/sessions/{session_id}")      # set by the router
+        await send({"type": "http.response.start", "status": 404})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def requests():
+        await MetricsMiddleware(app)({"type": "http", "method": "GET"}, None, send)
+        with pytest.raises(RuntimeError):
+            await MetricsMiddleware(failing_app)({"type": "http", "method": "POST"}, None, send)
+
+    asyncio.run(requests())
+    assert seen_in_flight == [1]
+    assert in_flight.values[()] == 0
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]     # passed through
+    assert set(seconds.values) == {("GET", "/sessions/{session_id}", "404"), ("POST", "unmatched", "500")}
+
+
+def test_middleware_ignores_non_http_scopes(registry, monkeypatch):
+    seconds = Histogram("test_request_seconds", "Latency.", ["method", "path", "status"])
+    monkeypatch.setattr(metrics, "HTTP_REQUEST_SECONDS", seconds)
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["type"])
+
+    asyncio.run(MetricsMiddleware(app)({"type": "lifespan"}, None, None))
+    assert calls == ["lifespan"]
+    assert seconds.values == {}
@@ -0,0 +1,60 @@
+from response_cache import NAME_SLOT, cache_key, normalize_question, personalize, prompt_fingerprint, reply_template
+
+FINGERPRINT = prompt_fingerprint("You are a hotel concierge.", "gemini-2.0-flash")
+
+
+def message(role, text):
+    return {"role": role, "parts": [{"text": text}]}
+
+
+def test_normalize_question():
+    assert normalize_question("  Do you have a SWIMMING pool?! ") == "do you have a swimming pool"
+    assert normalize_question("Ｃheck-in time?") == normalize_question("check in   time")
+
+
+def test_key_is_shared_across_guest_names_and_punctuation():
+    assert cache_key(FINGERPRINT, "Piya", [], "Piya here. Do you have a pool?") == \
+        cache_key(FINGERPRINT, "Ann", [], "Ann here -- do you have a POOL")
+
+
+def test_key_depends_on_the_prompt_fingerprint_and_the_history():
+    question = "Do you have a pool?"
+    key = cache_key(FINGERPRINT, "Piya", [], question)
+    other_prompt = prompt_fingerprint("You are a hotel concierge!", "gemini-2.0-flash")
+    assert cache_key(other_prompt, "Piya", [], question) != key
+    assert cache_key(FINGERPRINT, "Piya", [message("user", "Hi")], question) != key
+    assert cache_key(FINGERPRINT, "Piya", [message("model", "Hi")], question) != \
+        cache_key(FINGERPRINT, "Piya", [message("user", "Hi")], question)
+
+
+def test_fingerprint_changes_with_prompt_or_model():
+    assert prompt_fingerprint("A", "gemini-2.0-flash") == prompt_fingerprint("A", "gemini-2.0-flash")
+    assert prompt_fingerprint("A", "gemini-2.0-flash") != prompt_fingerprint("B", "gemini-2.0-flash")
+    assert prompt_fingerprint("A", "gemini-2.0-flash") != prompt_fingerprint("A", "gemini-1.5-pro")
+
+
+def test_name_in_the_greeting_is_slotted_and_personalized():
+    template = reply_template("Hello Piya! Yes, our pool is open 7am to 9pm.", "Piya")
+    assert template == f"Hello {NAME_SLOT}! Yes, our pool is open 7am to 9pm."
+    assert personalize(template, "Ann") == "Hello Ann! Yes, our pool is open 7am to 9pm."
+
+
+def test_reply_using_the_name_after_the_greeting_is_not_cached():
+    assert reply_template("Hello Piya! Piya, your anniversary dinner is booked.", "Piya") is None
+    assert reply_template("Hi there.\nI noted the allergy for Piya.", "Piya") is None
+
+
+def test_empty_reply_is_not_cached():
+    assert reply_template("", "Piya") is None
+    assert reply_template(" \n ", None) is None
+
+
+def test_reply_without_a_guest_name_is_cached_verbatim():
+    reply = "Check-in is from 2pm."
+    assert reply_template(reply, None) == reply
+    assert reply_template(reply, "") == reply
+
+
+def test_name_is_matched_as_a_whole_word():
+    template = reply_template("Hello Ann! The Annual gala is on Friday, Anna will host.", "Ann")
+    assert template == f"Hello {NAME_SLOT}! The Annual gala is on Friday, Anna will host."
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+import session_store
+from session_store import MemorySessionBackend, create_session_backend
+
+
+class Clock:
+    """Stand-in for time.monotonic() in session_store."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "monotonic", clock)
+    return clock
+
+
+def session(name):
+    return {"clientName": name, "messages": [{"role": "user", "parts": [{"text": f"Hi, I'm {name}"}]}]}
+
+
+def test_round_trip_and_delete(clock):
+    async def scenario():
+        store = MemorySessionBackend()
+        assert await store.get("s1") is None
+        await store.put("s1", session("Ann"))
+        assert await store.get("s1") == session("Ann")
+        await store.put("s1", session("Ben"))
+        assert await store.get("s1") == session("Ben")
+        assert len(store) == 1
+        await store.delete("s1")
+        await store.delete("unknown")
+        assert await store.get("s1") is None
+        assert len(store) == 0
+
+    asyncio.run(scenario())
+
+
+def test_sessions_expire_after_ttl(clock):
+    async def scenario():
+        store = MemorySessionBackend(ttl_seconds=60)
+        await store.put("s1", session("Ann"))
+        clock.now += 60
+        assert await store.get("s1") == session("Ann")
+        clock.now += 1
+        assert await store.get("s1") is None
+        assert len(store) == 0 and store.evicted == 1
+
+    asyncio.run(scenario())
+
+
+def test_putting_a_session_again_renews_its_ttl(clock):
+    async def scenario():
+        store = MemorySessionBackend(ttl_seconds=60)
+        await store.put("s1", session("Ann"))
+        clock.now += 50
+        await store.put("s1", session("Ann"))       # every /llm-chat turn stores the session again
+        clock.now += 50
+        assert await store.get("s1") == session("Ann")
+
+    asyncio.run(scenario())
+
+
+def test_reading_a_session_does_not_renew_its_ttl(clock):
+    async def scenario():
+        store = MemorySessionBackend(ttl_seconds=60)
+        await store.put("s1", session("Ann"))
+        clock.now += 50
+        assert await store.get("s1") == session("Ann")
+        clock.now += 11
+        assert await store.get("s1") is None
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    async def scenario():
+        store = MemorySessionBackend(max_sessions=2)
+        await store.put("s1", session("Ann"))
+        await store.put("s2", session("Ben"))
+        await store.get("s1")                         # s2 is now the least recently used
+        await store.put("s3", session("Cat"))
+        assert await store.get("s2") is None
+        assert await store.get("s1") == session("Ann")
+        assert await store.get("s3") == session("Cat")
+        assert len(store) == 2 and store.evicted == 1
+
+    asyncio.run(scenario())
+
+
+def test_create_session_backend():
+    store = create_session_backend("memory", max_sessions=0, ttl_seconds=5)
+    assert isinstance(store, MemorySessionBackend)
+    assert store.max_sessions == 1 and store.ttl_seconds == 5
+    with pytest.raises(ValueError, match="redis"):
+        create_session_backend("redis")
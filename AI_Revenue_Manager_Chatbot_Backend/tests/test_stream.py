@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import pytest
+
+import app as chatbot
+from app import ChatRequest, app, lifespan, llm_chat_stream
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class ChunkStream:
+    """Async iterator standing in for the SDK's streamed response."""
+
+    def __init__(self, texts, stall_after=None, delay=0):
+        self.texts = list(texts)
+        self.stall_after = stall_after      # hang forever after this many chunks
+        self.delay = delay                  # seconds before each chunk
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.stall_after is not None and self.sent >= self.stall_after:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        if self.sent == len(self.texts):
+            raise StopAsyncIteration
+        self.sent += 1
+        return Chunk(self.texts[self.sent - 1])
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeModel:
+    def __init__(self, stream):
+        self.stream = stream
+        self.calls = 0
+
+    async def generate_content_async(self, contents, stream=False):
+        assert stream
+        self.calls += 1
+        return self.stream
+
+
+class FakeRequest:
+    """The Starlette request, only asked whether the client has gone away."""
+
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks >= self.disconnect_after
+
+
+def parse(events):
+    """SSE strings -> [(event name or None, data)]."""
+    parsed = []
+    for event in events:
+        name = None
+        for line in event.strip().splitlines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            else:
+                parsed.append((name, json.loads(line[len("data: "):])))
+    return parsed
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """Runs one /llm-chat/stream request (or several, in order) inside the app's lifespan."""
+    monkeypatch.setattr(chatbot, "GEMINI_API_KEY", "")
+    monkeypatch.setattr(chatbot, "GEMINI_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(chatbot, "gemini_slots", asyncio.Semaphore(1))
+    monkeypatch.setattr(chatbot, "HISTORY_TOKEN_BUDGET", 0)
+
+    def run(model, *requests):
+        async def scenario():
+            async with lifespan(app):
+                app.state.gemini_model = model
+                results = []
+                for req, request in requests:
+                    response = await llm_chat_stream(req, request)
+                    results.append(parse([event async for event in response.body_iterator]))
+                return results, app.state
+
+        return asyncio.run(scenario())
+
+    return run
+
+
+def test_reply_is_streamed_then_done(chat):
+    model = FakeModel(ChunkStream(["Hello ", "", "Ann!"]))
+    [events], state = chat(model, (ChatRequest(userMessage="Hi", sessionId="s1"), FakeRequest()))
+    assert events == [
+        (None, {"text": "Hello "}),
+        (None, {"text": "Ann!"}),
+        ("done", {"response": "Hello Ann!", "sessionId": "s1"}),
+    ]
+    assert len(state.sessions) == 1
+    assert chatbot.gemini_slots._value == 1
+
+
+def test_waiting_for_a_slot_counts_against_the_timeout(chat, monkeypatch):
+    monkeypatch.setattr(chatbot, "gemini_slots", asyncio.Semaphore(0))      # every slot busy
+    model = FakeModel(ChunkStream(["never"]))
+    [events], state = chat(model, (ChatRequest(userMessage="Hi", sessionId="s1"), FakeRequest()))
+    assert events == [("error", {"message": "Gemini did not answer within 0.2s"})]
+    assert model.calls == 0
+    assert len(state.sessions) == 0
+
+
+def test_stalled_stream_times_out_and_frees_its_slot(chat):
+    stream = ChunkStream(["Hello ", "Ann!"], stall_after=1)
+    [events], state = chat(FakeModel(stream), (ChatRequest(userMessage="Hi", sessionId="s1"), FakeRequest()))
+    assert events == [(None, {"text": "Hello "}), ("error", {"message": "Gemini did not answer within 0.2s"})]
+    assert stream.closed
+    assert chatbot.gemini_slots._value == 1
+    assert len(state.sessions) == 0                     # a failed turn is not remembered
+
+
+def test_timeout_covers_the_whole_stream_not_each_chunk(chat):
+    stream = ChunkStream(["a", "b", "c", "d", "e", "f"], delay=0.06)    # each chunk well within 0.2s
+    [events], state = chat(FakeModel(stream), (ChatRequest(userMessage="Hi", sessionId="s1"), FakeRequest()))
+    assert events[-1] == ("error", {"message": "Gemini did not answer within 0.2s"})
+    assert 1 < len(events) - 1 < 6
+    assert stream.closed
+    assert len(state.sessions) == 0
+
+
+def test_client_disconnect_abandons_the_stream(chat):
+    stream = ChunkStream(["Hello ", "Ann!", " More"])
+    [events], state = chat(FakeModel(stream),
+                           (ChatRequest(userMessage="Hi", sessionId="s1"), FakeRequest(disconnect_after=1)))
+    assert events == [(None, {"text": "Hello "})]       # no done event
+    assert stream.sent == 1 and stream.closed
+    assert chatbot.gemini_slots._value == 1
+    assert len(state.sessions) == 0
+
+
+def test_cached_reply_is_sent_as_one_chunk(chat):
+    model = FakeModel(ChunkStream(["Hello Ann! ", "The pool opens at 7am."]))
+    question = "Do you have a pool?"
+    [first, second], state = chat(
+        model,
+        (ChatRequest(userMessage=question, clientName="Ann"), FakeRequest()),
+        (ChatRequest(userMessage=question, clientName="Ben", sessionId="s2"), FakeRequest()),
+    )
+    assert first[-1] == ("done", {"response": "Hello Ann! The pool opens at 7am.", "sessionId": None})
+    assert second == [
+        (None, {"text": "Hello Ben! The pool opens at 7am."}),
+        ("done", {"response": "Hello Ben! The pool opens at 7am.", "sessionId": "s2"}),
+    ]
+    assert model.calls == 1
+    assert len(state.sessions) == 1                     # a cache hit is still a remembered turn